@@ -1,7 +1,9 @@
 import streamlit as st
 from streamlit_cookies_controller import CookieController
 import include.users_database as udb
-import hashlib, secrets, time
+import include.candle_cache as candle_cache
+import include.tv_pool as tv_pool
+import time
 
 cookie_manager = CookieController()
 
@@ -54,116 +56,227 @@ conn = udb.create_connection()
 if not conn:
     st.error("Erro ao conectar ao banco MySQL.")
     st.stop()
+# a conexão volta ao pool ao fim do script (inclusive em st.rerun/st.stop)
+try:
+    # colunas/índices da listagem em bancos antigos (uma vez por processo; falha não derruba a página)
+    udb.migrate_users_table(conn)
+
+    # -------------------------------------------------------------------
+    # SIDEBAR
+    # -------------------------------------------------------------------
+    name = udb.get_user_profile(st.session_state.user_email, conn)["user_name"]
+
+    st.sidebar.write(f"👋 Bem-vindo, {(name.split()[0]).capitalize()}")
+
+
+
+    # -------------------------------------------------------------------
+    # TÍTULO
+    # -------------------------------------------------------------------
+
+    # -------------------------------------------------------------------
+    # SEÇÃO 1 — RESUMO
+    # -------------------------------------------------------------------
+    st.subheader("Resumo do sistema")
+
+    counters = udb.user_counters(conn)
+
+    colA, colB = st.columns(2)
+    colA.metric("Usuários cadastrados", counters["total"], f"+{counters['recent']} em 30 dias")
+    colB.metric("Usuários ativos", counters["active"])
+
+    with colA:
+        with st.container(horizontal=True):
+            # -------------------------------------------------------------------
+            # SEÇÃO 2 — ADICIONAR NOVO USUÁRIO
+            # -------------------------------------------------------------------
+            @st.dialog('Criador de usuários', width='large')
+            def criar_novo_usuario():
+                with st.form("create_new_user_form"):
+                    new_name = st.text_input("Nome completo")
+                    new_email = st.text_input("Email")
+                    new_password = st.text_input("Senha", type="password")
+                    #new_contract_id = st.text_input("Contract ID")
+                    new_status = st.selectbox("Status inicial", ["active", "revoked"])
+
+                    submitted = st.form_submit_button("Criar usuário")
+
+                    if submitted:
+                        if not new_name or not new_email or not new_password:
+                            st.error("Preencha todos os campos obrigatórios.")
+                        else:
+                            hashed, salt = udb.hash_password(new_password)
+
+                            result = udb.insert_new_user(
+                                conn, new_name, new_email, hashed, salt, new_status
+                            )
+
+                            if result:
+                                st.success(f"Usuário **{new_name}** criado com sucesso!")
+                                st.rerun()
+                            else:
+                                st.error("Erro ao criar usuário!")
+            if st.button('Criar usuário', type="primary"):
+                criar_novo_usuario()
+
+            # -------------------------------------------------------------------
+            # SEÇÃO 3 — GERENCIAR USUÁRIO
+            # -------------------------------------------------------------------
+            @st.dialog('Gerenciador de Usuários', width='large')
+            def gerenciar_usuario():
+                busca = st.text_input("Buscar por email", placeholder="Digite o início do email")
+                encontrados = udb.search_users(conn, busca)
+                if busca and not encontrados:
+                    st.info("Nenhum usuário encontrado.")
+                usr = st.selectbox(
+                    "Selecione um usuário", encontrados,
+                    format_func=lambda u: f"{u['user_email']} — {u['user_name']}"
+                )
+
+                if usr:
+                    selected_email = usr["user_email"]
+
+                    st.write(f"**Nome:** {usr['user_name']}")
+                    st.write(f"**Status atual:** `{usr['contract_status']}`")
+                    st.write("")
+
+                    col1, col2, col3 = st.columns(3)
+
+                    # ---------- ATIVAR ----------
+                    if col1.button("Liberar acesso", key="liberar"):
+                        udb.update_user_status(conn, selected_email, "active")
+                        st.success("Acesso liberado!")
+                        st.rerun()
+
+                    # ---------- REVOGAR ----------
+                    if col2.button("Revogar acesso", key="revogar"):
+                        udb.update_user_status(conn, selected_email, "revoked")
+                        st.warning("Acesso revogado!")
+                        st.rerun()
+
+                    # ---------- APAGAR ----------
+                    if col3.button("🗑 Apagar usuário", key="delete"):
+                        udb.delete_user(conn, selected_email)
+                        st.error("Usuário removido!")
+                        st.rerun()
+            if st.button('Gerenciar Usuários', type="primary"):
+                gerenciar_usuario()
+
+            # -------------------------------------------------------------------
+            # SEÇÃO 3.1 — OPERAÇÕES EM LOTE
+            # -------------------------------------------------------------------
+            def mostrar_relatorio(relatorio):
+                resultados = {}
+                for linha in relatorio:
+                    resultados[linha["resultado"]] = resultados.get(linha["resultado"], 0) + 1
+                st.write(" · ".join(f"**{k}:** {v}" for k, v in resultados.items()))
+                st.dataframe(relatorio, use_container_width=True)
+
+            @st.dialog('Importar usuários (CSV)', width='large')
+            def importar_usuarios():
+                st.caption("Colunas: user_name, user_email, password e, opcional, contract_status.")
+                arquivo = st.file_uploader("Arquivo CSV", type=["csv"])
+                status_padrao = st.selectbox("Status quando a coluna estiver vazia", udb.USER_STATUSES)
+
+                if arquivo and st.button("Importar", type="primary"):
+                    try:
+                        linhas = udb.read_users_csv(arquivo.getvalue(), status_padrao)
+                    except ValueError as e:
+                        st.error(str(e))
+                        return
+                    with st.spinner(f"Importando {len(linhas)} usuários..."):
+                        relatorio = udb.bulk_insert_users(conn, linhas)
+                    mostrar_relatorio(relatorio)
+
+            if st.button('Importar usuários'):
+                importar_usuarios()
+
+            @st.dialog('Alterar status em lote', width='large')
+            def alterar_status_em_lote():
+                texto = st.text_area("Emails (um por linha ou separados por vírgula)")
+                novo_status = st.radio("Novo status", udb.USER_STATUSES, horizontal=True)
+
+                if texto.strip() and st.button("Aplicar", type="primary"):
+                    emails = texto.replace(",", "\n").replace(";", "\n").splitlines()
+                    with st.spinner("Atualizando..."):
+                        relatorio = udb.bulk_update_status(conn, emails, novo_status)
+                    mostrar_relatorio(relatorio)
+
+            if st.button('Status em lote'):
+                alterar_status_em_lote()
+
+    st.divider()
+    # -------------------------------------------------------------------
+    # SEÇÃO 4 — LISTA DE USUÁRIOS
+    # -------------------------------------------------------------------
+    st.subheader("Usuários cadastrados")
+
+    expanded = st.expander("📋 Visualizar tabela completa", expanded=True)
+    with expanded:
+        f1, f2, f3 = st.columns(3)
+        filtro_status = f1.selectbox("Status", ["Todos", "active", "revoked"])
+        filtro_email = f2.text_input("Email começa com")
+        filtro_datas = f3.date_input("Cadastrado entre", value=[])
+
+        o1, o2, o3 = st.columns(3)
+        ordenar_por = o1.selectbox("Ordenar por", udb.USER_SORT_COLUMNS,
+                                   index=udb.USER_SORT_COLUMNS.index("id"))
+        decrescente = o2.toggle("Decrescente", value=True)
+        por_pagina = o3.selectbox("Por página", [25, 50, 100], index=1)
+
+        filtros = dict(
+            status=None if filtro_status == "Todos" else filtro_status,
+            email_prefix=filtro_email,
+            created_from=filtro_datas[0] if len(filtro_datas) > 0 else None,
+            created_to=filtro_datas[1] if len(filtro_datas) > 1 else None,
+        )
+        # volta para a primeira página quando os filtros mudam
+        if st.session_state.get("admin_user_filters") != (filtros, ordenar_por, decrescente, por_pagina):
+            st.session_state.admin_user_filters = (filtros, ordenar_por, decrescente, por_pagina)
+            st.session_state.admin_user_page = 1
+
+        total = udb.count_users(conn, **filtros)
+        paginas = max(1, -(-total // por_pagina))
+        st.session_state.admin_user_page = min(st.session_state.admin_user_page, paginas)
+        pagina = st.number_input("Página", min_value=1, max_value=paginas, step=1, key="admin_user_page")
+
+        usuarios = udb.list_users(
+            conn, page=pagina, page_size=por_pagina,
+            sort=ordenar_por, descending=decrescente, **filtros
+        )
+        st.dataframe(usuarios, use_container_width=True)
+        st.caption(f"{total} usuários · página {pagina} de {paginas}")
+finally:
+    conn.close()
 
-# -------------------------------------------------------------------
-# SIDEBAR
-# -------------------------------------------------------------------
-name = udb.get_user_info(conn, "user_name", "users", st.session_state.user_email)[0][0]
-
-st.sidebar.write(f"👋 Bem-vindo, {(name.split()[0]).capitalize()}")
-
-
-
-# -------------------------------------------------------------------
-# TÍTULO
-# -------------------------------------------------------------------
 
 # -------------------------------------------------------------------
-# SEÇÃO 1 — RESUMO
-# -------------------------------------------------------------------
-st.subheader("Resumo do sistema")
-
-all_users = udb.get_all_users(conn)
-active_users = udb.count_active_users(conn)
-
-colA, colB = st.columns(2)
-colA.metric("Usuários cadastrados", len(all_users))
-colB.metric("Usuários ativos", active_users)
-
-with colA:
-    with st.container(horizontal=True):
-        # -------------------------------------------------------------------
-        # SEÇÃO 2 — ADICIONAR NOVO USUÁRIO
-        # -------------------------------------------------------------------
-        @st.dialog('Criador de usuários', width='large')
-        def criar_novo_usuario():
-            with st.form("create_new_user_form"):
-                new_name = st.text_input("Nome completo")
-                new_email = st.text_input("Email")
-                new_password = st.text_input("Senha", type="password")
-                #new_contract_id = st.text_input("Contract ID")
-                new_status = st.selectbox("Status inicial", ["active", "revoked"])
-
-                submitted = st.form_submit_button("Criar usuário")
-
-                if submitted:
-                    if not new_name or not new_email or not new_password:
-                        st.error("Preencha todos os campos obrigatórios.")
-                    else:
-                        salt = secrets.token_hex(16)
-                        hashed = hashlib.sha256((salt+new_password).encode()).hexdigest()
-
-                        result = udb.insert_new_user(
-                            conn, new_name, new_email, hashed, salt, new_status
-                        )
-
-                        if result:
-                            st.success(f"Usuário **{new_name}** criado com sucesso!")
-                            st.rerun()
-                        else:
-                            st.error("Erro ao criar usuário!")
-        if st.button('Criar usuário', type="primary"):
-            criar_novo_usuario()
-
-        # -------------------------------------------------------------------
-        # SEÇÃO 3 — GERENCIAR USUÁRIO
-        # -------------------------------------------------------------------
-        @st.dialog('Gerenciador de Usuários', width='large')
-        def gerenciar_usuario():
-            emails = [u["user_email"] for u in all_users]
-            selected_email = st.selectbox("Selecione um usuário", emails)
-
-            if selected_email:
-                usr = [u for u in all_users if u["user_email"] == selected_email][0]
-
-                st.write(f"**Nome:** {usr['user_name']}")
-                st.write(f"**Status atual:** `{usr['contract_status']}`")
-                st.write("")
-
-                col1, col2, col3 = st.columns(3)
-
-                # ---------- ATIVAR ----------
-                if col1.button("Liberar acesso", key="liberar"):
-                    udb.update_user_status(conn, selected_email, "active")
-                    st.success("Acesso liberado!")
-                    st.rerun()
-
-                # ---------- REVOGAR ----------
-                if col2.button("Revogar acesso", key="revogar"):
-                    udb.update_user_status(conn, selected_email, "revoked")
-                    st.warning("Acesso revogado!")
-                    st.rerun()
-
-                # ---------- APAGAR ----------
-                if col3.button("🗑 Apagar usuário", key="delete"):
-                    udb.delete_user(conn, selected_email)
-                    st.error("Usuário removido!")
-                    st.rerun()
-        if st.button('Gerenciar Usuários', type="primary"):
-            gerenciar_usuario()
-
-st.divider()
-# -------------------------------------------------------------------
-# SEÇÃO 4 — LISTA DE USUÁRIOS
+# SEÇÃO 5 — CACHE DE CANDLES E SESSÕES (TRADINGVIEW)
 # -------------------------------------------------------------------
-st.subheader("Usuários cadastrados")
-
-expanded = st.expander("📋 Visualizar tabela completa", expanded=True)
-with expanded:
+with st.expander("📈 Cache de candles (TradingView)"):
+    cache_stats = candle_cache.stats()
+    c1, c2, c3, c4 = st.columns(4)
+    c1.metric("Séries em cache", f"{cache_stats['entries']} / {cache_stats['max_entries']}")
+    c2.metric("Acertos", cache_stats["hits"])
+    c3.metric("Falhas", cache_stats["misses"])
+    c4.metric("Coalescidas", cache_stats["coalesced"])
+    st.caption(f"Taxa de acerto: {cache_stats['hit_ratio']:.1%}")
+
+    st.write("**Sessões TvDatafeed**")
     st.dataframe(
-        [{k: v for k, v in user.items() if k != "password" and k != "salt"}
-         for user in all_users],
+        [{"credencial": key, **pool_stats} for key, pool_stats in tv_pool.stats().items()],
         use_container_width=True
     )
 
-
+# -------------------------------------------------------------------
+# SEÇÃO 6 — POOL DE CONEXÕES MYSQL
+# -------------------------------------------------------------------
+with st.expander("🗄️ Pool de conexões MySQL"):
+    pool_stats = udb.pool_stats()
+    c1, c2, c3, c4 = st.columns(4)
+    c1.metric("Em uso", f"{pool_stats['in_use']} / {pool_stats['max_size']}")
+    c2.metric("Ociosas", pool_stats["idle"])
+    c3.metric("Espera média (ms)", f"{pool_stats['wait_avg_ms']:.1f}")
+    c4.metric("Espera máxima (ms)", f"{pool_stats['wait_max_ms']:.1f}")
+    st.caption(f"Empréstimos: {pool_stats['checkouts']} · conexões abertas: {pool_stats['created']} · "
+               f"reconexões: {pool_stats['reconnects']} · esgotamentos: {pool_stats['timeouts']}")
@@ -1,19 +1,26 @@
 import streamlit as st
 import pandas as pd
-import os, json, time
-from openai import OpenAI
-import pymysql
+import json, time
 import include.users_database as udb
+import include.dataset_encoder as dataset_encoder
+import include.jobs as jobs
+import include.telemetry as telemetry
+from include.automation import run_automation
+import include.premarket as premarket
+import include.analysis_history as analysis_history
+import include.presets_repository as presets_repository
+import include.symbol_catalog as symbol_catalog
+import include.resampling as resampling
+from include.tv_collector import check_symbols, short_bars_message
 from dotenv import load_dotenv
 load_dotenv()
-# Dependência: tvdatafeed (usa websocket internamente)
-from tvDatafeed import TvDatafeed, Interval
 #st.write(st.session_state)
 # ======================================================================
 # CONFIGURAÇÃO INICIAL
 # ======================================================================
 PRESETS_FILE = "presets.json"
-client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+# endpoint /metrics do processo (include/telemetry.py); sobe uma vez por processo
+telemetry.start_metrics_server()
 
 st.set_page_config(
     page_title='Raidan Data Collector + AI Agent (TradingView)',
@@ -28,6 +35,7 @@ def logout():
     st.session_state.logged_in = False
     st.session_state.expiration = 0
     st.session_state.email = ''
+    st.session_state.job_id = None
 
     from streamlit_cookies_controller import CookieController
     CookieController().set('logged_in', False)
@@ -44,109 +52,58 @@ def logout():
 if 'resposta' not in st.session_state:
     st.session_state.resposta = None
 
-# ======================================================================
-# HELPERS: TradingView collector
-# ======================================================================
-
-# Observação: mapping de símbolos — ajuste conforme necessário.
-# Entrada esperada pelo usuário (na UI): lista de símbolos separados por vírgula.
-# Você pode passar símbolos do TradingView já no formato EXCHANGE:SYMBOL (ex: "BMF:WIN$N" ou "BMFBOVESPA:WIN1!").
-# Se o usuário passar "WIN$N" o código tentará mapear automaticamente para "WIN1!" na BMFBOVESPA.
-DEFAULT_TV_MAPPING = {
-    "WIN$N": ("WIN1!", "BMFBOVESPA"),
-    "WDO$N": ("WDO1!", "BMFBOVESPA"),
-    "DI1$N": ("DI1!", "BMFBOVESPA"),
-    # adicione outras traduções se quiser
-}
-
-def parse_user_symbol(sym: str):
-    """
-    Recebe 'WIN$N' ou 'BMFBOVESPA:WIN1!' ou 'EXCHANGE:SYMBOL'.
-    Retorna (symbol, exchange).
-    """
-    s = sym.strip()
-    if ":" in s:
-        symbol, exchange = s.split(":", 1)
-        return symbol.strip(), exchange.strip()
-    # fallback para mapping
-    if s in DEFAULT_TV_MAPPING:
-        return DEFAULT_TV_MAPPING[s]
-    # heurística: tratar pontos como exchange e parte após . como symbol (ex: "BMF.WIN1!")
-    if "." in s:
-        ex, sym = s.split(".", 1)
-        return sym.strip(), ex.strip()
-    # se tudo falhar, assume símbolo puro e BMFBOVESPA
-    return s, "BMFBOVESPA"
-
-def collect_tv_all(ativos_b3, ativos_fx, bars, tv_username=None, tv_password=None):
-    """
-    Coleta séries históricas de TradingView via tvDatafeed.
-    Retorna DataFrame concatenado com colunas: symbol, exchange, datetime, open, high, low, close, volume
-    - bars: número de barras a coletar (por símbolo)
-    """
-    # tvdatafeed aceita credenciais (opcional). Se None, tenta anonymous (pode falhar para alguns símbolos).
-    if tv_username and tv_password:
-        tv = TvDatafeed(tv_username, tv_password)
-    else:
-        tv = TvDatafeed()  # anonymous mode (pode funcionar para muitos símbolos)
-
-    frames = []
-    # helper para buscar lista de símbolos
-    def fetch_list(symbol_list, label):
-        for s in symbol_list:
-            sym = s.strip()
-            if not sym:
-                continue
-            symbol, exchange = parse_user_symbol(sym)
-            try:
-                # Usamos Interval.in_1_minute; ajuste se quiser outro intervalo
-                # tv.get_hist(symbol, exchange, interval=Interval.in_1_minute, n_bars=bars)
-                df = tv.get_hist(symbol, exchange, interval=Interval.in_1_minute, n_bars=bars)
-                if df is None or df.empty:
-                    st.warning(f"Nenhum dado para {symbol}:{exchange}")
-                    continue
-                # tvDatafeed retorna index datetime
-                df = df.reset_index().rename(columns={"index":"datetime"})
-                df["symbol"] = symbol
-                df["exchange"] = exchange
-                # normalizar colunas
-                df = df[["symbol","exchange","datetime","open","high","low","close","volume"]]
-                frames.append(df)
-                time.sleep(0.2)  # throttle leve
-            except Exception as e:
-                st.error(f"Erro coletando {symbol}:{exchange} — {e}")
-    fetch_list(ativos_b3, "B3")
-    fetch_list(ativos_fx, "FX")
-    if frames:
-        df_all = pd.concat(frames, ignore_index=True)
-        # garantir ordenação e formatação
-        df_all = df_all.sort_values(["symbol","datetime"]).reset_index(drop=True)
-        # transformar datetime para ISO UTC if tz-aware
-        if not pd.api.types.is_datetime64_any_dtype(df_all["datetime"]):
-            df_all["datetime"] = pd.to_datetime(df_all["datetime"])
-        df_all["timestamp_utc"] = df_all["datetime"].dt.tz_localize(None).dt.strftime("%Y-%m-%dT%H:%M:%SZ")
-        return df_all
-    return pd.DataFrame()
-
 # ======================================================================
 # UTILIDADES (mesmas do seu app)
 # ======================================================================
-def load_file_text(path: str) -> str:
-    """Lê arquivo inteiro em texto."""
-    with open(path, "r", encoding="utf-8") as f:
-        return f.read()
-
-def ask_agent_with_inline_csv(prompt: str, path: str, model: str) -> str:
-    """Envia CSV inline via Responses API."""
-    csv_text = load_file_text(path)
-    response = client.responses.create(
-        model=model,
-        input=[
-            {"role": "system", "content": prompt},
-            {"role": "user", "content": f"Aqui está o dataset em CSV:\n\n```csv\n{csv_text}\n```"}
-        ]
+def trade_idea_html(t: dict) -> str:
+    """Card HTML de uma operação sugerida pelo agente."""
+    # Escolhe cor conforme direção
+    color = "#4CAF50" if t.get("direction") == "LONG" else "#FF5252"
+    txt_direcao = "COMPRA" if t.get("direction") == "LONG" else "VENDA"
+
+    return (
+        f"""
+                        <div style="
+                            padding: 18px;
+                            border-radius: 12px;
+                            margin-bottom: 15px;
+                            border: 1px solid #333;
+                            background-color: #1e1e1e;
+                        ">
+                            <h3 style="margin: 0; color: {color};">{txt_direcao} — Operação #{t.get('id')}</h3>
+                            <hr style="opacity: 0.2;">
+    
+                            <div style="display: flex; gap: 1em; flex-wrap: wrap;">
+    
+                                <div style="flex: 1;">
+                                    <div style="color: #aaa;">Entrada</div>
+                                    <div style="font-size: 18px; font-weight: 600;">{t.get("entry_price"):.0f}</div>
+                                </div>
+    
+                                <div style="flex: 1;">
+                                    <div style="color: #aaa;">Alvo</div>
+                                    <div style="font-size: 18px; font-weight: 600;">{t.get("target_price"):.0f} <a style="font-size: 12px">({abs(t.get("entry_price")-t.get("target_price"))} pts)</a></div>
+                                </div>
+    
+                                <div style="flex: 1;">
+                                    <div style="color: #aaa;">Stop</div>
+                                    <div style="font-size: 18px; font-weight: 600;">{t.get("stop_price"):.0f} <a style="font-size: 12px">({abs(t.get("entry_price")-t.get("stop_price"))} pts)</a></div>
+                                </div>
+    
+                                <div style="flex: 1;">
+                                    <div style="color: #aaa;">Risco (%)</div>
+                                    <div style="font-size: 18px; font-weight: 600;">{t.get("position_size_pct")}%</div>
+                                </div>
+    
+                                <div style="flex: 1;">
+                                    <div style="color: #aaa;">Confiança (%)</div>
+                                    <div style="font-size: 20px; font-weight: 600;">{t.get("confidence_pct")}%</div>
+                                </div>
+    
+                            </div>
+                        </div>
+                        """
     )
-    return response.output_text
 
 # def carregar_presets() -> dict:
 #     if os.path.exists(PRESETS_FILE):
@@ -170,101 +127,122 @@ def ask_agent_with_inline_csv(prompt: str, path: str, model: str) -> str:
 #   NOVA INTERFACE DE PRESET
 #=======================================================================
 def listar_presets() -> dict:
-    conn = udb.create_connection()
-    if conn is None:
-        return {}
-
-    query = """
-        SELECT name, config
-        FROM presets
-        WHERE user_id = %s
-        ORDER BY name
-    """
-
-    with conn.cursor(pymysql.cursors.DictCursor) as cursor:
-        cursor.execute(query, (st.session_state.user_id,))
-        rows = cursor.fetchall()
-
-    conn.close()
+    # cache por usuário com invalidação nas escritas (include/presets_repository.py)
+    return presets_repository.list_presets(st.session_state.user_id)
 
-    return {
-        row["name"]: json.loads(row["config"])
-        for row in rows
-    }
 
-    return {row["name"]: json.loads(row["config"]) for row in rows}
 def salvar_preset(nome: str, dados: dict):
-    conn = udb.create_connection()
-    if conn is None:
-        return False
-
-    query = """
-        INSERT INTO presets (user_id, name, config)
-        VALUES (%s, %s, %s)
-        ON DUPLICATE KEY UPDATE
-            config = VALUES(config),
-            updated_at = CURRENT_TIMESTAMP
-    """
-
-    with conn.cursor() as cursor:
-        cursor.execute(
-            query,
-            (
-                st.session_state.user_id,
-                nome,
-                json.dumps(dados, ensure_ascii=False)
-            )
-        )
-        conn.commit()
+    return presets_repository.save_preset(st.session_state.user_id, nome, dados)
+
 
-    conn.close()
-    return True
 def deletar_preset(nome: str):
-    conn = udb.create_connection()
-    if conn is None:
-        return False
-
-    query = """
-        DELETE FROM presets
-        WHERE user_id = %s AND name = %s
-    """
-
-    with conn.cursor() as cursor:
-        cursor.execute(
-            query,
-            (st.session_state.user_id, nome)
-        )
-        conn.commit()
+    return presets_repository.delete_preset(st.session_state.user_id, nome)
+
+@st.fragment(run_every=2)
+def acompanhar_job(job_id):
+    """Acompanha o job da automação (polling) e carrega a resposta quando ele terminar."""
+    job = jobs.get(job_id)
+    if job is None:
+        st.session_state.job_id = None
+        return
+
+    if job["status"] == "done":
+        st.session_state.resposta = job["result"]["resposta"]
+        st.session_state.dataset_report = job["result"]["dataset_report"]
+        st.rerun()
+    elif job["status"] == "failed":
+        st.error(f"Erro na automação: {job.get('error')} (trace_id `{job.get('trace_id') or job['id']}`)")
+        if st.button("Fechar", key="fechar_job"):
+            jobs.dismiss(job_id)
+            st.session_state.job_id = None
+            st.rerun()
+    else:
+        st.progress(job.get("progress", 0.0), text=job.get("stage", "Na fila..."))
+        st.caption(f"trace_id: `{job.get('trace_id') or job['id']}`")
 
-    conn.close()
-    return True
+    for level, text in job.get("mensagens", []):
+        if level in ("warning", "skipped"):
+            st.warning(text)
+        else:
+            st.error(text)
+    if job.get("parciais"):
+        with st.expander(f"Ativos recebidos ({len(job['parciais'])})", expanded=job["status"] in jobs.ACTIVE):
+            st.dataframe(job["parciais"], use_container_width=True)
+
+    # prévia: cada operação aparece assim que o JSON dela fica completo
+    previa = job.get("previa")
+    if previa:
+        if previa.get("trend_summary"):
+            st.subheader("Resumo do Cenário")
+            st.write(previa["trend_summary"])
+        for t in previa.get("trade_ideas", []):
+            try:
+                st.html(trade_idea_html(t))
+            except (TypeError, ValueError):
+                st.json(t)
+
+@st.fragment
+def historico(user_id):
+    """Histórico paginado do usuário; abrir uma análise não chama TradingView nem OpenAI."""
+    total = analysis_history.count(user_id)
+    if not total:
+        st.caption("Nenhuma análise no histórico ainda.")
+        return
+    paginas = max(1, -(-total // analysis_history.HISTORY_PAGE_SIZE))
+    st.session_state.historico_pagina = min(st.session_state.get("historico_pagina", 1), paginas)
+    pagina = st.number_input("Página", min_value=1, max_value=paginas, step=1, key="historico_pagina")
+    st.caption(f"{total} análises · página {pagina} de {paginas}")
+
+    for item in analysis_history.list_page(user_id, pagina):
+        c1, c2 = st.columns([0.85, 0.15], vertical_alignment="center")
+        with c1:
+            st.markdown(f'**{item["created_at"]:%d/%m/%Y %H:%M}** · {item["ativo_alvo"] or "-"} · '
+                        f'{item["model"]} · {item["operacoes"]} operações'
+                        + (' · cache' if item["from_cache"] else ''))
+            if item["resumo"]:
+                st.caption(item["resumo"])
+        with c2:
+            if st.button("Abrir", key=f'historico_{item["id"]}'):
+                analise = analysis_history.get(user_id, item["id"])
+                if analise is None:
+                    st.error("Análise não encontrada.")
+                else:
+                    st.session_state.resposta = analise["resposta"]
+                    st.session_state.dataset_report = analise["dataset_report"]
+                    st.rerun()
 
 # ======================================================================
 # UI (muito parecido com o seu original)
 # ======================================================================
 
 if 'logged_in' in st.session_state and st.session_state.logged_in:
-    conn = udb.create_connection()
-    name = udb.get_user_info(conn, "user_name", "users", st.session_state.email)[0][0]
+    # perfil vem do cache do processo (carregado no login); sem consulta por rerun
+    perfil = udb.get_user_profile(st.session_state.email)
+    name = perfil["user_name"]
 
     st.sidebar.write(f"👋 Bem-vindo, {(name.split()[0]).capitalize()}")
-    conn.close()
     if st.sidebar.button("Sair", icon=':material/logout:', type='primary'):
         logout()
     st.sidebar.write('---')
 
     if st.session_state.resposta is None:
         st.title("Assistente de Pré-Mercado (TradingView)")
-        conn = udb.create_connection()
-        st.session_state.user_id = udb.get_user_info(conn, "id", "users", st.session_state.email)[0][0]
-        conn.close()
+        st.session_state.user_id = perfil["id"]
+
+        # retoma a última automação do usuário (ex.: após recarregar a página)
+        if not st.session_state.get("job_id"):
+            ultimo_job = jobs.latest_for_user(st.session_state.user_id)
+            if ultimo_job:
+                st.session_state.job_id = ultimo_job["id"]
 
         defaults = {
             "ativos_b3": "WIN1!:BMFBOVESPA,WDO1!:BMFBOVESPA,DI11!:BMFBOVESPA,PETR4:BMFBOVESPA, VALE3:BMFBOVESPA, IFNC:BMFBOVESPA",
             "ativos_fx": "US500:TICKMILL,US30:TICKMILL,USTEC:TICKMILL,DXY:TICKMILL,CL1!:NYMEX",
             "ativo_alvo": "WIN1!:BMFBOVESPA",
             "bars": 100,
-            "model": "gpt-5-2025-08-07"
+            "model": "gpt-5-2025-08-07",
+            "dataset_format": "csv",
+            "timeframes": ["1m"]
         }
 
         st.sidebar.subheader("🔧 Configuração")
@@ -274,6 +252,17 @@ if 'logged_in' in st.session_state and st.session_state.logged_in:
         preset_selected = st.sidebar.selectbox("Carregar Configuração", ["Nenhum"] + preset_names)
         if preset_selected != "Nenhum":
             defaults.update(presets[preset_selected])
+            # análise já calculada pelo batch pré-mercado (include/premarket.py)
+            # (só vale para a config atual do preset; consulta em cache por versão dos presets)
+            pre_calculada = premarket.get_result(st.session_state.user_id, preset_selected,
+                                                 presets[preset_selected],
+                                                 presets_repository.cached_version(st.session_state.user_id))
+            if pre_calculada:
+                st.sidebar.info(f"Análise pré-mercado pronta ({pre_calculada['created_at']:%H:%M})")
+                if st.sidebar.button("Abrir análise pré-calculada", type='primary'):
+                    st.session_state.resposta = pre_calculada["resposta"]
+                    st.session_state.dataset_report = pre_calculada["dataset_report"]
+                    st.rerun()
 
         # Inputs principais
         col1, col2 = st.columns(2, gap='large')
@@ -285,9 +274,38 @@ if 'logged_in' in st.session_state and st.session_state.logged_in:
                 st.session_state.ativos_fx = st.text_input("Ativos FX", defaults["ativos_fx"])
 
         st.session_state.ativo_alvo = st.text_input("Ativo alvo", defaults["ativo_alvo"])
+
+        # validação contra o catálogo local de símbolos (sem chamadas de rede)
+        verificacao = check_symbols((st.session_state.ativos_b3 + "," + st.session_state.ativos_fx).split(","))
+        sem_dados = [f"{digitado} ({detalhe})" for digitado, _, _, status, detalhe in verificacao if status == "bad"]
+        nunca_coletados = [digitado for digitado, _, _, status, _ in verificacao if status == "unknown"]
+        if sem_dados:
+            st.warning("Sem dados na última coleta (serão ignorados por enquanto): " + ", ".join(sem_dados))
+        if nunca_coletados:
+            st.caption("Ainda não coletados: " + ", ".join(nunca_coletados))
+        with st.expander("🔎 Buscar símbolo no catálogo"):
+            busca_simbolo = st.text_input("Início do símbolo", key="busca_simbolo")
+            sugestoes = symbol_catalog.suggest(busca_simbolo)
+            if sugestoes:
+                st.code(", ".join(sugestoes), language=None)
+            elif busca_simbolo:
+                st.caption("Nenhum símbolo conhecido com esse início.")
         st.session_state.bars = st.sidebar.slider("Número de barras", 1, 500, defaults["bars"])
+        # só o 1m vem do TradingView; os demais são agregados localmente (include/resampling.py)
+        st.session_state.timeframes = st.sidebar.multiselect(
+            "Timeframes", list(resampling.TIMEFRAMES), default=defaults["timeframes"],
+            help=f"O número de barras vale para cada timeframe, até o que cabe em "
+                 f"{resampling.TV_MAX_BASE_BARS} barras de 1m (timeframes maiores podem vir com menos)."
+        )
         model_list = ["gpt-5", "gpt-5-2025-08-07", "gpt-5.1", "gpt-5.1-chat-latest", "gpt-5-pro", "gpt-5-nano", "o3-pro", "gpt-4.1"]
         st.session_state.model = st.sidebar.selectbox("Modelo", model_list, index=model_list.index(defaults["model"]))
+        st.session_state.stream_resposta = st.sidebar.toggle("Mostrar operações em tempo real", value=True)
+        formatos = list(dataset_encoder.ENCODINGS)
+        st.session_state.dataset_format = st.sidebar.selectbox(
+            "Formato do dataset", formatos,
+            index=formatos.index(defaults["dataset_format"]),
+            format_func=dataset_encoder.ENCODINGS.get,
+        )
 
         if st.sidebar.button("💾 Salvar Preset"):
             if not novo_nome_preset:
@@ -328,85 +346,42 @@ if 'logged_in' in st.session_state and st.session_state.logged_in:
             #tv_user = st.text_input("TV username (opcional)")
             #tv_pass = st.text_input("TV password (opcional)", type="password")
 
-        def build_system_prompt(ativo_alvo: str) -> str:
-            formato_saida = '''\nFormato de saída (obrigatório — responda exatamente neste formato):
-                            {
-                              "timestamp_utc": "YYYY-MM-DDTHH:MM:SS",
-                              "trend_summary": "frase curta",
-                              "trade_ideas": [
-                                {
-                                  "id": 1,
-                                  "direction": "LONG" | "SHORT",
-                                  "entry_price": number,
-                                  "target_price": number,
-                                  "stop_price": number,
-                                  "position_size_pct": number,
-                                  "confidence_pct": number,
-                                  "rationale": "2-4 linhas explicando micro+macro",
-                                  "invalidating_signals": ["evento1","nivel tecnico X"]
-                                }
-                              ],
-                              "key_indicators_used": ["lista curta de indicadores"],
-                              "assumptions": ["assump1","assump2"]
-                            }'''
-            system_prompt_2 = f'''
-                            Você é um analista quantitativo com foco em operações de daytrade em {ativo_alvo}.
-Seu papel é enviar as melhores sugestões de preços de compra e de venda do mini índice de acordo com o fechamento do pregão anterior e com base nas informações dos ativos correlacionados com esse mercado (ex.: Juros, Petróleo, Ferro, Milho, Nasdaq, Nikkei)
-
-Importante ter informações micro e macro para que possamos entender os movimentos do mercado e especular sobre o que poderá acontecer durante o dia.
-
-Resumindo:
-
-0. Estabeleça quais os ativos mais relevantes para sabermos o que poderá acontecer com o índice ibovespa futuro;
-
-1. Aguarde o usuário enviar todos os dados;
-
-2. Pense por algum tempo e faça uma relação cruzada de informações;
-
-3. Sugira os principais pontos de compra ou de venda desse ativo com alvos de, pelo menos, 0.22% mas traga os alvos e stops em pontos;
-                            '''
-            return system_prompt_2+formato_saida
-
         st.sidebar.divider()
-        if st.sidebar.button("Executar Automação", type='primary'):
-            # 1. coleta
-            try:
-                with st.spinner("Coletando dados via TradingView (tvdatafeed)..."):
-                    ativos_b3_list = [a.strip() for a in st.session_state.ativos_b3.split(",") if a.strip()]
-                    ativos_fx_list = [a.strip() for a in st.session_state.ativos_fx.split(",") if a.strip()]
-                    df_tv = collect_tv_all(ativos_b3_list, ativos_fx_list, st.session_state.bars, "" or None, "" or None)
-            except Exception as e:
-                st.error(f"Erro ao coletar TV: {e}")
-                df_tv = pd.DataFrame()
+        job = jobs.get(st.session_state.job_id) if st.session_state.get("job_id") else None
+        em_andamento = job is not None and job["status"] in jobs.ACTIVE
+        if st.sidebar.button("Executar Automação", type='primary', disabled=em_andamento):
+            # coleta -> CSV -> agente rodam em segundo plano (include/automation.py)
+            params = {
+                "ativos_b3": st.session_state.ativos_b3,
+                "ativos_fx": st.session_state.ativos_fx,
+                "ativo_alvo": st.session_state.ativo_alvo,
+                "bars": st.session_state.bars,
+                "model": st.session_state.model,
+                "dataset_format": st.session_state.dataset_format,
+                "timeframes": st.session_state.timeframes,
+                "stream_resposta": st.session_state.stream_resposta,
+                # grava a análise no histórico do usuário (include/analysis_history.py)
+                "user_id": st.session_state.user_id,
+            }
+            st.session_state.job_id = jobs.submit(st.session_state.user_id, run_automation, params)
+            st.rerun()
 
-            if df_tv.empty:
-                st.warning("Nenhum dado coletado. Verifique símbolos/credenciais.")
-                st.stop()
+        if st.session_state.get("job_id"):
+            acompanhar_job(st.session_state.job_id)
 
-            # 2. salva CSV
-            df_all = df_tv.copy()
-            os.makedirs("data", exist_ok=True)
-            csv_path = os.path.join("data", "generated_tv.csv")
-            df_all.to_csv(csv_path, index=False)
-            st.toast(f"CSV salvo em {csv_path}")
-
-            # 3. envia para agente
-            with st.spinner("Consultando agente..."):
-                prompt = build_system_prompt(st.session_state.ativo_alvo)
-                try:
-                    resposta = ask_agent_with_inline_csv(prompt, csv_path, st.session_state.model)
-                except Exception as e:
-                    st.error(f"Erro chamando o agente: {e}")
-                    st.stop()
-
-            st.session_state.resposta = resposta
-            st.rerun()
+        # só consulta o banco quando o usuário abre o histórico
+        st.divider()
+        if st.toggle("🕘 Histórico de análises", key="mostrar_historico"):
+            historico(st.session_state.user_id)
 
     else:
         st.set_page_config(initial_sidebar_state='collapsed', layout="wide")
         st.logo(r'images/logo_white.png')
 
         if st.sidebar.button('Nova Consulta'):
+            if st.session_state.get("job_id"):
+                jobs.dismiss(st.session_state.job_id)
+                st.session_state.job_id = None
             st.session_state.resposta = None
             st.rerun()
 
@@ -437,6 +412,21 @@ Resumindo:
         # Cabeçalho com timestamp e resumo da tendência
         # ---------------------------------------------------------
         st.caption(f'Data e hora da consulta {pd.to_datetime(data.get("timestamp_utc", "-"), yearfirst=True).strftime("%d/%m/%Y %H:%M")}')
+        if st.session_state.get("dataset_report"):
+            rel = st.session_state.dataset_report
+            st.caption(f'Dataset {dataset_encoder.ENCODINGS.get(rel["format"], rel["format"])}: '
+                       f'{rel["bytes_before"]:,} → {rel["bytes_after"]:,} bytes, '
+                       f'{rel["tokens_before"]:,} → {rel["tokens_after"]:,} tokens ({rel["token_counter"]}) · '
+                       f'agente respondeu em {rel["agent_seconds"]:.1f}s'
+                       + (f' (1ª operação em {rel["primeira_operacao"]:.1f}s)' if "primeira_operacao" in rel else '')
+                       + (' · resposta do cache' if rel.get("from_cache") else '')
+                       + (f' · trace_id `{rel["trace_id"]}`' if rel.get("trace_id") else ''))
+            coleta = rel.get("coleta")
+            if coleta and not coleta["completo"]:
+                st.caption(f'Coleta parcial: {coleta["recebidos"]}/{coleta["solicitados"]} ativos — faltaram '
+                           + ", ".join(f'{f["ativo"]} ({f["motivo"]})' for f in coleta["faltando"]))
+            if coleta and coleta.get("barras_curtas"):
+                st.warning(short_bars_message(coleta["barras_curtas"]))
         st.subheader(f"Resumo do Cenário")
         st.write(data.get("trend_summary", "-"))
 
@@ -450,53 +440,7 @@ Resumindo:
             col1, col2 = st.columns([0.65,0.35], gap='small')
             for t in trade_ideas:
                 with col1:
-                    # Escolhe cor conforme direção
-                    color = "#4CAF50" if t.get("direction") == "LONG" else "#FF5252"
-                    txt_direcao = "COMPRA" if t.get("direction") == "LONG" else "VENDA"
-
-                    st.html(
-                        f"""
-                                        <div style="
-                                            padding: 18px;
-                                            border-radius: 12px;
-                                            margin-bottom: 15px;
-                                            border: 1px solid #333;
-                                            background-color: #1e1e1e;
-                                        ">
-                                            <h3 style="margin: 0; color: {color};">{txt_direcao} — Operação #{t.get('id')}</h3>
-                                            <hr style="opacity: 0.2;">
-    
-                                            <div style="display: flex; gap: 1em; flex-wrap: wrap;">
-    
-                                                <div style="flex: 1;">
-                                                    <div style="color: #aaa;">Entrada</div>
-                                                    <div style="font-size: 18px; font-weight: 600;">{t.get("entry_price"):.0f}</div>
-                                                </div>
-    
-                                                <div style="flex: 1;">
-                                                    <div style="color: #aaa;">Alvo</div>
-                                                    <div style="font-size: 18px; font-weight: 600;">{t.get("target_price"):.0f} <a style="font-size: 12px">({abs(t.get("entry_price")-t.get("target_price"))} pts)</a></div>
-                                                </div>
-    
-                                                <div style="flex: 1;">
-                                                    <div style="color: #aaa;">Stop</div>
-                                                    <div style="font-size: 18px; font-weight: 600;">{t.get("stop_price"):.0f} <a style="font-size: 12px">({abs(t.get("entry_price")-t.get("stop_price"))} pts)</a></div>
-                                                </div>
-    
-                                                <div style="flex: 1;">
-                                                    <div style="color: #aaa;">Risco (%)</div>
-                                                    <div style="font-size: 18px; font-weight: 600;">{t.get("position_size_pct")}%</div>
-                                                </div>
-    
-                                                <div style="flex: 1;">
-                                                    <div style="color: #aaa;">Confiança (%)</div>
-                                                    <div style="font-size: 20px; font-weight: 600;">{t.get("confidence_pct")}%</div>
-                                                </div>
-    
-                                            </div>
-                                        </div>
-                                        """
-                    )
+                    st.html(trade_idea_html(t))
 
                 with col2:
                     # ---------------------------------------------------------
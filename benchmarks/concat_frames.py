@@ -0,0 +1,110 @@
+"""
+Micro-benchmark do pós-processamento de collect_tv_all (tv_collector.concat_frames).
+
+Compara o caminho anterior (reset_index/rename/seleção de colunas por símbolo,
+pd.concat, sort_values completo e strftime por linha) com o atual (buffers
+pré-alocados, symbol/exchange categóricos e timestamp_utc vetorizado).
+
+    python -m benchmarks.concat_frames --symbols 50 --bars 5000
+"""
+import argparse
+import time
+import numpy as np
+import pandas as pd
+import benchmarks.fakes as fakes
+
+# o coletor importa tvDatafeed: registra o módulo falso antes (como benchmarks/harness.py)
+fakes.install_fake_tvdatafeed()
+import include.tv_collector as tv_collector  # noqa: E402
+
+
+def fake_hist(symbol, exchange, bars, seed):
+    """DataFrame no formato do tvDatafeed.get_hist (index datetime, coluna symbol)."""
+    rng = np.random.default_rng(seed)
+    index = pd.date_range(end=pd.Timestamp("2024-06-03 17:00"), periods=bars, freq="min", name="datetime")
+    close = 100 + rng.standard_normal(bars).cumsum()
+    return pd.DataFrame({
+        "symbol": f"{exchange}:{symbol}",
+        "open": close + rng.standard_normal(bars) * 0.1,
+        "high": close + 1,
+        "low": close - 1,
+        "close": close,
+        "volume": rng.integers(1, 1000, bars).astype(float),
+    }, index=index)
+
+
+def legacy_normalize(raw, symbol, exchange):
+    df = raw.reset_index().rename(columns={"index": "datetime"})
+    df["symbol"] = symbol
+    df["exchange"] = exchange
+    return df[tv_collector.COLUMNS]
+
+
+def legacy_concat(frames):
+    df_all = pd.concat(frames, ignore_index=True)
+    df_all = df_all.sort_values(["symbol", "datetime"]).reset_index(drop=True)
+    df_all["timestamp_utc"] = df_all["datetime"].dt.tz_localize(None).dt.strftime("%Y-%m-%dT%H:%M:%SZ")
+    return df_all
+
+
+def current_normalize(raw, symbol, exchange):
+    # mesmo caminho de _load_symbol, sem a rede
+    data = {
+        "symbol": tv_collector._asset_column(symbol, len(raw)),
+        "exchange": tv_collector._asset_column(exchange, len(raw)),
+        "datetime": np.asarray(raw.index),
+    }
+    for column in tv_collector.COLUMNS[3:]:
+        data[column] = raw[column].to_numpy()
+    return pd.DataFrame(data)
+
+
+def best_of(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        inicio = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - inicio)
+    return min(times), float(np.median(times))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--symbols", type=int, default=50)
+    parser.add_argument("--bars", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=7)
+    args = parser.parse_args(argv)
+
+    assets = [(f"SYM{i:03d}", "BMFBOVESPA") for i in range(args.symbols)]
+    # chegada fora de ordem, como no as_completed do coletor
+    order = np.random.default_rng(0).permutation(len(assets))
+    raws = [(fake_hist(s, e, args.bars, i), s, e) for i, (s, e) in enumerate(assets)]
+    raws = [raws[i] for i in order]
+
+    def legacy():
+        return legacy_concat([legacy_normalize(r, s, e) for r, s, e in raws])
+
+    def current():
+        return tv_collector.concat_frames([current_normalize(r, s, e) for r, s, e in raws])
+
+    # os dois caminhos têm que produzir os mesmos dados
+    a, b = legacy(), current()
+    assert a["timestamp_utc"].tolist() == b["timestamp_utc"].tolist()
+    assert (a["symbol"].astype(str).to_numpy() == b["symbol"].astype(str).to_numpy()).all()
+    pd.testing.assert_frame_equal(a[tv_collector.COLUMNS[2:]], b[tv_collector.COLUMNS[2:]])
+
+    rows = args.symbols * args.bars
+    print(f"{args.symbols} símbolos x {args.bars} barras = {rows} linhas (melhor / mediana de {args.repeat})")
+    results = {}
+    for name, fn in (("anterior", legacy), ("atual", current)):
+        best, median = best_of(fn, args.repeat)
+        results[name] = best
+        print(f"  {name:<9} {best * 1000:8.1f} ms  {median * 1000:8.1f} ms")
+    print(f"  ganho     {results['anterior'] / results['atual']:8.1f}x")
+    memory = {"anterior": a.memory_usage(deep=True).sum(), "atual": b.memory_usage(deep=True).sum()}
+    print(f"  memória   {memory['anterior'] / 2 ** 20:.1f} MB -> {memory['atual'] / 2 ** 20:.1f} MB")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
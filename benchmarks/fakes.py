@@ -0,0 +1,198 @@
+"""
+Substitutos locais usados pelos benchmarks: TradingView (tvDatafeed) e a API da OpenAI.
+Nada aqui é importado pela aplicação.
+"""
+import sys
+import enum
+import json
+import time
+import types
+import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+import pandas as pd
+
+
+# ======================================================================
+# TVDATAFEED FALSO
+# ======================================================================
+class Interval(enum.Enum):
+    in_1_minute = "1"
+    in_3_minute = "3"
+    in_5_minute = "5"
+    in_15_minute = "15"
+    in_30_minute = "30"
+    in_45_minute = "45"
+    in_1_hour = "1H"
+    in_2_hour = "2H"
+    in_3_hour = "3H"
+    in_4_hour = "4H"
+    in_daily = "1D"
+    in_weekly = "1W"
+    in_monthly = "1M"
+
+
+class FakeTvConfig:
+    """Latência (segundos, com jitter relativo) e limite de barras por get_hist."""
+    login_latency = 0.2
+    latency = 0.15
+    jitter = 0.3
+    max_bars = 5000
+    calls = 0
+
+
+class TvDatafeed:
+    """Mesma interface usada pelo coletor: TvDatafeed(username, password).get_hist(...)."""
+
+    def __init__(self, username=None, password=None):
+        self.username = username
+        time.sleep(FakeTvConfig.login_latency)
+
+    def get_hist(self, symbol, exchange="NSE", interval=Interval.in_daily, n_bars=10,
+                 fut_contract=None, extended_session=False):
+        FakeTvConfig.calls += 1
+        jitter = FakeTvConfig.jitter
+        time.sleep(FakeTvConfig.latency * random.uniform(1 - jitter, 1 + jitter))
+        if symbol.upper().startswith("BAD"):
+            return None
+        n_bars = min(int(n_bars), FakeTvConfig.max_bars)
+        seconds = {"1": 60, "5": 300, "15": 900, "1H": 3600, "1D": 86400}.get(interval.value, 60)
+        end = pd.Timestamp.now().floor(f"{seconds}s")
+        index = pd.date_range(end=end, periods=n_bars, freq=f"{seconds}s", name="datetime")
+        # série determinística por símbolo (mesmos dados a cada chamada)
+        rng = np.random.default_rng(sum(map(ord, f"{exchange}:{symbol}")))
+        close = 100 + rng.standard_normal(n_bars).cumsum()
+        return pd.DataFrame({
+            "symbol": f"{exchange}:{symbol}",
+            "open": close + rng.standard_normal(n_bars) * 0.1,
+            "high": close + 0.5,
+            "low": close - 0.5,
+            "close": close,
+            "volume": rng.integers(1, 1000, n_bars).astype(float),
+        }, index=index)
+
+
+def install_fake_tvdatafeed():
+    """Registra o módulo falso como `tvDatafeed` (antes de importar include.tv_collector)."""
+    module = types.ModuleType("tvDatafeed")
+    module.Interval = Interval
+    module.TvDatafeed = TvDatafeed
+    sys.modules["tvDatafeed"] = module
+    return FakeTvConfig
+
+
+# ======================================================================
+# STUB DA API DA OPENAI (Responses API, com e sem streaming)
+# ======================================================================
+AGENT_RESPONSE = {
+    "timestamp_utc": "2024-06-03T12:00:00",
+    "trend_summary": "Viés comprador moderado (resposta do stub de benchmark)",
+    "trade_ideas": [
+        {"id": i, "direction": "LONG" if i % 2 else "SHORT", "entry_price": 125000 + 50 * i,
+         "target_price": 125300 + 50 * i, "stop_price": 124850 + 50 * i, "position_size_pct": 10,
+         "confidence_pct": 60, "rationale": "stub", "invalidating_signals": ["stub"]}
+        for i in range(1, 4)
+    ],
+    "key_indicators_used": ["stub"],
+    "assumptions": ["stub"],
+}
+
+
+class OpenAIStub:
+    """
+    Servidor HTTP local compatível com POST /v1/responses.
+    latency = tempo até a resposta completa; no streaming, é distribuído entre os trechos.
+    """
+
+    def __init__(self, latency=0.5, chunks=40, host="127.0.0.1", port=0):
+        self.latency = latency
+        self.chunks = chunks
+        self.requests = 0
+        self.text = json.dumps(AGENT_RESPONSE, ensure_ascii=False)
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                stub.requests += 1
+                if not self.path.rstrip("/").endswith("/responses"):
+                    self._json(404, {"error": {"message": f"rota desconhecida: {self.path}"}})
+                elif body.get("stream"):
+                    self._stream(body.get("model", "stub"), body)
+                else:
+                    time.sleep(stub.latency)
+                    self._json(200, stub._response(body.get("model", "stub"), request=body))
+
+            def _json(self, status, payload):
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _stream(self, model, request):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                text = stub.text
+                size = max(1, len(text) // stub.chunks)
+                pieces = [text[i:i + size] for i in range(0, len(text), size)]
+                self._event({"type": "response.created", "sequence_number": 0,
+                             "response": stub._response(model, status="in_progress", text="")})
+                for n, piece in enumerate(pieces, start=1):
+                    time.sleep(stub.latency / len(pieces))
+                    self._event({"type": "response.output_text.delta", "sequence_number": n,
+                                 "item_id": "msg_stub", "output_index": 0, "content_index": 0,
+                                 "delta": piece, "logprobs": []})
+                self._event({"type": "response.completed", "sequence_number": len(pieces) + 1,
+                             "response": stub._response(model, request=request)})
+                self.close_connection = True
+
+            def _event(self, payload):
+                self.wfile.write(f"event: {payload['type']}\ndata: {json.dumps(payload)}\n\n".encode("utf-8"))
+                self.wfile.flush()
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self._thread = threading.Thread(target=self.server.serve_forever, name="openai-stub", daemon=True)
+
+    def _response(self, model, status="completed", text=None, request=None):
+        text = self.text if text is None else text
+        # uso de tokens estimado (~4 caracteres por token), como a API devolve em "usage"
+        input_tokens = len(json.dumps(request.get("input", ""))) // 4 if request else 0
+        output_tokens = len(text) // 4
+        return {
+            "usage": {"input_tokens": input_tokens, "output_tokens": output_tokens,
+                      "total_tokens": input_tokens + output_tokens,
+                      "input_tokens_details": {"cached_tokens": 0},
+                      "output_tokens_details": {"reasoning_tokens": 0}},
+            "id": "resp_stub", "object": "response", "created_at": int(time.time()),
+            "model": model, "status": status, "parallel_tool_calls": False,
+            "tool_choice": "auto", "tools": [], "error": None, "incomplete_details": None,
+            "instructions": None, "metadata": {}, "temperature": None, "top_p": None,
+            "output": [{
+                "type": "message", "id": "msg_stub", "status": "completed", "role": "assistant",
+                "content": [{"type": "output_text", "text": text, "annotations": []}],
+            }] if text else [],
+        }
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
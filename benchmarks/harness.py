@@ -0,0 +1,342 @@
+"""
+Benchmark de ponta a ponta com substitutos locais (benchmarks/fakes.py):
+TradingView falso, stub HTTP da API da OpenAI e um banco MySQL descartável.
+
+Cada execução roda as funções reais da aplicação, na ordem de um usuário:
+    login    auth.verify_password (conexão do pool + consulta + hash)
+    presets  presets_repository.list_presets (o que app_tv.listar_presets chama)
+    admin    contadores + contagem + 1ª página da listagem de usuários
+    collect  tv_collector.collect_tv_all
+    encode   dataset_encoder.encode
+    agent    agent.ask_agent_with_dataset (o caminho do "Executar Automação")
+e mede p50/p95 por etapa e da execução inteira ("total"), para cada combinação de
+número de símbolos, barras e execuções simultâneas. O resultado é JSON.
+
+    python -m benchmarks.harness --symbols 5,20 --bars 100,1000 --concurrency 1,4 \\
+        --iterations 10 --output bench.json
+
+O banco descartável é um schema temporário criado (e apagado no fim) no servidor
+apontado por MYSQL_HOST/MYSQL_PORT/MYSQL_USER/MYSQL_PASSWORD. Sem servidor, use
+--no-db: as etapas login/presets/admin ficam de fora.
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import benchmarks.fakes as fakes
+
+BENCH_EMAIL = "bench@example.com"
+BENCH_PASSWORD = "bench-password"
+STAGES = ("login", "presets", "admin", "collect", "encode", "agent")
+
+
+def _ints(text):
+    return [int(x) for x in str(text).split(",") if x.strip()]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--symbols", type=_ints, default=[5, 20], help="lista de quantidades de símbolos (ex.: 5,20)")
+    parser.add_argument("--bars", type=_ints, default=[100, 1000], help="lista de barras por símbolo (ex.: 100,1000)")
+    parser.add_argument("--concurrency", type=_ints, default=[1], help="execuções simultâneas (ex.: 1,4)")
+    parser.add_argument("--iterations", type=int, default=10, help="execuções medidas por worker")
+    parser.add_argument("--warmup", type=int, default=1, help="execuções descartadas antes de medir")
+    parser.add_argument("--format", default="csv", help="formato do dataset (dataset_encoder.ENCODINGS)")
+    parser.add_argument("--stream", action="store_true", help="agente em streaming (como stream_resposta)")
+    parser.add_argument("--tv-latency", type=float, default=0.15, help="latência do get_hist falso (s)")
+    parser.add_argument("--tv-jitter", type=float, default=0.3, help="variação relativa da latência do get_hist")
+    parser.add_argument("--tv-login-latency", type=float, default=0.2, help="latência do login TvDatafeed falso (s)")
+    parser.add_argument("--tv-rps", type=float, default=None,
+                        help="limite de requisições/s do coletor (padrão: TV_REQUESTS_PER_SEC)")
+    parser.add_argument("--store", action="store_true", help="usa o store local de candles (SQLite temporário)")
+    parser.add_argument("--cache", action="store_true", help="usa o cache de séries entre execuções")
+    parser.add_argument("--agent-latency", type=float, default=0.5, help="latência do stub da OpenAI (s)")
+    parser.add_argument("--model", default="gpt-5-2025-08-07")
+    parser.add_argument("--no-db", action="store_true", help="sem MySQL: pula login/presets/admin")
+    parser.add_argument("--users", type=int, default=1000, help="usuários criados no banco descartável")
+    parser.add_argument("--presets", type=int, default=20, help="presets do usuário de benchmark")
+    parser.add_argument("--output", help="grava o JSON neste arquivo (padrão: stdout)")
+    return parser.parse_args(argv)
+
+
+# ======================================================================
+# AMBIENTE DESCARTÁVEL
+# ======================================================================
+class DisposableDatabase:
+    """Schema MySQL temporário: criado na entrada e apagado na saída."""
+
+    def __init__(self):
+        self.name = f"orbedash_bench_{uuid.uuid4().hex[:12]}"
+        self.created = False
+
+    def _connect(self):
+        import pymysql
+        return pymysql.connect(
+            host=os.getenv("MYSQL_HOST", "localhost"),
+            user=os.getenv("MYSQL_USER", "root"),
+            password=os.getenv("MYSQL_PASSWORD", ""),
+            port=int(os.getenv("MYSQL_PORT", 3306)),
+            connect_timeout=5,
+        )
+
+    def __enter__(self):
+        conn = self._connect()
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(f"CREATE DATABASE `{self.name}` CHARACTER SET utf8mb4")
+        finally:
+            conn.close()
+        self.created = True
+        # users_database lê MYSQL_DATABASE na importação
+        os.environ["MYSQL_DATABASE"] = self.name
+        return self
+
+    def __exit__(self, *exc):
+        if not self.created:
+            return
+        conn = self._connect()
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(f"DROP DATABASE IF EXISTS `{self.name}`")
+        finally:
+            conn.close()
+
+
+def prepare_environment(args, workdir, agent_base_url):
+    """Variáveis lidas pelos módulos da aplicação na importação: tudo aponta para workdir."""
+    os.environ.update({
+        "CANDLE_DB_PATH": os.path.join(workdir, "candles.db"),
+        "AGENT_CACHE_TTL": "0",  # mede a chamada ao agente, não o cache
+        "AGENT_CACHE_DIR": os.path.join(workdir, "agent_cache"),
+        "JOBS_DIR": os.path.join(workdir, "jobs"),
+        "DATASET_ARTIFACTS": "0",
+        "TELEMETRY_LOG": os.getenv("TELEMETRY_LOG", "0"),
+        "METRICS_PORT": "0",
+        "OPENAI_BASE_URL": agent_base_url,
+        "OPENAI_API_KEY": "bench",
+    })
+    config = fakes.install_fake_tvdatafeed()
+    config.latency = args.tv_latency
+    config.jitter = args.tv_jitter
+    config.login_latency = args.tv_login_latency
+    return config
+
+
+# O create_table do app não declara colunas que os bancos em produção já têm (access_lvl,
+# lido no login) e exige contract_id, que os cadastros do app não preenchem. O schema
+# descartável recebe esses ajustes aqui, sem mudar a DDL da aplicação.
+BENCH_SCHEMA_PATCHES = (
+    "ALTER TABLE users MODIFY contract_id VARCHAR(28) NULL",
+    "ALTER TABLE users ADD COLUMN access_lvl VARCHAR(20) NOT NULL DEFAULT 'User' AFTER contract_status",
+)
+
+
+def seed_database(args):
+    """Cria as tabelas, o usuário de benchmark, usuários de preenchimento e presets."""
+    import include.users_database as udb
+    import include.presets_repository as presets_repository
+
+    with udb.connection() as conn:
+        if conn is None:
+            raise RuntimeError("Sem conexão com o banco descartável")
+        udb.create_table(conn)
+        with conn.cursor() as cursor:
+            for statement in BENCH_SCHEMA_PATCHES:
+                cursor.execute(statement)
+        conn.commit()
+        presets_repository.create_tables(conn)
+        rows = [{"linha": 1, "user_name": "Benchmark", "user_email": BENCH_EMAIL,
+                 "password": BENCH_PASSWORD, "contract_status": "active"}]
+        rows += [{"linha": i + 2, "user_name": f"Usuário {i}", "user_email": f"user{i:06d}@example.com",
+                  "password": uuid.uuid4().hex, "contract_status": "active" if i % 5 else "revoked"}
+                 for i in range(max(args.users - 1, 0))]
+        udb.bulk_insert_users(conn, rows)
+        user_id = udb.get_user_auth(conn, BENCH_EMAIL)["id"]
+
+    for i in range(args.presets):
+        presets_repository.save_preset(user_id, f"Preset {i:02d}", {
+            "ativos_b3": "WIN$N,WDO$N", "ativos_fx": "EURUSD", "ativo_alvo": "WIN1!",
+            "bars": 500, "model": args.model, "dataset_format": "csv", "timeframes": ["1m"],
+        })
+    return user_id
+
+
+# ======================================================================
+# UMA EXECUÇÃO
+# ======================================================================
+def make_run(args, user_id, symbols, bars):
+    import include.users_database as udb
+    import include.presets_repository as presets_repository
+    import include.tv_collector as tv_collector
+    import include.dataset_encoder as dataset_encoder
+    from include.auth import verify_password
+    from include.agent import build_system_prompt, ask_agent_with_dataset
+
+    ativos = [f"SYM{i:03d}:BMFBOVESPA" for i in range(symbols)]
+    prompt = build_system_prompt(ativos[0])
+    on_event = (lambda kind, key, value: None) if args.stream else None
+
+    def run():
+        timings = {}
+
+        def stage(name, fn):
+            inicio = time.perf_counter()
+            result = fn()
+            timings[name] = time.perf_counter() - inicio
+            return result
+
+        inicio = time.perf_counter()
+        if user_id is not None:
+            def login():
+                with udb.connection() as conn:
+                    if not verify_password(conn, BENCH_EMAIL, BENCH_PASSWORD):
+                        raise RuntimeError("verify_password recusou o usuário de benchmark")
+
+            def admin():
+                with udb.connection() as conn:
+                    udb.user_counters(conn)
+                    udb.count_users(conn, status="active")
+                    udb.list_users(conn, page=1, page_size=50)
+
+            stage("login", login)
+            stage("presets", lambda: presets_repository.list_presets(user_id))
+            stage("admin", admin)
+        df = stage("collect", lambda: tv_collector.collect_tv_all(
+            ativos, [], bars, requests_per_sec=args.tv_rps, use_store=args.store, use_cache=args.cache))
+        if df.empty:
+            raise RuntimeError("collect_tv_all não retornou dados")
+        dataset = stage("encode", lambda: dataset_encoder.encode(df, args.format, ativo_alvo=ativos[0]))
+        stage("agent", lambda: ask_agent_with_dataset(prompt, dataset, args.model, on_event, encoding=args.format))
+        timings["total"] = time.perf_counter() - inicio
+        return timings
+
+    return run
+
+
+def summarize(samples):
+    """{etapa: {n, p50, p95, mean, min, max}} em milissegundos."""
+    summary = {}
+    for name in STAGES + ("total",):
+        values = np.array([s[name] for s in samples if name in s]) * 1000
+        if values.size == 0:
+            continue
+        p50, p95 = np.percentile(values, [50, 95])
+        summary[name] = {"n": int(values.size), "p50": round(float(p50), 3), "p95": round(float(p95), 3),
+                         "mean": round(float(values.mean()), 3), "min": round(float(values.min()), 3),
+                         "max": round(float(values.max()), 3)}
+    return summary
+
+
+def measure(run, iterations, concurrency, warmup):
+    for _ in range(warmup):
+        run()
+    samples, errors = [], []
+    lock = threading.Lock()
+
+    def worker():
+        for _ in range(iterations):
+            try:
+                timings = run()
+            except Exception as e:
+                with lock:
+                    errors.append(f"{type(e).__name__}: {e}")
+                continue
+            with lock:
+                samples.append(timings)
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for future in [executor.submit(worker) for _ in range(concurrency)]:
+            future.result()
+    wall = time.perf_counter() - inicio
+    return samples, errors, wall
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    workdir = tempfile.mkdtemp(prefix="orbedash_bench_")
+    agent_stub = fakes.OpenAIStub(latency=args.agent_latency).start()
+    tv = prepare_environment(args, workdir, agent_stub.base_url)
+    database = None if args.no_db else DisposableDatabase()
+    report = {
+        "meta": {
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "params": {k: v for k, v in vars(args).items() if k != "output"},
+            "database": None,
+        },
+        "results": [],
+    }
+    try:
+        user_id = None
+        if database is not None:
+            try:
+                database.__enter__()
+            except Exception as e:
+                raise SystemExit(f"Não foi possível criar o banco descartável ({e}); use --no-db para rodar sem MySQL")
+            report["meta"]["database"] = database.name
+            user_id = seed_database(args)
+
+        import pandas as pd
+        import include.dataset_encoder as dataset_encoder
+        if args.format not in dataset_encoder.ENCODINGS:
+            raise SystemExit(f"Formato desconhecido: {args.format}")
+        report["meta"]["pandas"] = pd.__version__
+
+        for symbols in args.symbols:
+            for bars in args.bars:
+                for concurrency in args.concurrency:
+                    tv_calls, agent_calls = tv.calls, agent_stub.requests
+                    run = make_run(args, user_id, symbols, bars)
+                    samples, errors, wall = measure(run, args.iterations, concurrency, args.warmup)
+                    result = {
+                        "symbols": symbols, "bars": bars, "concurrency": concurrency,
+                        "runs": len(samples), "errors": len(errors), "error_samples": errors[:5],
+                        "wall_seconds": round(wall, 3),
+                        "runs_per_second": round(len(samples) / wall, 3) if wall else None,
+                        "tv_requests": tv.calls - tv_calls, "agent_requests": agent_stub.requests - agent_calls,
+                        "stages_ms": summarize(samples),
+                    }
+                    report["results"].append(result)
+                    total = result["stages_ms"].get("total", {})
+                    print(f"[bench] symbols={symbols} bars={bars} concurrency={concurrency} "
+                          f"runs={len(samples)} errors={len(errors)} "
+                          f"total p50={total.get('p50', float('nan')):.0f}ms p95={total.get('p95', float('nan')):.0f}ms",
+                          file=sys.stderr)
+    finally:
+        agent_stub.stop()
+        if database is not None:
+            database.__exit__(None, None, None)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
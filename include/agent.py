@@ -0,0 +1,128 @@
+import os
+from openai import OpenAI
+import include.agent_cache as agent_cache
+import include.agent_stream as agent_stream
+import include.dataset_encoder as dataset_encoder
+import include.telemetry as telemetry
+from dotenv import load_dotenv
+load_dotenv()
+
+# ======================================================================
+# AGENTE OPENAI
+# ======================================================================
+# Fora do script da página para poder rodar em jobs de segundo plano.
+_client = None
+
+
+def get_client() -> OpenAI:
+    """Cliente OpenAI do processo (criado na primeira chamada)."""
+    global _client
+    if _client is None:
+        _client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+    return _client
+
+
+def load_file_text(path: str) -> str:
+    """Lê arquivo inteiro em texto."""
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def build_system_prompt(ativo_alvo: str) -> str:
+    formato_saida = '''\nFormato de saída (obrigatório — responda exatamente neste formato):
+                            {
+                              "timestamp_utc": "YYYY-MM-DDTHH:MM:SS",
+                              "trend_summary": "frase curta",
+                              "trade_ideas": [
+                                {
+                                  "id": 1,
+                                  "direction": "LONG" | "SHORT",
+                                  "entry_price": number,
+                                  "target_price": number,
+                                  "stop_price": number,
+                                  "position_size_pct": number,
+                                  "confidence_pct": number,
+                                  "rationale": "2-4 linhas explicando micro+macro",
+                                  "invalidating_signals": ["evento1","nivel tecnico X"]
+                                }
+                              ],
+                              "key_indicators_used": ["lista curta de indicadores"],
+                              "assumptions": ["assump1","assump2"]
+                            }'''
+    system_prompt_2 = f'''
+                            Você é um analista quantitativo com foco em operações de daytrade em {ativo_alvo}.
+Seu papel é enviar as melhores sugestões de preços de compra e de venda do mini índice de acordo com o fechamento do pregão anterior e com base nas informações dos ativos correlacionados com esse mercado (ex.: Juros, Petróleo, Ferro, Milho, Nasdaq, Nikkei)
+
+Importante ter informações micro e macro para que possamos entender os movimentos do mercado e especular sobre o que poderá acontecer durante o dia.
+
+Resumindo:
+
+0. Estabeleça quais os ativos mais relevantes para sabermos o que poderá acontecer com o índice ibovespa futuro;
+
+1. Aguarde o usuário enviar todos os dados;
+
+2. Pense por algum tempo e faça uma relação cruzada de informações;
+
+3. Sugira os principais pontos de compra ou de venda desse ativo com alvos de, pelo menos, 0.22% mas traga os alvos e stops em pontos;
+                            '''
+    return system_prompt_2+formato_saida
+
+
+def _record_usage(span, model, response, stats=None):
+    """Tokens da resposta no span (log), em stats e no contador orbedash_openai_tokens_total."""
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return
+    for kind in ("input_tokens", "output_tokens"):
+        value = getattr(usage, kind, None)
+        if value is not None:
+            span[kind] = value
+            if stats is not None:
+                stats[kind] = value
+            telemetry.inc("orbedash_openai_tokens_total", value, model=model, type=kind.split("_")[0])
+
+
+def ask_agent_with_inline_csv(prompt: str, path: str, model: str, on_event=None, stats=None) -> str:
+    """Lê o dataset de um arquivo e chama ask_agent_with_dataset."""
+    return ask_agent_with_dataset(prompt, load_file_text(path), model, on_event, stats)
+
+
+def ask_agent_with_dataset(prompt: str, dataset: str, model: str, on_event=None, stats=None,
+                           encoding: str = "csv") -> str:
+    """
+    Envia o dataset (texto já codificado, em memória) inline via Responses API.
+    - encoding: formato em que o dataset foi codificado (dataset_encoder.ENCODINGS); define
+      o rótulo, a descrição e o bloco de código da mensagem.
+    Respostas ficam em cache por (prompt, dataset, modelo) — ver include/agent_cache.py.
+    - on_event: se informado, usa streaming e chama on_event(tipo, chave, valor) para cada
+      campo/elemento do JSON assim que ele fica completo (ver include/agent_stream.py).
+    - stats: dict opcional preenchido com "from_cache" e, se a API foi chamada,
+      "input_tokens"/"output_tokens".
+    """
+    messages = [
+        {"role": "system", "content": prompt},
+        {"role": "user", "content": dataset_encoder.agent_message(dataset, encoding)}
+    ]
+    parser = agent_stream.IncrementalJsonParser()
+
+    def call():
+        with telemetry.span("openai.responses.create", model=model, stream=on_event is not None,
+                            input_chars=len(dataset), encoding=encoding) as span:
+            if on_event is None:
+                response = get_client().responses.create(model=model, input=messages)
+                _record_usage(span, model, response, stats)
+                return response.output_text
+
+            def on_delta(delta):
+                for event in parser.feed(delta):
+                    on_event(*event)
+            return agent_stream.stream_output_text(get_client(), model, messages, on_delta,
+                                                   lambda response: _record_usage(span, model, response, stats))
+
+    output_text, from_cache = agent_cache.get_or_call(prompt, messages[1]["content"], model, call)
+    if stats is not None:
+        stats["from_cache"] = from_cache
+    if from_cache and on_event is not None:
+        for event in parser.feed(output_text):
+            on_event(*event)
+    return output_text
@@ -0,0 +1,139 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from concurrent.futures import Future
+
+# ======================================================================
+# CACHE DE RESPOSTAS DO AGENTE (em disco, endereçado por conteúdo)
+# ======================================================================
+# Chave = sha256(prompt, dataset, modelo). Mesma entrada -> mesma resposta, sem nova chamada.
+AGENT_CACHE_DIR = os.getenv("AGENT_CACHE_DIR", os.path.join("data", "agent_cache"))
+# Validade de uma resposta em segundos (0 desativa o cache)
+AGENT_CACHE_TTL = float(os.getenv("AGENT_CACHE_TTL", 1800))
+# Tamanho máximo do diretório; as respostas mais antigas são apagadas primeiro
+AGENT_CACHE_MAX_MB = float(os.getenv("AGENT_CACHE_MAX_MB", 100))
+
+_lock = threading.Lock()
+_inflight = {}  # chave -> Future da chamada em andamento
+_stats = {"hits": 0, "misses": 0, "coalesced": 0}
+
+
+def cache_key(prompt: str, dataset: str, model: str) -> str:
+    digest = hashlib.sha256()
+    for part in (prompt, dataset, model):
+        data = part.encode("utf-8")
+        # prefixo de tamanho: evita colisões entre concatenações diferentes
+        digest.update(len(data).to_bytes(8, "big"))
+        digest.update(data)
+    return digest.hexdigest()
+
+
+def _path(key: str) -> str:
+    return os.path.join(AGENT_CACHE_DIR, f"{key}.json")
+
+
+def get(key: str):
+    """Resposta guardada para a chave, ou None se não existir/expirou."""
+    path = _path(key)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if time.time() - entry.get("created_at", 0) > AGENT_CACHE_TTL:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        return None
+    return entry["output_text"]
+
+
+def put(key: str, model: str, output_text: str):
+    os.makedirs(AGENT_CACHE_DIR, exist_ok=True)
+    tmp = _path(key) + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"created_at": time.time(), "model": model, "output_text": output_text}, f, ensure_ascii=False)
+    # troca atômica: leitores nunca veem um arquivo pela metade
+    os.replace(tmp, _path(key))
+    _evict()
+
+
+def _evict():
+    """Apaga expirados e, se passar do limite de tamanho, os mais antigos."""
+    try:
+        entries = [e for e in os.scandir(AGENT_CACHE_DIR) if e.name.endswith(".json")]
+    except OSError:
+        return
+    now = time.time()
+    files = []
+    for e in entries:
+        info = e.stat()
+        if now - info.st_mtime > AGENT_CACHE_TTL:
+            try:
+                os.remove(e.path)
+            except OSError:
+                pass
+        else:
+            files.append((info.st_mtime, info.st_size, e.path))
+    total = sum(size for _, size, _ in files)
+    limit = AGENT_CACHE_MAX_MB * 1024 * 1024
+    for _, size, path in sorted(files):
+        if total <= limit:
+            break
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            pass
+
+
+def get_or_call(prompt: str, dataset: str, model: str, call):
+    """
+    Devolve (resposta, veio_do_cache). Em caso de falta, executa call() uma única vez
+    por chave: submissões idênticas simultâneas esperam a mesma chamada.
+    """
+    if AGENT_CACHE_TTL <= 0:
+        return call(), False
+    key = cache_key(prompt, dataset, model)
+    cached = get(key)
+    if cached is not None:
+        with _lock:
+            _stats["hits"] += 1
+        return cached, True
+
+    with _lock:
+        future = _inflight.get(key)
+        leader = future is None
+        if leader:
+            _stats["misses"] += 1
+            future = Future()
+            _inflight[key] = future
+        else:
+            _stats["coalesced"] += 1
+    if not leader:
+        return future.result(), True
+
+    try:
+        output_text = call()
+        try:
+            put(key, model, output_text)
+        except OSError:
+            pass  # sem gravar em disco, a resposta continua válida
+    except BaseException as e:
+        with _lock:
+            _inflight.pop(key, None)
+        future.set_exception(e)
+        raise
+    # grava antes de liberar a chave: quem chegar depois já acha o arquivo
+    with _lock:
+        _inflight.pop(key, None)
+    future.set_result(output_text)
+    return output_text, False
+
+
+def stats() -> dict:
+    with _lock:
+        return dict(_stats)
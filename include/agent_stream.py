@@ -0,0 +1,111 @@
+import json
+
+# ======================================================================
+# STREAMING DA RESPOSTA DO AGENTE
+# ======================================================================
+# O agente responde um único objeto JSON (ver build_system_prompt). Enquanto o texto
+# chega, o parser abaixo entrega cada campo/elemento de primeiro nível assim que fecha:
+#   ("field", "trend_summary", "frase curta")
+#   ("item", "trade_ideas", {...})
+#   ("item", "key_indicators_used", "RSI")
+
+
+class IncrementalJsonParser:
+    """
+    Parser incremental para o objeto JSON raiz da resposta.
+    Emite strings de primeiro nível e elementos (objetos ou strings) de listas de primeiro nível.
+    Texto antes do primeiro '{' (ex.: cerca ```json) é ignorado.
+    """
+
+    def __init__(self):
+        self.buf = ""
+        self.pos = 0
+        self.started = False
+        self.finished = False
+        self.stack = []  # '{' ou '[' abertos
+        self.in_string = False
+        self.escape = False
+        self.string_start = None
+        self.expect_key = False
+        self.key = None  # chave corrente do objeto raiz
+        self.item_start = None
+
+    def feed(self, text: str) -> list:
+        self.buf += text
+        events = []
+        while self.pos < len(self.buf) and not self.finished:
+            ch = self.buf[self.pos]
+            if not self.started:
+                if ch == "{":
+                    self.started = True
+                    self.stack.append("{")
+                    self.expect_key = True
+            elif self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif ch == "\\":
+                    self.escape = True
+                elif ch == '"':
+                    self.in_string = False
+                    self._string_closed(events)
+            elif ch == '"':
+                self.in_string = True
+                self.string_start = self.pos
+            elif ch in "{[":
+                if ch == "{" and self._in_root_list():
+                    self.item_start = self.pos
+                self.stack.append(ch)
+            elif ch in "}]":
+                self.stack.pop()
+                if ch == "}" and self._in_root_list() and self.item_start is not None:
+                    self._emit(events, "item", self.buf[self.item_start:self.pos + 1])
+                    self.item_start = None
+                if not self.stack:
+                    self.finished = True
+            elif len(self.stack) == 1:
+                if ch == ":":
+                    self.expect_key = False
+                elif ch == ",":
+                    self.expect_key = True
+            self.pos += 1
+        return events
+
+    def _in_root_list(self):
+        return len(self.stack) == 2 and self.stack[1] == "["
+
+    def _string_closed(self, events):
+        raw = self.buf[self.string_start:self.pos + 1]
+        if len(self.stack) == 1:
+            if self.expect_key:
+                self.key = json.loads(raw)
+            else:
+                self._emit(events, "field", raw)
+        elif self._in_root_list():
+            self._emit(events, "item", raw)
+
+    def _emit(self, events, kind, raw):
+        try:
+            events.append((kind, self.key, json.loads(raw)))
+        except ValueError:
+            pass  # trecho malformado: a validação final fica com quem lê a resposta completa
+
+
+def stream_output_text(client, model: str, messages: list, on_delta, on_completed=None) -> str:
+    """
+    Chama a Responses API em streaming, repassa cada trecho de texto e devolve o texto completo.
+    on_completed(response) recebe a resposta final (ex.: para ler o uso de tokens).
+    """
+    parts = []
+    stream = client.responses.create(model=model, input=messages, stream=True)
+    for event in stream:
+        if event.type == "response.output_text.delta":
+            parts.append(event.delta)
+            on_delta(event.delta)
+        elif event.type == "response.completed" and on_completed is not None:
+            on_completed(event.response)
+        elif event.type == "response.failed":
+            error = getattr(event.response, "error", None)
+            raise RuntimeError(f"Resposta do agente falhou: {getattr(error, 'message', error)}")
+        elif event.type == "error":
+            raise RuntimeError(f"Erro no streaming do agente: {getattr(event, 'message', event)}")
+    return "".join(parts)
@@ -0,0 +1,158 @@
+import os
+import json
+import pymysql
+import include.users_database as udb
+import include.telemetry as telemetry
+
+# ======================================================================
+# HISTÓRICO DE ANÁLISES
+# ======================================================================
+# Cada execução da automação grava os parâmetros, o hash do dataset, o modelo, a latência,
+# os tokens e a resposta do agente em `analysis_history`. O dashboard lista o histórico
+# do usuário em páginas (índice (user_id, created_at)) e reabre uma análise sem chamar
+# TradingView nem OpenAI.
+# Análises por página no histórico do dashboard
+HISTORY_PAGE_SIZE = int(os.getenv("HISTORY_PAGE_SIZE", 10))
+
+# Colunas da listagem (sem a resposta nem o dataset_report, que só vêm ao abrir)
+HISTORY_LIST_COLUMNS = ("id", "created_at", "ativo_alvo", "model", "dataset_format", "agent_seconds",
+                        "input_tokens", "output_tokens", "from_cache", "resumo", "operacoes")
+
+_table_ready = False
+
+
+def create_table(conn):
+    if conn is None:
+        return False
+
+    create_table_sql = """
+        CREATE TABLE IF NOT EXISTS analysis_history (
+            id BIGINT AUTO_INCREMENT PRIMARY KEY,
+            user_id INT NOT NULL,
+            created_at TIMESTAMP(3) NOT NULL DEFAULT CURRENT_TIMESTAMP(3),
+            ativo_alvo VARCHAR(100),
+            model VARCHAR(100) NOT NULL,
+            dataset_format VARCHAR(20),
+            dataset_sha256 CHAR(64),
+            params TEXT NOT NULL,
+            agent_seconds DOUBLE,
+            input_tokens INT,
+            output_tokens INT,
+            from_cache TINYINT(1) NOT NULL DEFAULT 0,
+            resumo VARCHAR(500),
+            operacoes SMALLINT NOT NULL DEFAULT 0,
+            resposta MEDIUMTEXT NOT NULL,
+            dataset_report TEXT,
+            INDEX idx_history_user_created (user_id, created_at)
+        );
+    """
+    with conn.cursor() as cursor:
+        cursor.execute(create_table_sql)
+    conn.commit()
+    return True
+
+
+def _ensure_table(conn):
+    global _table_ready
+    if not _table_ready:
+        _table_ready = create_table(conn)
+
+
+def _parse(resposta):
+    """Resposta do agente como dict (None se não for um JSON válido)."""
+    try:
+        data = json.loads(resposta) if isinstance(resposta, str) else resposta
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+@telemetry.timed()
+def record(user_id, params: dict, resposta, dataset_report: dict):
+    """Grava uma execução da automação. Devolve o id no histórico (None se o banco estiver fora)."""
+    data = _parse(resposta)
+    # JSON válido é guardado já normalizado; senão, o texto como veio (o dashboard mostra o erro)
+    texto = json.dumps(data, ensure_ascii=False) if data is not None else str(resposta)
+    resumo = str(data.get("trend_summary") or "")[:500] if data is not None else None
+    operacoes = len(data.get("trade_ideas") or []) if data is not None else 0
+    params = {k: v for k, v in params.items() if k != "user_id"}
+
+    query = """
+        INSERT INTO analysis_history
+            (user_id, ativo_alvo, model, dataset_format, dataset_sha256, params, agent_seconds,
+             input_tokens, output_tokens, from_cache, resumo, operacoes, resposta, dataset_report)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+    """
+    values = (
+        user_id, params.get("ativo_alvo"), params.get("model"), params.get("dataset_format"),
+        dataset_report.get("dataset_sha256"), json.dumps(params, ensure_ascii=False, default=str),
+        dataset_report.get("agent_seconds"), dataset_report.get("input_tokens"),
+        dataset_report.get("output_tokens"), bool(dataset_report.get("from_cache")),
+        resumo, operacoes, texto, json.dumps(dataset_report, default=str),
+    )
+    with udb.connection() as conn:
+        if conn is None:
+            return None
+        _ensure_table(conn)
+        with conn.cursor() as cursor:
+            cursor.execute(query, values)
+            history_id = cursor.lastrowid
+        conn.commit()
+    return history_id
+
+
+@telemetry.timed()
+def count(user_id) -> int:
+    """Total de análises no histórico do usuário."""
+    with udb.connection() as conn:
+        if conn is None:
+            return 0
+        _ensure_table(conn)
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT COUNT(*) FROM analysis_history WHERE user_id = %s", (user_id,))
+            return cursor.fetchone()[0]
+
+
+@telemetry.timed()
+def list_page(user_id, page=1, page_size=None) -> list:
+    """Uma página do histórico do usuário, da mais recente para a mais antiga (sem as respostas)."""
+    page = max(1, int(page))
+    page_size = max(1, int(page_size or HISTORY_PAGE_SIZE))
+    # (user_id, created_at) + id (chave primária, implícita no índice) dão a ordem sem filesort
+    query = f"""
+        SELECT {', '.join(HISTORY_LIST_COLUMNS)}
+        FROM analysis_history
+        WHERE user_id = %s
+        ORDER BY created_at DESC, id DESC
+        LIMIT %s OFFSET %s
+    """
+    with udb.connection() as conn:
+        if conn is None:
+            return []
+        _ensure_table(conn)
+        with conn.cursor(pymysql.cursors.DictCursor) as cursor:
+            cursor.execute(query, (user_id, page_size, (page - 1) * page_size))
+            return cursor.fetchall()
+
+
+@telemetry.timed()
+def get(user_id, history_id):
+    """Análise completa do histórico (dict com resposta, dataset_report, params...) ou None."""
+    query = """
+        SELECT id, created_at, ativo_alvo, model, dataset_format, dataset_sha256, params,
+               agent_seconds, input_tokens, output_tokens, from_cache, resposta, dataset_report
+        FROM analysis_history
+        WHERE id = %s AND user_id = %s
+    """
+    with udb.connection() as conn:
+        if conn is None:
+            return None
+        _ensure_table(conn)
+        with conn.cursor(pymysql.cursors.DictCursor) as cursor:
+            cursor.execute(query, (history_id, user_id))
+            row = cursor.fetchone()
+    if row is None:
+        return None
+    row["params"] = json.loads(row["params"] or "{}")
+    row["dataset_report"] = json.loads(row["dataset_report"] or "{}")
+    return row
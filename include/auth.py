@@ -0,0 +1,28 @@
+import hashlib
+import streamlit as st
+from include import users_database as udb
+
+# ======================================================================
+# VERIFICAÇÃO DE SENHA
+# ======================================================================
+# Fora de login.py (script da página) para poder ser importado pelos benchmarks.
+
+
+def hash_data(data, salt):
+    combined = (salt + data).encode()
+    hashed_data = hashlib.sha256(combined).hexdigest()
+    return hashed_data
+
+
+def verify_password(conn, email, password):
+    """Retorna o perfil do usuário (dict) se a senha confere; senão False."""
+    result = udb.get_user_auth(conn, email)
+    if result:
+        hashed_password = hash_data(password, result.pop("salt"))
+        if hashed_password != result.pop("password"):
+            return False
+        udb.cache_user_profile(result)
+        return result
+    else:
+        st.error('Erro ao conectar com o banco de dados')
+        return False
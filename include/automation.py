@@ -0,0 +1,112 @@
+import time
+import logging
+from include.tv_collector import collect_tv_frames
+import include.dataset_encoder as dataset_encoder
+import include.resampling as resampling
+import include.dataset_artifacts as dataset_artifacts
+import include.telemetry as telemetry
+import include.analysis_history as analysis_history
+from include.agent import build_system_prompt, ask_agent_with_dataset
+
+# ======================================================================
+# PIPELINE "EXECUTAR AUTOMAÇÃO": coleta -> dataset -> agente
+# ======================================================================
+# Roda como job em segundo plano (include/jobs.py); não usa o Streamlit.
+# O dataset é codificado uma vez e passado ao agente em memória; a cópia em disco é
+# opcional e por execução (include/dataset_artifacts.py).
+# O progresso é publicado com update(**campos) e lido pela página via polling (jobs.update
+# guarda uma cópia dos campos, então as listas abaixo podem seguir crescendo aqui):
+#   stage, progress      -> etapa atual e fração concluída da coleta
+#   parciais, mensagens  -> ativos recebidos e avisos/erros por ativo
+#   previa               -> trend_summary e trade_ideas já completos (streaming)
+# A coleta tem prazo (TV_DEADLINE): segue com os ativos que chegaram e registra os que
+# faltaram em dataset_report["coleta"].
+# Com params["user_id"], o resultado vai para o histórico de análises (include/analysis_history.py).
+
+
+def run_automation(params: dict, update) -> dict:
+    """
+    params: ativos_b3, ativos_fx, ativo_alvo, bars, model, dataset_format, stream_resposta,
+            timeframes (opcional; só 1m = dataset original, sem a coluna timeframe),
+            user_id (opcional; grava a análise no histórico do usuário)
+    Retorna {"resposta": texto do agente, "dataset_report": métricas do payload}.
+    """
+    ativos_b3_list = [a.strip() for a in params["ativos_b3"].split(",") if a.strip()]
+    ativos_fx_list = [a.strip() for a in params["ativos_fx"].split(",") if a.strip()]
+    total = len(ativos_b3_list) + len(ativos_fx_list)
+    timeframes = resampling.normalize_timeframes(params.get("timeframes"))
+    if timeframes == [resampling.BASE_TIMEFRAME]:
+        timeframes = None
+
+    # 1. coleta (em streaming: cada ativo aparece assim que chega), pelo mesmo caminho de
+    # collect_tv_all
+    parciais, mensagens = [], []
+    recebidos = 0
+    update(stage="Coletando dados via TradingView (tvdatafeed)...", progress=0.0)
+
+    def on_result(pos, sym, df, msg):
+        nonlocal recebidos
+        recebidos += 1
+        if msg is not None:
+            mensagens.append(list(msg))
+        else:
+            if timeframes:
+                df = df[df["timeframe"] == timeframes[0]]
+            parciais.append({
+                "ativo": sym,
+                "barras": len(df),
+                "última barra": str(df["datetime"].iloc[-1]),
+                "fechamento": float(df["close"].iloc[-1]),
+            })
+        update(stage=f"Coletando {recebidos}/{total} — {sym}", progress=recebidos / total,
+               parciais=parciais, mensagens=mensagens)
+
+    with telemetry.span("automation.collect", symbols=total):
+        df_all, _, coleta_resumo = collect_tv_frames(ativos_b3_list, ativos_fx_list, params["bars"],
+                                                     timeframes=timeframes, on_result=on_result)
+    if df_all.empty:
+        raise RuntimeError("Nenhum dado coletado. Verifique símbolos/credenciais.")
+
+    # 2. codifica o dataset (no formato escolhido) uma única vez
+    update(stage="Gerando dataset...")
+    dataset = dataset_encoder.encode(df_all, params["dataset_format"], ativo_alvo=params["ativo_alvo"])
+    baseline = dataset if params["dataset_format"] == "csv" else None
+    relatorio = dataset_encoder.size_report(df_all, dataset, baseline)
+    relatorio["format"] = params["dataset_format"]
+    relatorio["trace_id"] = telemetry.current_trace_id()
+    relatorio["coleta"] = coleta_resumo
+    relatorio["dataset_sha256"] = dataset_artifacts.digest(dataset)
+    artifact = dataset_artifacts.save_async(dataset)
+    if artifact:
+        relatorio["dataset_artifact"] = artifact
+
+    # 3. envia para agente
+    update(stage="Consultando agente...")
+    prompt = build_system_prompt(params["ativo_alvo"])
+    inicio = time.perf_counter()
+    on_event = None
+    if params.get("stream_resposta"):
+        previa = {"trend_summary": None, "trade_ideas": []}
+
+        def on_event(kind, key, value):
+            if kind == "field" and key == "trend_summary":
+                previa["trend_summary"] = value
+            elif kind == "item" and key == "trade_ideas" and isinstance(value, dict):
+                if "primeira_operacao" not in relatorio:
+                    relatorio["primeira_operacao"] = time.perf_counter() - inicio
+                previa["trade_ideas"].append(value)
+            else:
+                return
+            update(previa=previa)
+
+    resposta = ask_agent_with_dataset(prompt, dataset, params["model"], on_event, stats=relatorio,
+                                      encoding=params["dataset_format"])
+    relatorio["agent_seconds"] = time.perf_counter() - inicio
+
+    # 4. histórico: uma falha no banco não perde a resposta, que já está no job
+    if params.get("user_id") is not None:
+        try:
+            relatorio["history_id"] = analysis_history.record(params["user_id"], params, resposta, relatorio)
+        except Exception as e:
+            telemetry.log(logging.ERROR, "automation.history_failed", error=f"{type(e).__name__}: {e}")
+    return {"resposta": resposta, "dataset_report": relatorio}
@@ -0,0 +1,101 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+# ======================================================================
+# CACHE DE CANDLES ENTRE SESSÕES
+# ======================================================================
+# Vive no processo do Streamlit (módulo importado não é reexecutado a cada rerun),
+# então todas as sessões logadas compartilham as séries já buscadas.
+CANDLE_CACHE_MAX_ENTRIES = int(os.getenv("CANDLE_CACHE_MAX_ENTRIES", 512))
+
+
+def next_bar_boundary(interval_seconds: int, now: float = None) -> float:
+    """Epoch em que a barra atual fecha — momento em que o cache expira."""
+    now = time.time() if now is None else now
+    return (now // interval_seconds + 1) * interval_seconds
+
+
+class CandleCache:
+    """
+    Cache TTL com coalescência de requisições (single-flight):
+    chamadas simultâneas para a mesma chave esperam uma única busca.
+    Resultados None e exceções não são guardados.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # chave -> (expira_em, valor)
+        self._inflight = {}  # chave -> Future da busca em andamento
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def get_or_load(self, key, loader, expires_at: float):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.time():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                self.misses += 1
+                future = Future()
+                self._inflight[key] = future
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            return future.result()
+
+        try:
+            value = loader()
+        except BaseException as e:
+            with self._lock:
+                self._inflight.pop(key, None)
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            self._inflight.pop(key, None)
+            if value is not None:
+                self._entries[key] = (expires_at, value)
+                self._entries.move_to_end(key)
+                self._evict()
+        future.set_result(value)
+        return value
+
+    def _evict(self):
+        now = time.time()
+        for key in [k for k, (exp, _) in self._entries.items() if exp <= now]:
+            del self._entries[key]
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "hit_ratio": (self.hits + self.coalesced) / lookups if lookups else 0.0,
+            }
+
+
+candle_cache = CandleCache(CANDLE_CACHE_MAX_ENTRIES)
+
+
+def stats() -> dict:
+    return candle_cache.stats()
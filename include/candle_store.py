@@ -0,0 +1,147 @@
+import os
+import math
+import sqlite3
+import pandas as pd
+
+# ======================================================================
+# ARMAZENAMENTO LOCAL DE CANDLES (SQLite)
+# ======================================================================
+# Um registro por barra, particionado por (symbol, exchange, interval).
+# O coletor lê o histórico daqui e só pede ao TradingView as barras novas.
+CANDLE_DB_PATH = os.getenv("CANDLE_DB_PATH", os.path.join("data", "candles.db"))
+
+# Duração (segundos) de cada Interval do tvDatafeed, pelo nome do enum
+INTERVAL_SECONDS = {
+    "in_1_minute": 60,
+    "in_3_minute": 180,
+    "in_5_minute": 300,
+    "in_15_minute": 900,
+    "in_30_minute": 1800,
+    "in_45_minute": 2700,
+    "in_1_hour": 3600,
+    "in_2_hour": 7200,
+    "in_3_hour": 10800,
+    "in_4_hour": 14400,
+    "in_daily": 86400,
+    "in_weekly": 604800,
+    "in_monthly": 2592000,
+}
+
+# Barras extras pedidas além do tempo decorrido (a última barra pode estar incompleta)
+OVERLAP_BARS = 2
+
+
+def create_connection(path=None):
+    path = path or CANDLE_DB_PATH
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30)
+    # WAL permite leituras simultâneas enquanto outra thread grava
+    conn.execute("PRAGMA journal_mode=WAL")
+    create_table(conn)
+    return conn
+
+
+def create_table(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS candles (
+            symbol   TEXT    NOT NULL,
+            exchange TEXT    NOT NULL,
+            interval TEXT    NOT NULL,
+            ts       INTEGER NOT NULL,
+            open     REAL,
+            high     REAL,
+            low      REAL,
+            close    REAL,
+            volume   REAL,
+            PRIMARY KEY (symbol, exchange, interval, ts)
+        ) WITHOUT ROWID
+    """)
+    conn.commit()
+
+
+def _interval_key(interval):
+    return str(getattr(interval, "value", interval))
+
+
+def _to_epoch(series: pd.Series) -> pd.Series:
+    series = pd.to_datetime(series)
+    if series.dt.tz is not None:
+        series = series.dt.tz_localize(None)
+    return (series - pd.Timestamp(0)) // pd.Timedelta(seconds=1)
+
+
+def stored_range(symbol, exchange, interval, conn=None):
+    """Retorna (quantidade de barras, último timestamp) guardados para a série."""
+    own = conn is None
+    conn = conn or create_connection()
+    try:
+        count, last_ts = conn.execute(
+            "SELECT COUNT(*), MAX(ts) FROM candles WHERE symbol=? AND exchange=? AND interval=?",
+            (symbol, exchange, _interval_key(interval)),
+        ).fetchone()
+    finally:
+        if own:
+            conn.close()
+    return count, (pd.Timestamp(last_ts, unit="s") if last_ts is not None else None)
+
+
+def bars_to_fetch(symbol, exchange, interval, bars, now=None, conn=None):
+    """
+    Quantas barras precisam vir do TradingView para completar as `bars` mais recentes.
+    Sem histórico suficiente no store, pede tudo; caso contrário só o tempo decorrido.
+    """
+    count, last_ts = stored_range(symbol, exchange, interval, conn)
+    if last_ts is None or count < bars:
+        return bars
+    seconds = INTERVAL_SECONDS.get(getattr(interval, "name", ""), 60)
+    # tvDatafeed devolve horários locais sem timezone
+    now = now or pd.Timestamp.now()
+    elapsed = max((now - last_ts).total_seconds(), 0)
+    return min(bars, math.ceil(elapsed / seconds) + OVERLAP_BARS)
+
+
+def save_candles(symbol, exchange, interval, df, conn=None):
+    """Grava/atualiza barras (colunas datetime, open, high, low, close, volume)."""
+    if df is None or df.empty:
+        return 0
+    rows = pd.DataFrame({
+        "ts": _to_epoch(df["datetime"]),
+        "open": df["open"], "high": df["high"], "low": df["low"],
+        "close": df["close"], "volume": df["volume"],
+    })
+    key = (symbol, exchange, _interval_key(interval))
+    own = conn is None
+    conn = conn or create_connection()
+    try:
+        # INSERT OR REPLACE: a última barra gravada pode ter sido parcial
+        conn.executemany(
+            "INSERT OR REPLACE INTO candles (symbol, exchange, interval, ts, open, high, low, close, volume) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [key + tuple(r) for r in rows.itertuples(index=False, name=None)],
+        )
+        conn.commit()
+    finally:
+        if own:
+            conn.close()
+    return len(rows)
+
+
+def load_candles(symbol, exchange, interval, bars, conn=None) -> pd.DataFrame:
+    """Retorna as `bars` barras mais recentes em ordem cronológica."""
+    own = conn is None
+    conn = conn or create_connection()
+    try:
+        df = pd.read_sql_query(
+            "SELECT ts, open, high, low, close, volume FROM candles "
+            "WHERE symbol=? AND exchange=? AND interval=? ORDER BY ts DESC LIMIT ?",
+            conn,
+            params=(symbol, exchange, _interval_key(interval), int(bars)),
+        )
+    finally:
+        if own:
+            conn.close()
+    df = df.iloc[::-1].reset_index(drop=True)
+    df.insert(0, "datetime", pd.to_datetime(df.pop("ts"), unit="s"))
+    return df
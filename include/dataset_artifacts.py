@@ -0,0 +1,66 @@
+import os
+import logging
+import uuid
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+import include.telemetry as telemetry
+
+# ======================================================================
+# CÓPIAS EM DISCO DOS DATASETS ENVIADOS AO AGENTE (OPCIONAL)
+# ======================================================================
+# O dataset vai da coleta ao agente em memória; gravar uma cópia serve só para
+# auditoria/depuração. Cada execução grava um arquivo próprio com nome derivado do
+# conteúdo (sha256), então execuções simultâneas nunca sobrescrevem umas às outras e
+# datasets iguais são gravados uma vez. A escrita roda numa thread própria, fora do
+# caminho da requisição.
+# Grava uma cópia de cada dataset enviado ao agente (1 = sim)
+DATASET_ARTIFACTS = os.getenv("DATASET_ARTIFACTS", "0") == "1"
+DATASET_ARTIFACTS_DIR = os.getenv("DATASET_ARTIFACTS_DIR", os.path.join("data", "datasets"))
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="dataset-artifacts")
+
+
+def digest(text: str) -> str:
+    """sha256 (hex) do dataset codificado."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def artifact_path(text: str, directory=None, suffix=".csv") -> str:
+    """Caminho endereçado por conteúdo para o dataset."""
+    return os.path.join(directory or DATASET_ARTIFACTS_DIR, digest(text)[:32] + suffix)
+
+
+def save(text: str, directory=None, suffix=".csv") -> str:
+    """Grava o dataset (se ainda não existir) e devolve o caminho."""
+    path = artifact_path(text, directory, suffix)
+    if os.path.exists(path):
+        return path
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    # troca atômica: leitores nunca veem um arquivo pela metade
+    os.replace(tmp, path)
+    return path
+
+
+def _save_logged(text, directory, suffix):
+    try:
+        return save(text, directory, suffix)
+    except OSError as e:
+        telemetry.log(logging.ERROR, "dataset_artifacts.save_failed", path=artifact_path(text, directory, suffix),
+                      error=f"{type(e).__name__}: {e}")
+        return None
+
+
+def save_async(text: str, directory=None, suffix=".csv", enabled=None):
+    """
+    Agenda a gravação em segundo plano e devolve o caminho que o arquivo terá,
+    ou None se as cópias estão desativadas (padrão DATASET_ARTIFACTS).
+    """
+    enabled = DATASET_ARTIFACTS if enabled is None else enabled
+    if not enabled:
+        return None
+    # a gravação roda em outra thread: leva o trace da execução para o log de erro
+    _executor.submit(telemetry.propagate(_save_logged), text, directory, suffix)
+    return artifact_path(text, directory, suffix)
@@ -0,0 +1,238 @@
+import math
+import numpy as np
+import pandas as pd
+import include.features as features
+import include.telemetry as telemetry
+
+# ======================================================================
+# CODIFICAÇÃO DO DATASET ENVIADO AO AGENTE
+# ======================================================================
+# "csv"           -> CSV longo original (symbol, exchange, datetime, ..., timestamp_utc)
+# "compact"       -> matriz larga alinhada no tempo, rótulos no cabeçalho, preços no tick
+# "compact_delta" -> igual ao compacto, mas cada célula é a variação da linha anterior
+# "features"      -> só o resumo de features por ativo (include/features.py)
+# "features_tail" -> resumo + últimas barras de cada ativo no formato compacto
+ENCODINGS = {
+    "csv": "CSV completo",
+    "compact": "Compacto (matriz larga)",
+    "compact_delta": "Compacto + delta",
+    "features": "Resumo de features",
+    "features_tail": "Resumo + últimas barras",
+}
+
+# Como cada formato chega ao agente: linguagem do bloco de código e uma descrição curta
+# para o modelo saber ler o conteúdo
+AGENT_FORMATS = {
+    "csv": ("csv", "CSV longo, uma linha por barra: symbol, exchange, datetime, open, high, low, close, volume"),
+    "compact": ("text", "matriz larga alinhada no tempo, uma linha por instante e colunas <ativo>.<campo>; "
+                        "o cabeçalho '#' traz t0, o passo, a legenda dos campos e o tick de cada ativo"),
+    "compact_delta": ("text", "igual ao compacto, mas cada célula é a variação desde o último valor da coluna "
+                              "(a primeira ocorrência é absoluta); some as variações para obter os preços"),
+    "features": ("text", "resumo calculado localmente, uma linha CSV por ativo; o cabeçalho '#' explica cada coluna"),
+    "features_tail": ("text", "resumo de features por ativo (cabeçalho '#' explica as colunas) seguido das "
+                              "últimas barras de cada ativo no formato compacto"),
+}
+
+# Tick mínimo dos contratos mais usados; os demais são inferidos dos próprios preços (MDC)
+DEFAULT_TICK_SIZES = {
+    "WIN1!": 5,
+    "WDO1!": 0.5,
+    "IND1!": 5,
+    "DOL1!": 0.5,
+    "DI11!": 0.001,
+    "DI1!": 0.001,
+}
+
+FIELDS = [("open", "o"), ("high", "h"), ("low", "l"), ("close", "c"), ("volume", "v")]
+
+
+def _decimals(tick: float) -> int:
+    """Casas decimais necessárias para escrever múltiplos do tick."""
+    for d in range(0, 9):
+        if abs(round(tick, d) - tick) < 1e-12:
+            return d
+    return 8
+
+
+def infer_price_precision(prices: pd.Series, max_decimals: int = 6) -> float:
+    """Menor potência de 10 que representa todos os preços sem perda (casas decimais, não o tick)."""
+    values = prices.dropna().to_numpy(dtype=float)
+    if values.size == 0:
+        return 1.0
+    for d in range(0, max_decimals + 1):
+        if np.allclose(np.round(values, d), values, rtol=0, atol=1e-9 * max(1.0, np.abs(values).max())):
+            return 10.0 ** -d
+    return 10.0 ** -max_decimals
+
+
+def infer_tick_size(prices: pd.Series, max_decimals: int = 6) -> float:
+    """
+    Tick observado: maior passo que divide todos os preços (MDC dos preços em unidades da
+    precisão decimal). Ex.: 125000, 125005, 125015 -> 5, enquanto a precisão seria 1.
+    """
+    precision = infer_price_precision(prices, max_decimals)
+    values = prices.dropna().to_numpy(dtype=float)
+    units = np.unique(np.abs(np.round(values / precision))).astype(np.int64)
+    # com um único valor o MDC seria o próprio preço: fica a precisão
+    step = int(np.gcd.reduce(units)) if units.size > 1 else 0
+    return step * precision if step > 1 else precision
+
+
+def _format(values: np.ndarray, decimals: int) -> np.ndarray:
+    out = np.full(values.shape, "", dtype=object)
+    mask = ~np.isnan(values)
+    out[mask] = [f"{v:.{decimals}f}" for v in values[mask]]
+    return out
+
+
+def _ticks(series: pd.Series, tick: float, delta: bool) -> np.ndarray:
+    """Valores em unidades inteiras de tick (ou suas diferenças, se delta)."""
+    ticks = np.round(series.to_numpy(dtype=float) / tick)
+    if not delta:
+        return ticks
+    # diferença para o último valor conhecido; o primeiro fica absoluto
+    prev = pd.Series(ticks).ffill().shift().to_numpy()
+    return np.where(np.isnan(prev), ticks, ticks - prev)
+
+
+def encode_compact(df: pd.DataFrame, tick_sizes: dict = None, delta: bool = False) -> str:
+    """
+    Matriz larga: uma linha por instante, colunas <ativo>.o/.h/.l/.c/.v.
+    Símbolo, exchange e tick vão uma única vez no cabeçalho; o tempo vira um
+    inteiro de passos desde t0. Células vazias = ativo sem barra naquele instante.
+    """
+    if df.empty:
+        return ""
+    ticks = dict(DEFAULT_TICK_SIZES, **(tick_sizes or {}))
+
+    pairs = df[["symbol", "exchange"]].drop_duplicates()
+    duplicated = pairs["symbol"].duplicated(keep=False)
+    labels = {
+        (sym, ex): (f"{sym}@{ex}" if dup else sym)
+        for sym, ex, dup in zip(pairs["symbol"], pairs["exchange"], duplicated)
+    }
+    data = df.assign(label=[labels[k] for k in zip(df["symbol"], df["exchange"])])
+    wide = data.pivot_table(
+        index="datetime", columns="label",
+        values=[f for f, _ in FIELDS], aggfunc="last", sort=True,
+    )
+
+    times = pd.DatetimeIndex(wide.index)
+    if times.tz is not None:
+        times = times.tz_localize(None)
+    t0 = times[0]
+    offsets = (times - t0) // pd.Timedelta(seconds=1)
+    steps = np.diff(np.asarray(offsets))
+    step = int(np.min(steps[steps > 0])) if (steps > 0).any() else 60
+    if np.all(np.asarray(offsets) % step == 0):
+        t_col = np.asarray(offsets // step).astype(str)
+    else:
+        step = 1
+        t_col = np.asarray(offsets).astype(str)
+
+    header = [
+        "# dataset compacto: uma linha por instante, colunas <ativo>.<campo>",
+        f"# t0={t0.strftime('%Y-%m-%dT%H:%M:%SZ')} passo={step}s (t = passos desde t0)",
+        "# campos: o=open h=high l=low c=close v=volume; célula vazia = sem barra",
+    ]
+    if delta:
+        header.append("# delta: a primeira ocorrência é absoluta; as seguintes são a variação desde o último valor da coluna")
+
+    ativos, columns, body = [], ["t"], [t_col]
+    for (sym, ex), label in labels.items():
+        # o mesmo tick vale para os quatro preços do ativo
+        prices = pd.concat([wide[(field, label)] for field in ("open", "high", "low", "close")])
+        tick = ticks.get(sym) or infer_tick_size(prices)
+        decimals = _decimals(tick)
+        ativos.append(f"{label}={sym}:{ex} tick={tick:.{decimals}f}")
+        for field, short in FIELDS:
+            series = wide[(field, label)]
+            if field == "volume":
+                values = _ticks(series, 1, delta)
+                body.append(_format(values, 0))
+            else:
+                values = _ticks(series, tick, delta) * tick
+                body.append(_format(values, decimals))
+            columns.append(f"{label}.{short}")
+    header.append("# ativos: " + " | ".join(ativos))
+
+    rows = np.column_stack(body)
+    lines = header + [",".join(columns)] + [",".join(r) for r in rows]
+    return "\n".join(lines) + "\n"
+
+
+def encode(df: pd.DataFrame, encoding: str = "csv", tick_sizes: dict = None, ativo_alvo: str = None) -> str:
+    """
+    Codifica o DataFrame de collect_tv_all no formato escolhido (ver ENCODINGS).
+    ativo_alvo só é usado pelos formatos de features (correlação com o alvo).
+    """
+    with telemetry.span("dataset.encode", encoding=encoding, rows=len(df)) as span:
+        text = _encode(df, encoding, tick_sizes, ativo_alvo)
+        span["chars"] = len(text)
+    return text
+
+
+def _encode(df, encoding, tick_sizes, ativo_alvo):
+    if encoding == "csv":
+        return df.to_csv(index=False)
+    if encoding == "features":
+        return features.encode_summary(df, ativo_alvo)
+    if encoding == "features_tail":
+        return features.encode_summary(df, ativo_alvo, features.FEATURES_TAIL_BARS,
+                                       lambda tail: encode_compact(tail, tick_sizes))
+    if "timeframe" in df.columns and encoding in ENCODINGS:
+        # um bloco compacto por timeframe (cada um com seu próprio passo)
+        blocks = []
+        for timeframe, part in df.groupby("timeframe", sort=True, observed=True):
+            body = _encode(part.drop(columns="timeframe"), encoding, tick_sizes, ativo_alvo)
+            blocks.append(f"# timeframe={timeframe}\n{body}")
+        return "\n".join(blocks)
+    if encoding == "compact":
+        return encode_compact(df, tick_sizes)
+    if encoding == "compact_delta":
+        return encode_compact(df, tick_sizes, delta=True)
+    raise ValueError(f"Formato de dataset desconhecido: {encoding}")
+
+
+def agent_message(text: str, encoding: str = "csv") -> str:
+    """Mensagem do usuário com o dataset: rótulo e descrição do formato + bloco de código do tipo certo."""
+    if encoding not in AGENT_FORMATS:
+        raise ValueError(f"Formato de dataset desconhecido: {encoding}")
+    fence, description = AGENT_FORMATS[encoding]
+    note = "; blocos '# timeframe=' separam os timeframes" if "\n# timeframe=" in "\n" + text else ""
+    return (f"Aqui está o dataset (formato: {ENCODINGS[encoding]}).\nComo ler: {description}{note}.\n\n"
+            f"```{fence}\n{text}\n```")
+
+
+def count_tokens(text: str):
+    """
+    Conta tokens com tiktoken (se instalado); sem ele, estima ~4 caracteres por token.
+    Retorna (tokens, nome do contador).
+    """
+    try:
+        import tiktoken
+    except ImportError:
+        return math.ceil(len(text) / 4), "estimativa (4 chars/token)"
+    enc = tiktoken.get_encoding("o200k_base")
+    return len(enc.encode(text)), "tiktoken o200k_base"
+
+
+def size_report(df: pd.DataFrame, encoded: str, baseline: str = None) -> dict:
+    """
+    Compara o payload codificado com o CSV longo original (bytes e tokens).
+    baseline: o CSV longo, se já foi gerado (evita serializar df de novo).
+    """
+    if baseline is None:
+        baseline = df.to_csv(index=False)
+    tokens_before, counter = count_tokens(baseline)
+    tokens_after, _ = count_tokens(encoded)
+    bytes_before = len(baseline.encode("utf-8"))
+    bytes_after = len(encoded.encode("utf-8"))
+    return {
+        "bytes_before": bytes_before,
+        "bytes_after": bytes_after,
+        "tokens_before": tokens_before,
+        "tokens_after": tokens_after,
+        "token_counter": counter,
+        "reduction_pct": 100 * (1 - bytes_after / bytes_before) if bytes_before else 0.0,
+    }
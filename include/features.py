@@ -0,0 +1,236 @@
+import os
+import numpy as np
+import pandas as pd
+import include.resampling as resampling
+
+# ======================================================================
+# FEATURES POR ATIVO (RESUMO PARA O AGENTE)
+# ======================================================================
+# Em vez de mandar milhares de barras, calcula numa única passada vetorizada
+# (todos os ativos juntos, sem loop por símbolo) as estatísticas que o agente usaria:
+# retornos, volatilidade, ATR, VWAP da sessão, gap de abertura, faixas e a correlação
+# dos retornos de cada ativo com o ativo alvo.
+# Período do ATR (em barras)
+FEATURES_ATR_PERIOD = int(os.getenv("FEATURES_ATR_PERIOD", 14))
+# Barras por ativo anexadas ao resumo no formato "features_tail"
+FEATURES_TAIL_BARS = int(os.getenv("FEATURES_TAIL_BARS", 20))
+
+FEATURE_COLUMNS = [
+    "symbol", "exchange", "bars", "last_close", "ret_1_pct", "ret_window_pct", "vol_pct",
+    "atr", "atr_pct", "vwap_session", "dist_vwap_pct", "gap_pct", "high", "low",
+    "range_pct", "pos_range", "session_high", "session_low", "volume_session", "corr_alvo",
+]
+
+
+def _base_rows(df: pd.DataFrame) -> pd.DataFrame:
+    """Com a coluna timeframe, as features usam só o menor timeframe coletado."""
+    if "timeframe" not in df.columns:
+        return df
+    smallest = min(df["timeframe"].astype(str).unique(), key=resampling.TIMEFRAMES.get)
+    return df[df["timeframe"].astype(str) == smallest]
+
+
+def _is_target(symbols, exchanges, ativo_alvo):
+    alvo = (ativo_alvo or "").strip().upper()
+    if not alvo:
+        return np.zeros(len(symbols), dtype=bool)
+    # aceita "SYMBOL:EXCHANGE" (como digitado no dashboard) ou só o símbolo
+    return np.array([f"{s}:{e}".upper() == alvo or str(s).upper() in (alvo, alvo.split(":", 1)[0])
+                     for s, e in zip(symbols, exchanges)], dtype=bool)
+
+
+def _codes(series: pd.Series):
+    """(códigos inteiros, valores distintos) — categóricas já trazem os códigos prontos."""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        # int64: os códigos de categóricas vêm em int8/int16 e estourariam na combinação
+        return series.cat.codes.to_numpy().astype(np.int64), np.asarray(series.cat.categories)
+    codes, names = pd.factorize(series)
+    return codes.astype(np.int64, copy=False), np.asarray(names)
+
+
+def _ranges(begin, end):
+    """
+    Índices das linhas [begin[i], end[i]) de cada ativo, concatenados, e a posição onde
+    começa o trecho de cada ativo (os limites do reduceat). Todo trecho precisa ter >= 1 linha.
+    """
+    lengths = end - begin
+    offsets = np.cumsum(lengths) - lengths
+    index = np.arange(offsets[-1] + lengths[-1]) + np.repeat(begin - offsets, lengths)
+    return index, offsets
+
+
+def _minute_slots(times):
+    """Minuto de cada horário contado a partir do primeiro (None se algum cair fora da grade de 1 minuto)."""
+    elapsed = times - times.min()
+    slots = (elapsed / 60.0).astype(np.int64)
+    if slots.max() > 50_000_000 or not np.array_equal(slots * 60, elapsed):
+        return None
+    return slots
+
+
+def _correlations(times, returns, starts, ends, target):
+    """
+    Correlação de Pearson dos retornos de cada ativo com os do alvo, nos horários em
+    que os dois têm barra (sem montar a matriz tempo x ativo).
+    """
+    n_groups = len(starts)
+    if target is None:
+        return np.full(n_groups, np.nan)
+    t_begin, t_end = starts[target], ends[target]
+
+    # retorno do alvo no mesmo horário de cada linha: tabela direta por minuto quando
+    # todos os horários caem na grade de 1 minuto; senão, busca binária
+    slots = _minute_slots(times)
+    if slots is None:
+        target_times = times[t_begin:t_end]
+        target_returns = returns[t_begin:t_end]
+        pos = np.minimum(np.searchsorted(target_times, times), len(target_times) - 1)
+        x = np.where(target_times[pos] == times, target_returns[pos], np.nan)
+    else:
+        lookup = np.full(slots.max() + 1, np.nan)
+        lookup[slots[t_begin:t_end]] = returns[t_begin:t_end]
+        x = lookup[slots]
+    mask = ~(np.isnan(x) | np.isnan(returns))
+    xs = np.where(mask, x, 0.0)
+    ys = np.where(mask, returns, 0.0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        n = np.add.reduceat(mask, starts).astype(float)
+        mx = np.add.reduceat(xs, starts) / n
+        my = np.add.reduceat(ys, starts) / n
+        cov = np.add.reduceat(xs * ys, starts) / n - mx * my
+        vx = np.add.reduceat(xs * xs, starts) / n - mx * mx
+        vy = np.add.reduceat(ys * ys, starts) / n - my * my
+        corr = cov / np.sqrt(vx * vy)
+    corr[n < 3] = np.nan
+    return np.clip(corr, -1, 1)
+
+
+def compute_features(df: pd.DataFrame, ativo_alvo=None, atr_period=None) -> pd.DataFrame:
+    """
+    Uma linha por ativo com as colunas de FEATURE_COLUMNS.
+    Retornos e distâncias em %, ATR/VWAP/faixas no preço do ativo; corr_alvo entre -1 e 1.
+    """
+    atr_period = atr_period or FEATURES_ATR_PERIOD
+    df = _base_rows(df)
+    if df.empty:
+        return pd.DataFrame(columns=FEATURE_COLUMNS)
+
+    # ativos como inteiros (fatorados uma vez): ordenar e separar blocos sem comparar strings
+    symbol_codes, symbol_names = _codes(df["symbol"])
+    exchange_codes, exchange_names = _codes(df["exchange"])
+    asset = symbol_codes * len(exchange_names) + exchange_codes
+    times = resampling.epoch_seconds(df["datetime"])
+    n_rows = len(times)
+
+    # blocos contíguos por ativo; os mesmos limites servem a todos os reduceat abaixo.
+    # Só reordena se algum ativo aparecer em mais de um bloco ou o tempo voltar dentro dele
+    new_group = np.ones(n_rows, dtype=bool)
+    np.not_equal(asset[1:], asset[:-1], out=new_group[1:])
+    starts = np.flatnonzero(new_group)
+    order = None
+    if (len(np.unique(asset[starts])) < len(starts)
+            or ((np.diff(times) < 0) & ~new_group[1:]).any()):
+        order = np.lexsort((times, asset))
+        asset, times = asset[order], times[order]
+        np.not_equal(asset[1:], asset[:-1], out=new_group[1:])
+        starts = np.flatnonzero(new_group)
+
+    def column(name):
+        values = df[name].to_numpy(dtype=float)
+        return values if order is None else values[order]
+
+    o, h, low, c, v = (column(name) for name in ("open", "high", "low", "close", "volume"))
+    ends = np.append(starts[1:], n_rows)  # exclusivo
+    last = ends - 1
+    counts = ends - starts
+    symbols = symbol_names[asset[starts] // len(exchange_names)]
+    exchanges = exchange_names[asset[starts] % len(exchange_names)]
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        # retornos log de 1 barra; a 1ª barra de cada ativo não tem retorno
+        returns = np.empty(n_rows)
+        returns[0] = np.nan
+        np.divide(c[1:], c[:-1], out=returns[1:])
+        np.log(returns, out=returns)
+        returns[starts] = np.nan
+
+        # volatilidade: desvio-padrão dos retornos de 1 barra
+        r0 = returns.copy()
+        r0[starts] = 0.0
+        n_ret = counts - 1
+        mean = np.add.reduceat(r0, starts) / n_ret
+        var = (np.add.reduceat(r0 * r0, starts) / n_ret - mean ** 2) * n_ret / (n_ret - 1)
+        vol_pct = 100 * np.sqrt(np.maximum(var, 0))
+        high = np.maximum.reduceat(h, starts)
+        low_w = np.minimum.reduceat(low, starts)
+
+        # ATR: true range só das últimas atr_period barras de cada ativo
+        atr_begin = np.maximum(starts + 1, ends - atr_period)
+        rows, bounds = _ranges(np.minimum(atr_begin, last), ends)
+        prev = c[rows - 1]
+        true_range = np.maximum(h[rows] - low[rows],
+                                np.maximum(np.abs(h[rows] - prev), np.abs(low[rows] - prev)))
+        atr = np.where(counts > 1, np.add.reduceat(true_range, bounds) / (ends - atr_begin), np.nan)
+
+        # sessão mais recente de cada ativo (mesma regra de pausa do resampling): só as linhas dela
+        session_starts = np.flatnonzero(resampling.session_breaks(times, new_group))
+        last_session = session_starts[np.searchsorted(session_starts, last, side="right") - 1]
+        rows, bounds = _ranges(last_session, ends)
+        hs, lows, vs = h[rows], low[rows], v[rows]
+        volume_session = np.add.reduceat(vs, bounds)
+        vwap = np.add.reduceat((hs + lows + c[rows]) / 3 * vs, bounds) / volume_session
+        session_high = np.maximum.reduceat(hs, bounds)
+        session_low = np.minimum.reduceat(lows, bounds)
+        gap = np.where(last_session > starts,
+                       o[last_session] / c[np.maximum(last_session - 1, 0)] - 1, np.nan)
+
+        last_close = c[last]
+        prev_close = np.where(counts > 1, c[np.maximum(last - 1, 0)], np.nan)
+        out = pd.DataFrame({
+            "symbol": symbols,
+            "exchange": exchanges,
+            "bars": counts,
+            "last_close": last_close,
+            "ret_1_pct": 100 * (last_close / prev_close - 1),
+            "ret_window_pct": 100 * (last_close / c[starts] - 1),
+            "vol_pct": vol_pct,
+            "atr": atr,
+            "atr_pct": 100 * atr / last_close,
+            "vwap_session": vwap,
+            "dist_vwap_pct": 100 * (last_close / vwap - 1),
+            "gap_pct": 100 * gap,
+            "high": high,
+            "low": low_w,
+            "range_pct": 100 * (high - low_w) / last_close,
+            "pos_range": np.where(high > low_w, (last_close - low_w) / (high - low_w), np.nan),
+            "session_high": session_high,
+            "session_low": session_low,
+            "volume_session": volume_session,
+        })
+
+    is_target = _is_target(symbols, exchanges, ativo_alvo)
+    target = int(np.flatnonzero(is_target)[0]) if is_target.any() else None
+    out["corr_alvo"] = _correlations(times, returns, starts, ends, target)
+    return out[FEATURE_COLUMNS]
+
+
+def encode_summary(df: pd.DataFrame, ativo_alvo=None, tail_bars=0, encode_bars=None) -> str:
+    """
+    Resumo em texto: cabeçalho explicativo + CSV de features (uma linha por ativo).
+    Com tail_bars, anexa as últimas barras de cada ativo codificadas por encode_bars(df).
+    """
+    features = compute_features(df, ativo_alvo)
+    lines = [
+        "# resumo de features por ativo (calculado localmente a partir das barras)",
+        "# ret_1_pct=retorno da última barra, ret_window_pct=retorno na janela, vol_pct=desvio dos retornos por barra",
+        f"# atr=ATR({FEATURES_ATR_PERIOD}) em preço, vwap_session/dist_vwap_pct=VWAP da última sessão e distância do fechamento",
+        "# gap_pct=abertura da última sessão vs fechamento anterior, pos_range=posição do fechamento na faixa da janela (0=mínima, 1=máxima)",
+        f"# corr_alvo=correlação dos retornos com o ativo alvo ({(ativo_alvo or '-').strip()})",
+        features.to_csv(index=False, float_format="%.6g").strip(),
+    ]
+    if tail_bars:
+        base = _base_rows(df)
+        tail = base.sort_values(["symbol", "datetime"]).groupby(["symbol", "exchange"], sort=False).tail(tail_bars)
+        body = encode_bars(tail) if encode_bars else tail.to_csv(index=False)
+        lines += ["", f"# últimas {tail_bars} barras de cada ativo", body.strip()]
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,139 @@
+import os
+import copy
+import json
+import time
+import uuid
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+import include.telemetry as telemetry
+
+# ======================================================================
+# JOBS EM SEGUNDO PLANO
+# ======================================================================
+# A automação roda num pool de threads do processo, fora do script do Streamlit.
+# Cada job é gravado em data/jobs/<id>.json a cada mudança: recarregar a página
+# (ou reiniciar o servidor) não perde o resultado. O id do job é também o trace_id dos
+# spans da execução (include/telemetry.py).
+JOBS_DIR = os.getenv("JOBS_DIR", os.path.join("data", "jobs"))
+JOBS_MAX_WORKERS = int(os.getenv("JOBS_MAX_WORKERS", 2))
+# Jobs mais antigos que isso (segundos) são apagados na inicialização
+JOBS_RETENTION = float(os.getenv("JOBS_RETENTION", 24 * 3600))
+
+ACTIVE = ("queued", "running")
+
+_lock = threading.Lock()
+_jobs = {}  # id -> dict
+_executor = ThreadPoolExecutor(max_workers=JOBS_MAX_WORKERS, thread_name_prefix="job")
+
+
+def _path(job_id):
+    return os.path.join(JOBS_DIR, f"{job_id}.json")
+
+
+def _persist(job):
+    os.makedirs(JOBS_DIR, exist_ok=True)
+    tmp = _path(job["id"]) + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(job, f, ensure_ascii=False, default=str)
+    os.replace(tmp, _path(job["id"]))
+
+
+def _load():
+    """Recupera os jobs gravados; os que estavam em andamento foram interrompidos."""
+    if not os.path.isdir(JOBS_DIR):
+        return
+    now = time.time()
+    for entry in os.scandir(JOBS_DIR):
+        if not entry.name.endswith(".json"):
+            continue
+        try:
+            with open(entry.path, "r", encoding="utf-8") as f:
+                job = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if now - job.get("created_at", 0) > JOBS_RETENTION:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+            continue
+        if job.get("status") in ACTIVE:
+            job["status"] = "failed"
+            job["error"] = "Execução interrompida (servidor reiniciado)."
+            _persist(job)
+        _jobs[job["id"]] = job
+
+
+def update(job_id, **fields):
+    """
+    Atualiza campos do job (progresso, prévias, resultado) e grava em disco.
+    Guarda uma cópia dos valores: quem publicou pode continuar alterando suas listas/dicts
+    fora do lock enquanto outra thread serializa o job.
+    """
+    fields = copy.deepcopy(fields)
+    with _lock:
+        job = _jobs[job_id]
+        job.update(fields)
+        job["updated_at"] = time.time()
+        _persist(job)
+
+
+def _run(job_id, fn, params):
+    update(job_id, status="running", started_at=time.time(), trace_id=job_id)
+    try:
+        with telemetry.trace(job_id), telemetry.span(f"job.{fn.__name__}"):
+            result = fn(params, lambda **fields: update(job_id, **fields))
+    except Exception as e:
+        traceback.print_exc()
+        update(job_id, status="failed", error=str(e), finished_at=time.time())
+    else:
+        update(job_id, status="done", result=result, finished_at=time.time())
+
+
+def submit(user_id, fn, params: dict) -> str:
+    """
+    Enfileira fn(params, update) e devolve o id do job.
+    fn publica progresso chamando update(**campos) e retorna o resultado (serializável em JSON).
+    """
+    job_id = uuid.uuid4().hex
+    job = {
+        "id": job_id,
+        "user_id": user_id,
+        "status": "queued",
+        "params": params,
+        "created_at": time.time(),
+        "dismissed": False,
+    }
+    with _lock:
+        _jobs[job_id] = job
+        _persist(job)
+    _executor.submit(_run, job_id, fn, params)
+    return job_id
+
+
+def get(job_id):
+    """Cópia do estado atual do job (ou None)."""
+    with _lock:
+        job = _jobs.get(job_id)
+        return json.loads(json.dumps(job, default=str)) if job else None
+
+
+def latest_for_user(user_id):
+    """Job mais recente do usuário que ainda não foi dispensado na interface."""
+    with _lock:
+        candidates = [j for j in _jobs.values() if j["user_id"] == user_id and not j["dismissed"]]
+    if not candidates:
+        return None
+    return get(max(candidates, key=lambda j: j["created_at"])["id"])
+
+
+def dismiss(job_id):
+    """Marca o job como visto ("Nova Consulta"): não é mais retomado ao recarregar."""
+    with _lock:
+        if job_id in _jobs:
+            _jobs[job_id]["dismissed"] = True
+            _persist(_jobs[job_id])
+
+
+_load()
@@ -0,0 +1,361 @@
+import os
+import sys
+import time
+import uuid
+import random
+import logging
+import smtplib
+import argparse
+import threading
+from email.mime.text import MIMEText
+from email.mime.multipart import MIMEMultipart
+from pymysql import MySQLError
+import include.users_database as udb
+import include.telemetry as telemetry
+
+# ======================================================================
+# FILA DE EMAILS (OUTBOX)
+# ======================================================================
+# A página só grava a mensagem em `mail_outbox`; uma thread do processo (ou o worker
+# `python -m include.mail_outbox`) envia em lotes reaproveitando a mesma conexão SMTP
+# autenticada e reagenda falhas temporárias com backoff exponencial.
+# O corpo (com o token de recuperação de senha) só fica guardado enquanto a mensagem
+# está na fila: ao ser enviada ou descartada, a coluna html é esvaziada.
+#
+# Para testar com um SMTP local:  python -m aiosmtpd -n -l localhost:1025
+#   SMTP_HOST=localhost SMTP_PORT=1025 SMTP_SSL=0 SMTP_USER=   (sem login)
+SMTP_HOST = os.getenv("SMTP_HOST", "smtp.titan.email")
+SMTP_PORT = int(os.getenv("SMTP_PORT", 465))
+SMTP_SSL = os.getenv("SMTP_SSL", "1").lower() not in ("0", "false", "no")
+SMTP_USER = os.getenv("SMTP_USER", "noreply@sapwise.com.br")
+MAIL_FROM = os.getenv("MAIL_FROM", "noreply@sapwise.com.br")
+MAIL_BATCH_SIZE = int(os.getenv("MAIL_BATCH_SIZE", 20))
+MAIL_MAX_ATTEMPTS = int(os.getenv("MAIL_MAX_ATTEMPTS", 5))
+# Espera (segundos) antes da 1ª nova tentativa; dobra a cada falha
+MAIL_RETRY_BASE = float(os.getenv("MAIL_RETRY_BASE", 30))
+# Intervalo (segundos) entre varreduras da fila quando não há aviso de mensagem nova
+MAIL_POLL_INTERVAL = float(os.getenv("MAIL_POLL_INTERVAL", 15))
+# Conexão SMTP ociosa por mais que isso (segundos) é encerrada
+MAIL_IDLE_TIMEOUT = float(os.getenv("MAIL_IDLE_TIMEOUT", 60))
+# Mensagem em "sending" há mais que isso (segundos) volta para a fila (worker morreu no meio)
+MAIL_CLAIM_TIMEOUT = 600
+
+
+
+def create_table(conn):
+    if conn is None:
+        return False
+
+    create_table_sql = """
+        CREATE TABLE IF NOT EXISTS mail_outbox (
+            id BIGINT AUTO_INCREMENT PRIMARY KEY,
+            to_addr VARCHAR(150) NOT NULL,
+            subject VARCHAR(200) NOT NULL,
+            html MEDIUMTEXT NOT NULL,
+            status VARCHAR(10) NOT NULL DEFAULT 'queued',
+            attempts INT NOT NULL DEFAULT 0,
+            next_attempt_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            claimed_by CHAR(32),
+            claimed_at DATETIME,
+            last_error VARCHAR(500),
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            sent_at DATETIME,
+            INDEX idx_outbox_status_next (status, next_attempt_at)
+        );
+    """
+    with conn.cursor() as cursor:
+        cursor.execute(create_table_sql)
+    conn.commit()
+    return True
+
+
+_table_ready = False
+
+
+def _ensure_table(conn):
+    global _table_ready
+    if not _table_ready:
+        _table_ready = create_table(conn)
+        if _table_ready:
+            purge_bodies(conn)
+
+
+def purge_bodies(conn):
+    """Esvazia o corpo das mensagens já enviadas ou descartadas (gravadas antes da limpeza no envio)."""
+    with conn.cursor() as cursor:
+        cursor.execute("UPDATE mail_outbox SET html = '' WHERE status IN ('sent', 'failed') AND html <> ''")
+        purged = cursor.rowcount
+    conn.commit()
+    return purged
+
+
+def _smtp_password():
+    password = os.getenv("EMAIL_PASSWORD")
+    if password:
+        return password
+    try:
+        import streamlit as st
+        return st.secrets["EMAIL_PASSWORD"]
+    except Exception:
+        return ""
+
+
+# ----------------------------------------------------------------------
+# Enfileiramento (caminho da requisição)
+# ----------------------------------------------------------------------
+def enqueue(conn, to_addr, subject, html, commit=True):
+    """Grava a mensagem na fila e acorda o envio. Retorna o id da mensagem."""
+    _ensure_table(conn)
+    with conn.cursor() as cursor:
+        cursor.execute(
+            "INSERT INTO mail_outbox (to_addr, subject, html) VALUES (%s, %s, %s)",
+            (to_addr, subject, html)
+        )
+        message_id = cursor.lastrowid
+    if commit:
+        conn.commit()
+    start_sender()
+    return message_id
+
+
+# ----------------------------------------------------------------------
+# Envio
+# ----------------------------------------------------------------------
+class SmtpConnection:
+    """Uma conexão SMTP autenticada, reaberta sob demanda e fechada quando ociosa."""
+
+    def __init__(self, host=None, port=None, use_ssl=None, user=None, password=None):
+        self.host = host or SMTP_HOST
+        self.port = port or SMTP_PORT
+        self.use_ssl = SMTP_SSL if use_ssl is None else use_ssl
+        self.user = SMTP_USER if user is None else user
+        self.password = password
+        self.server = None
+        self.last_used = 0.0
+        self.logins = 0
+
+    def _open(self):
+        cls = smtplib.SMTP_SSL if self.use_ssl else smtplib.SMTP
+        server = cls(self.host, self.port, timeout=30)
+        password = _smtp_password() if self.password is None else self.password
+        try:
+            if self.user and password:
+                server.login(self.user, password)
+                self.logins += 1
+        except BaseException:
+            server.close()
+            raise
+        self.server = server
+
+    def send(self, to_addr, subject, html):
+        msg = MIMEMultipart()
+        msg["From"] = MAIL_FROM
+        msg["To"] = to_addr
+        msg["Subject"] = subject
+        msg.attach(MIMEText(html, "html"))
+
+        if self.server is None:
+            self._open()
+        try:
+            self.server.sendmail(MAIL_FROM, [to_addr], msg.as_string())
+        except smtplib.SMTPServerDisconnected:
+            # servidor derrubou a conexão ociosa: reabre uma vez
+            self.server = None
+            self._open()
+            self.server.sendmail(MAIL_FROM, [to_addr], msg.as_string())
+        self.last_used = time.monotonic()
+
+    def close_if_idle(self, idle_timeout=None):
+        idle_timeout = MAIL_IDLE_TIMEOUT if idle_timeout is None else idle_timeout
+        if self.server is not None and time.monotonic() - self.last_used >= idle_timeout:
+            self.close()
+
+    def close(self):
+        if self.server is not None:
+            try:
+                self.server.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self.server = None
+
+
+def _claim_batch(conn, worker_id, batch_size):
+    """Reserva até batch_size mensagens vencidas para este worker e as devolve."""
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            UPDATE mail_outbox
+            SET status = 'sending', claimed_by = %s, claimed_at = NOW()
+            WHERE (status = 'queued' AND next_attempt_at <= NOW())
+               OR (status = 'sending' AND claimed_at < NOW() - INTERVAL %s SECOND)
+            ORDER BY id
+            LIMIT %s
+        """, (worker_id, MAIL_CLAIM_TIMEOUT, batch_size))
+        conn.commit()
+        cursor.execute("""
+            SELECT id, to_addr, subject, html, attempts
+            FROM mail_outbox
+            WHERE claimed_by = %s AND status = 'sending'
+            ORDER BY id
+        """, (worker_id,))
+        return cursor.fetchall()
+
+
+def is_connection_error(error):
+    """
+    Falha ao conectar/autenticar (servidor fora, senha SMTP trocada): não é culpa da mensagem
+    e atinge todas as da fila. Inclui 5xx como o 535 do login.
+    """
+    if isinstance(error, (smtplib.SMTPAuthenticationError, smtplib.SMTPConnectError,
+                          smtplib.SMTPHeloError, smtplib.SMTPServerDisconnected)):
+        return True
+    # SMTPException é subclasse de OSError: aqui só erros de rede/socket
+    return isinstance(error, OSError) and not isinstance(error, smtplib.SMTPException)
+
+
+def is_permanent(error):
+    """Só a recusa do destinatário ou da mensagem com 5xx não adianta repetir; 4xx e rede sim."""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(code >= 500 for code, _ in error.recipients.values())
+    if isinstance(error, (smtplib.SMTPDataError, smtplib.SMTPSenderRefused)):
+        return error.smtp_code >= 500
+    return False
+
+
+def retry_delay(attempts):
+    """Backoff exponencial com jitter para a tentativa número `attempts` (1, 2, ...)."""
+    delay = MAIL_RETRY_BASE * 2 ** (attempts - 1)
+    return delay * random.uniform(0.8, 1.2)
+
+
+def send_batch(conn, smtp, worker_id=None, batch_size=None) -> dict:
+    """
+    Envia um lote da fila. Retorna {"sent", "retry", "failed", "deferred"}.
+    Se a conexão/login com o SMTP falhar, o lote para: a mensagem atual e as restantes
+    voltam para a fila intactas (sem contar tentativa) e são contadas em "deferred".
+    """
+    worker_id = worker_id or uuid.uuid4().hex
+    batch_size = batch_size or MAIL_BATCH_SIZE
+    _ensure_table(conn)
+    result = {"sent": 0, "retry": 0, "failed": 0, "deferred": 0}
+
+    batch = _claim_batch(conn, worker_id, batch_size)
+    for position, (message_id, to_addr, subject, html, attempts) in enumerate(batch):
+        try:
+            smtp.send(to_addr, subject, html)
+        except (smtplib.SMTPException, OSError) as e:
+            error = f"{type(e).__name__}: {e}"[:500]
+            if is_connection_error(e):
+                smtp.close()
+                with conn.cursor() as cursor:
+                    cursor.execute("""
+                        UPDATE mail_outbox
+                        SET status = 'queued', last_error = %s, claimed_by = NULL,
+                            next_attempt_at = NOW() + INTERVAL %s SECOND
+                        WHERE claimed_by = %s AND status = 'sending'
+                    """, (error, int(retry_delay(attempts + 1)), worker_id))
+                conn.commit()
+                result["deferred"] += len(batch) - position
+                break
+            permanent = is_permanent(e)
+            if not permanent:
+                smtp.close()  # conexão em estado incerto: a próxima mensagem reconecta
+            attempts += 1
+            with conn.cursor() as cursor:
+                if permanent or attempts >= MAIL_MAX_ATTEMPTS:
+                    cursor.execute("""
+                        UPDATE mail_outbox
+                        SET status = 'failed', attempts = %s, last_error = %s, claimed_by = NULL, html = ''
+                        WHERE id = %s
+                    """, (attempts, error, message_id))
+                    result["failed"] += 1
+                else:
+                    cursor.execute("""
+                        UPDATE mail_outbox
+                        SET status = 'queued', attempts = %s, last_error = %s, claimed_by = NULL,
+                            next_attempt_at = NOW() + INTERVAL %s SECOND
+                        WHERE id = %s
+                    """, (attempts, error, int(retry_delay(attempts)), message_id))
+                    result["retry"] += 1
+        else:
+            with conn.cursor() as cursor:
+                cursor.execute("""
+                    UPDATE mail_outbox
+                    SET status = 'sent', attempts = attempts + 1, sent_at = NOW(), claimed_by = NULL, html = ''
+                    WHERE id = %s
+                """, (message_id,))
+            result["sent"] += 1
+        conn.commit()
+    return result
+
+
+def drain(conn=None, smtp=None) -> dict:
+    """Envia lotes até a fila não ter mais mensagens vencidas (ou o SMTP ficar inacessível)."""
+    total = {"sent": 0, "retry": 0, "failed": 0, "deferred": 0}
+    own_conn, own_smtp = conn is None, smtp is None
+    conn = conn or udb.create_connection()
+    if conn is None:
+        return total
+    smtp = smtp or SmtpConnection()
+    worker_id = uuid.uuid4().hex
+    try:
+        while True:
+            result = send_batch(conn, smtp, worker_id)
+            for key in total:
+                total[key] += result[key]
+            # SMTP fora: as mensagens já voltaram para a fila, tenta de novo na próxima varredura
+            if result["deferred"] or sum(result.values()) == 0:
+                return total
+    finally:
+        if own_smtp:
+            smtp.close()
+        if own_conn:
+            conn.close()
+
+
+# ----------------------------------------------------------------------
+# Thread de envio do processo
+# ----------------------------------------------------------------------
+_wake = threading.Event()
+_sender_lock = threading.Lock()
+_sender_thread = None
+
+
+def _sender_loop():
+    smtp = SmtpConnection()
+    while True:
+        _wake.wait(MAIL_POLL_INTERVAL)
+        _wake.clear()
+        try:
+            drain(smtp=smtp)
+        except MySQLError as e:
+            telemetry.log(logging.ERROR, "mail_outbox.db_failed", error=f"{type(e).__name__}: {e}")
+        except Exception as e:
+            telemetry.log(logging.ERROR, "mail_outbox.send_failed", error=f"{type(e).__name__}: {e}")
+        smtp.close_if_idle()
+
+
+def start_sender():
+    """Inicia (uma vez por processo) a thread que esvazia a fila, e a acorda."""
+    global _sender_thread
+    with _sender_lock:
+        if _sender_thread is None or not _sender_thread.is_alive():
+            _sender_thread = threading.Thread(target=_sender_loop, name="mail-outbox", daemon=True)
+            _sender_thread.start()
+    _wake.set()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Envia os emails da fila mail_outbox.")
+    parser.add_argument("--once", action="store_true", help="esvazia a fila uma vez e sai")
+    args = parser.parse_args(argv)
+
+    if args.once:
+        print(f"[mail_outbox] {drain()}")
+        return 0
+    start_sender()
+    while True:
+        time.sleep(3600)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,10 +1,7 @@
-import os
 import streamlit as st
 import include.users_database as udb
 import time, secrets, re, datetime, hashlib
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
+import include.mail_outbox as mail_outbox
 
 # Função para gerar um token seguro
 def gerar_token():
@@ -191,7 +188,6 @@ def forgot_password():
             exp_time = (datetime.datetime.now() + datetime.timedelta(minutes=15))
             _url = f'https://sapwise.com.br/?token={token}&email={email}&exptime={exp_time}'
             inserir_token_e_expiracao(email, token, exp_time, conn)
-            conn.close()
 
             # Criação da mensagem
             mensagem = f'''
@@ -273,18 +269,9 @@ def forgot_password():
             </html>
             '''
 
-            # Configuração do e-mail
-            email_msg = MIMEMultipart()
-            email_msg['From'] = "noreply@sapwise.com.br"
-            email_msg['To'] = email
-            email_msg['Subject'] = "Recuperação de Senha | SAP Wise"
-            email_msg.attach(MIMEText(mensagem, 'html'))  # Define o conteúdo como HTML
-
-            # Envio do e-mail
-            server = smtplib.SMTP_SSL('smtp.titan.email', 465)
-            server.login("noreply@sapwise.com.br", os.getenv("EMAIL_PASSWORD") or st.secrets["EMAIL_PASSWORD"])
-            server.sendmail(email_msg['From'], email_msg['To'], email_msg.as_string())
-            server.quit()
+            # Envio do e-mail: só entra na fila, o envio SMTP roda em segundo plano
+            mail_outbox.enqueue(conn, email, "Recuperação de Senha | SAP Wise", mensagem)
+            conn.close()
 
         else:
             st.warning(f'O processo de redefinição de senha foi concluído, caso haja algum cadastro no email informado enviaremos um email com mais instruções para redefinir sua senha')
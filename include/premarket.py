@@ -0,0 +1,295 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import logging
+import argparse
+import datetime
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import pymysql
+import include.users_database as udb
+import include.dataset_encoder as dataset_encoder
+import include.dataset_artifacts as dataset_artifacts
+import include.telemetry as telemetry
+import include.resampling as resampling
+from include.tv_collector import iter_tv_all, concat_frames, parse_user_symbol, completeness_report
+from include.agent import build_system_prompt, ask_agent_with_dataset
+
+# ======================================================================
+# PRÉ-CÁLCULO DOS PRESETS ANTES DA ABERTURA
+# ======================================================================
+# Lê os presets de todos os usuários, busca cada símbolo uma única vez (com o maior
+# número de barras pedido), roda o agente por preset com concorrência limitada e grava
+# a resposta em `precomputed_analyses`. O dashboard oferece o resultado pronto.
+#
+# Uso (cron às 08:40, por exemplo):   python -m include.premarket
+# Agendado no próprio processo:       python -m include.premarket --at 08:40
+PREMARKET_MAX_CONCURRENCY = int(os.getenv("PREMARKET_MAX_CONCURRENCY", 4))
+# Idade máxima (segundos) de uma análise pré-calculada exibida no dashboard
+PREMARKET_MAX_AGE = float(os.getenv("PREMARKET_MAX_AGE", 3 * 3600))
+# Por quanto tempo (segundos) o dashboard reaproveita a consulta de uma análise pré-calculada
+PREMARKET_RESULT_CACHE = float(os.getenv("PREMARKET_RESULT_CACHE", 60))
+PREMARKET_DIR = os.path.join("data", "premarket")
+
+# Mesmos padrões do formulário do dashboard para chaves ausentes no preset
+PRESET_DEFAULTS = {"bars": 100, "model": "gpt-5-2025-08-07", "dataset_format": "csv", "timeframes": ["1m"]}
+
+_results_lock = threading.Lock()
+_results = {}  # (user_id, preset, versão dos presets, config_hash) -> (consultado_em, resultado ou None)
+
+
+def config_hash(config: dict) -> str:
+    """Hash da configuração do preset (com os padrões): uma análise só vale para a config que a gerou."""
+    canonical = json.dumps(dict(PRESET_DEFAULTS, **config), sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def create_table(conn):
+    if conn is None:
+        return False
+
+    create_table_sql = """
+        CREATE TABLE IF NOT EXISTS precomputed_analyses (
+            user_id INT NOT NULL,
+            preset_name VARCHAR(100) NOT NULL,
+            resposta MEDIUMTEXT NOT NULL,
+            dataset_report TEXT,
+            config_hash CHAR(64),
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+            PRIMARY KEY (user_id, preset_name)
+        );
+    """
+    with conn.cursor() as cursor:
+        cursor.execute(create_table_sql)
+        # tabelas anteriores ao config_hash: linhas antigas ficam NULL e deixam de ser oferecidas
+        try:
+            cursor.execute("ALTER TABLE precomputed_analyses ADD COLUMN config_hash CHAR(64) AFTER dataset_report")
+        except pymysql.MySQLError as e:
+            if e.args[0] != 1060:  # coluna já existe
+                raise
+    conn.commit()
+    return True
+
+
+def load_all_presets(conn):
+    """Lista (user_id, nome, config) de todos os presets de usuários ativos."""
+    if conn is None:
+        return []
+
+    query = """
+        SELECT p.user_id, p.name, p.config
+        FROM presets p
+        JOIN users u ON u.id = p.user_id
+        WHERE u.contract_status = 'active'
+    """
+    with conn.cursor(pymysql.cursors.DictCursor) as cursor:
+        cursor.execute(query)
+        rows = cursor.fetchall()
+    return [(r["user_id"], r["name"], dict(PRESET_DEFAULTS, **json.loads(r["config"]))) for r in rows]
+
+
+def _symbols(config):
+    ativos = config.get("ativos_b3", "").split(",") + config.get("ativos_fx", "").split(",")
+    return [a.strip() for a in ativos if a.strip()]
+
+
+def save_result(conn, user_id, preset_name, resposta, dataset_report, config):
+    query = """
+        INSERT INTO precomputed_analyses (user_id, preset_name, resposta, dataset_report, config_hash)
+        VALUES (%s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE
+            resposta = VALUES(resposta),
+            dataset_report = VALUES(dataset_report),
+            config_hash = VALUES(config_hash),
+            created_at = CURRENT_TIMESTAMP
+    """
+    with conn.cursor() as cursor:
+        cursor.execute(query, (user_id, preset_name, resposta, json.dumps(dataset_report, default=str),
+                               config_hash(config)))
+        conn.commit()
+
+
+def _query_result(user_id, preset_name, digest, max_age):
+    conn = udb.create_connection()
+    if conn is None:
+        return None
+
+    query = """
+        SELECT resposta, dataset_report, created_at
+        FROM precomputed_analyses
+        WHERE user_id = %s AND preset_name = %s AND config_hash = %s
+          AND created_at >= NOW() - INTERVAL %s SECOND
+    """
+    try:
+        with conn.cursor(pymysql.cursors.DictCursor) as cursor:
+            cursor.execute(query, (user_id, preset_name, digest, int(max_age)))
+            row = cursor.fetchone()
+    except pymysql.MySQLError:
+        row = None  # tabela ainda não criada (batch nunca rodou)
+    finally:
+        conn.close()
+    if row is None:
+        return None
+    row["dataset_report"] = json.loads(row["dataset_report"] or "{}")
+    return row
+
+
+def get_result(user_id, preset_name, config, version=None, max_age=None):
+    """
+    Análise pré-calculada recente do preset (dict com resposta, dataset_report, created_at) ou None.
+    Só vale se foi gerada com a mesma config; a consulta fica em cache por
+    PREMARKET_RESULT_CACHE segundos por (usuário, preset, versão dos presets, config).
+    """
+    max_age = PREMARKET_MAX_AGE if max_age is None else max_age
+    digest = config_hash(config)
+    key = (user_id, preset_name, version, digest)
+    now = time.monotonic()
+    with _results_lock:
+        cached = _results.get(key)
+    if cached is not None and now - cached[0] < PREMARKET_RESULT_CACHE:
+        row = cached[1]
+    else:
+        row = _query_result(user_id, preset_name, digest, max_age)
+        with _results_lock:
+            # só a versão atual de cada (usuário, preset) fica em memória
+            for old in [k for k in _results if k[:2] == key[:2]]:
+                del _results[old]
+            _results[key] = (now, row)
+    return dict(row) if row is not None else None
+
+
+def _run_preset(user_id, name, config, frames):
+    """Monta o dataset do preset a partir das séries já coletadas e consulta o agente."""
+    bars = int(config["bars"])
+    timeframes = resampling.normalize_timeframes(config["timeframes"])
+    parts = []
+    for sym in _symbols(config):
+        df = frames.get(parse_user_symbol(sym))
+        if df is None:
+            continue
+        if timeframes == [resampling.BASE_TIMEFRAME]:
+            parts.append(df.tail(bars))
+        else:
+            # timeframes maiores agregados da série de 1m já coletada
+            df = df.tail(resampling.base_bars(bars, timeframes))
+            parts.append(resampling.with_timeframes(df, timeframes, bars))
+    df_all = concat_frames(parts)
+    if df_all.empty:
+        raise RuntimeError("Nenhum dado coletado para os símbolos do preset.")
+
+    encoded = dataset_encoder.encode(df_all, config["dataset_format"], ativo_alvo=config.get("ativo_alvo", ""))
+    baseline = encoded if config["dataset_format"] == "csv" else None
+    relatorio = dataset_encoder.size_report(df_all, encoded, baseline)
+    relatorio["format"] = config["dataset_format"]
+    relatorio["trace_id"] = telemetry.current_trace_id()
+    artifact = dataset_artifacts.save_async(encoded, PREMARKET_DIR)
+    if artifact:
+        relatorio["dataset_artifact"] = artifact
+
+    inicio = time.perf_counter()
+    prompt = build_system_prompt(config.get("ativo_alvo", ""))
+    # presets iguais de usuários diferentes caem no cache do agente (include/agent_cache.py)
+    resposta = ask_agent_with_dataset(prompt, encoded, config["model"], stats=relatorio,
+                                      encoding=config["dataset_format"])
+    relatorio["agent_seconds"] = time.perf_counter() - inicio
+    return resposta, relatorio
+
+
+def run_batch(max_concurrency=None) -> dict:
+    """Executa o pré-cálculo de todos os presets. Retorna um resumo da execução."""
+    max_concurrency = max_concurrency or PREMARKET_MAX_CONCURRENCY
+    inicio = time.time()
+    conn = udb.create_connection()
+    if conn is None:
+        raise RuntimeError("Erro ao conectar ao banco MySQL.")
+    try:
+        create_table(conn)
+        presets = load_all_presets(conn)
+    finally:
+        conn.close()
+    if not presets:
+        return {"presets": 0, "symbols": 0, "ok": 0, "failed": 0, "seconds": time.time() - inicio}
+
+    # união dos símbolos, cada um com o maior número de barras de 1m pedido
+    bars_by_symbol = {}
+    for _, _, config in presets:
+        needed = resampling.base_bars(config["bars"], config["timeframes"])
+        for sym in _symbols(config):
+            key = parse_user_symbol(sym)
+            bars_by_symbol[key] = max(bars_by_symbol.get(key, 0), needed)
+
+    frames, resultados = {}, []
+    for bars in sorted(set(bars_by_symbol.values())):
+        group = [f"{s}:{e}" for (s, e), b in bars_by_symbol.items() if b == bars]
+        for _, sym, df, msg in iter_tv_all(group, [], bars):
+            resultados.append((len(resultados), sym, df, msg))
+            if msg is not None:
+                telemetry.log(logging.WARNING, "premarket.symbol_failed", ativo=sym, detalhe=msg[1])
+            else:
+                frames[parse_user_symbol(sym)] = df
+    coleta = completeness_report(resultados, time.time() - inicio)
+    telemetry.log(logging.INFO, "premarket.collected", symbols=len(frames), requested=len(bars_by_symbol),
+                  presets=len(presets))
+
+    def task(item):
+        user_id, name, config = item
+        # um trace por preset (aparece no dataset_report da análise e no log de erro)
+        with telemetry.trace():
+            try:
+                with telemetry.span("premarket.preset", user_id=user_id, preset=name):
+                    resposta, relatorio = _run_preset(user_id, name, config, frames)
+                conn = udb.create_connection()
+                try:
+                    save_result(conn, user_id, name, resposta, relatorio, config)
+                finally:
+                    conn.close()
+                return True
+            except Exception as e:
+                telemetry.log(logging.ERROR, "premarket.preset_failed", user_id=user_id, preset=name,
+                              error=f"{type(e).__name__}: {e}")
+                return False
+
+    with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        results = list(executor.map(task, presets))
+
+    return {
+        "presets": len(presets),
+        "symbols": len(frames),
+        "missing": [f["ativo"] for f in coleta["faltando"]],
+        "ok": sum(results),
+        "failed": len(results) - sum(results),
+        "seconds": time.time() - inicio,
+    }
+
+
+def _seconds_until(hhmm: str) -> float:
+    hour, minute = (int(x) for x in hhmm.split(":"))
+    now = datetime.datetime.now()
+    target = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if target <= now:
+        target += datetime.timedelta(days=1)
+    return (target - now).total_seconds()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pré-cálculo das análises de todos os presets.")
+    parser.add_argument("--at", metavar="HH:MM", help="roda todo dia neste horário (sem isso, roda uma vez)")
+    parser.add_argument("--concurrency", type=int, default=None, help="análises do agente em paralelo")
+    args = parser.parse_args(argv)
+
+    if args.at:
+        telemetry.start_metrics_server()
+    while True:
+        if args.at:
+            time.sleep(_seconds_until(args.at))
+        with telemetry.trace(), telemetry.span("premarket.batch"):
+            resumo = run_batch(args.concurrency)
+            telemetry.log(logging.INFO, "premarket.batch_done", **resumo)
+        if not args.at:
+            return 0 if resumo["failed"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,168 @@
+import os
+import json
+import time
+import threading
+import pymysql
+import include.users_database as udb
+
+# ======================================================================
+# REPOSITÓRIO DE PRESETS
+# ======================================================================
+# Cache por usuário dos presets já decodificados. Toda escrita incrementa
+# preset_versions.version na mesma transação; outras réplicas comparam essa versão
+# (consulta por chave primária) antes de reaproveitar o próprio cache.
+# Intervalo (segundos) entre verificações de versão no banco (0 = verifica sempre)
+PRESETS_VERSION_CHECK = float(os.getenv("PRESETS_VERSION_CHECK", 5))
+
+_lock = threading.Lock()
+_cache = {}  # user_id -> {"version": int, "checked_at": float, "presets": {nome: config}}
+_tables_ready = False
+
+
+def create_tables(conn):
+    if conn is None:
+        return False
+
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS presets (
+                user_id INT NOT NULL,
+                name VARCHAR(100) NOT NULL,
+                config TEXT NOT NULL,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+                PRIMARY KEY (user_id, name)
+            );
+        """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS preset_versions (
+                user_id INT PRIMARY KEY,
+                version BIGINT NOT NULL DEFAULT 0
+            );
+        """)
+    conn.commit()
+    return True
+
+
+def _ensure_tables(conn):
+    global _tables_ready
+    if not _tables_ready:
+        _tables_ready = create_tables(conn)
+
+
+def _read_version(cursor, user_id):
+    cursor.execute("SELECT version FROM preset_versions WHERE user_id = %s", (user_id,))
+    row = cursor.fetchone()
+    return row[0] if row else 0
+
+
+def _bump_version(cursor, user_id):
+    cursor.execute("""
+        INSERT INTO preset_versions (user_id, version) VALUES (%s, 1)
+        ON DUPLICATE KEY UPDATE version = version + 1
+    """, (user_id,))
+    return _read_version(cursor, user_id)
+
+
+def version(user_id):
+    """Versão atual dos presets do usuário no banco (0 se nunca gravou)."""
+    with udb.connection() as conn:
+        if conn is None:
+            return None
+        _ensure_tables(conn)
+        with conn.cursor() as cursor:
+            return _read_version(cursor, user_id)
+
+
+def cached_version(user_id):
+    """Versão dos presets do usuário já conhecida por este processo (sem consultar o banco)."""
+    with _lock:
+        entry = _cache.get(user_id)
+    return entry["version"] if entry else None
+
+
+def list_presets(user_id) -> dict:
+    """{nome: config} do usuário, vindo do cache enquanto a versão no banco não mudar."""
+    with _lock:
+        entry = _cache.get(user_id)
+    if entry is not None and time.monotonic() - entry["checked_at"] < PRESETS_VERSION_CHECK:
+        return dict(entry["presets"])
+
+    with udb.connection() as conn:
+        if conn is None:
+            return dict(entry["presets"]) if entry else {}
+        _ensure_tables(conn)
+        with conn.cursor() as cursor:
+            current = _read_version(cursor, user_id)
+        if entry is not None and entry["version"] == current:
+            entry["checked_at"] = time.monotonic()
+            return dict(entry["presets"])
+
+        query = """
+            SELECT name, config
+            FROM presets
+            WHERE user_id = %s
+            ORDER BY name
+        """
+        with conn.cursor(pymysql.cursors.DictCursor) as cursor:
+            cursor.execute(query, (user_id,))
+            rows = cursor.fetchall()
+
+    presets = {row["name"]: json.loads(row["config"]) for row in rows}
+    with _lock:
+        _cache[user_id] = {"version": current, "checked_at": time.monotonic(), "presets": presets}
+    return dict(presets)
+
+
+def _write_through(user_id, new_version, change):
+    """Aplica a escrita no cache local se ele estava na versão imediatamente anterior."""
+    with _lock:
+        entry = _cache.get(user_id)
+        if entry is not None and entry["version"] == new_version - 1:
+            presets = dict(entry["presets"])
+            change(presets)
+            presets = dict(sorted(presets.items(), key=lambda item: item[0].lower()))
+            _cache[user_id] = {"version": new_version, "checked_at": time.monotonic(), "presets": presets}
+        else:
+            # outra réplica escreveu no meio: recarrega na próxima leitura
+            _cache.pop(user_id, None)
+
+
+def save_preset(user_id, nome: str, dados: dict) -> bool:
+    query = """
+        INSERT INTO presets (user_id, name, config)
+        VALUES (%s, %s, %s)
+        ON DUPLICATE KEY UPDATE
+            config = VALUES(config),
+            updated_at = CURRENT_TIMESTAMP
+    """
+    config = json.dumps(dados, ensure_ascii=False)
+    with udb.connection() as conn:
+        if conn is None:
+            return False
+        _ensure_tables(conn)
+        with conn.cursor() as cursor:
+            cursor.execute(query, (user_id, nome, config))
+            new_version = _bump_version(cursor, user_id)
+            conn.commit()
+
+    parsed = json.loads(config)
+    _write_through(user_id, new_version, lambda presets: presets.__setitem__(nome, parsed))
+    return True
+
+
+def delete_preset(user_id, nome: str) -> bool:
+    query = """
+        DELETE FROM presets
+        WHERE user_id = %s AND name = %s
+    """
+    with udb.connection() as conn:
+        if conn is None:
+            return False
+        _ensure_tables(conn)
+        with conn.cursor() as cursor:
+            cursor.execute(query, (user_id, nome))
+            new_version = _bump_version(cursor, user_id)
+            conn.commit()
+
+    _write_through(user_id, new_version, lambda presets: presets.pop(nome, None))
+    return True
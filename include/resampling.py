@@ -0,0 +1,132 @@
+import os
+import numpy as np
+import pandas as pd
+
+# ======================================================================
+# MÚLTIPLOS TIMEFRAMES A PARTIR DAS BARRAS DE 1 MINUTO
+# ======================================================================
+# Só a série base (1m) vem do TradingView/store; 5m, 15m, 60m e diário são agregados
+# localmente. As barras nunca atravessam uma pausa de pregão: cada sessão começa um
+# novo bloco e os buckets intradiários são alinhados à abertura da sessão.
+# Pausa (segundos) sem barras que encerra uma sessão
+SESSION_GAP = float(os.getenv("SESSION_GAP", 30 * 60))
+# Máximo de barras de 1 minuto pedidas para montar os timeframes maiores
+TV_MAX_BASE_BARS = int(os.getenv("TV_MAX_BASE_BARS", 5000))
+
+BASE_TIMEFRAME = "1m"
+# Duração de cada timeframe em segundos; "1d" = uma barra por sessão
+TIMEFRAMES = {
+    "1m": 60,
+    "5m": 300,
+    "15m": 900,
+    "30m": 1800,
+    "60m": 3600,
+    "1d": 86400,
+}
+# Barras de 1m por barra de cada timeframe (pregão B3 de ~9h para o diário)
+BASE_BARS_PER_BAR = {"1m": 1, "5m": 5, "15m": 15, "30m": 30, "60m": 60, "1d": 540}
+# Coluna "timeframe": categórica ordenada do menor para o maior
+TIMEFRAME_DTYPE = pd.CategoricalDtype(list(TIMEFRAMES), ordered=True)
+
+
+def normalize_timeframes(timeframes) -> list:
+    """Lista ordenada (do menor para o maior) e sem repetição; None -> só a base."""
+    if not timeframes:
+        return [BASE_TIMEFRAME]
+    unknown = [tf for tf in timeframes if tf not in TIMEFRAMES]
+    if unknown:
+        raise ValueError(f"Timeframe desconhecido: {', '.join(unknown)}")
+    return sorted(set(timeframes), key=TIMEFRAMES.get)
+
+
+def base_bars(bars, timeframes) -> int:
+    """Barras de 1m necessárias para entregar `bars` barras no maior timeframe pedido."""
+    factor = max(BASE_BARS_PER_BAR[tf] for tf in normalize_timeframes(timeframes))
+    return min(int(bars) * factor, max(int(bars), TV_MAX_BASE_BARS))
+
+
+def epoch_seconds(series: pd.Series) -> np.ndarray:
+    """Horários como inteiros (segundos), sem conversão de unidade por elemento."""
+    values = series.to_numpy()
+    if not np.issubdtype(values.dtype, np.datetime64):
+        values = pd.to_datetime(series).to_numpy()
+    unit, count = np.datetime_data(values.dtype)
+    per_second = {"s": 1, "ms": 10 ** 3, "us": 10 ** 6, "ns": 10 ** 9}[unit] // count
+    return values.view(np.int64) // per_second
+
+
+def session_ids(df: pd.DataFrame, gap_seconds=None) -> np.ndarray:
+    """
+    Número da sessão de cada barra (df ordenado por symbol/exchange/datetime).
+    Nova sessão quando muda o ativo ou quando a pausa entre barras passa de gap_seconds.
+    """
+    times = epoch_seconds(df["datetime"])
+    symbols = df["symbol"].to_numpy()
+    exchanges = df["exchange"].to_numpy()
+    new_asset = np.ones(len(df), dtype=bool)
+    new_asset[1:] = (symbols[1:] != symbols[:-1]) | (exchanges[1:] != exchanges[:-1])
+    return np.cumsum(session_breaks(times, new_asset, gap_seconds))
+
+
+def session_breaks(times: np.ndarray, new_asset: np.ndarray, gap_seconds=None) -> np.ndarray:
+    """Máscara das barras que abrem sessão: troca de ativo ou pausa maior que gap_seconds (times em s)."""
+    gap_seconds = SESSION_GAP if gap_seconds is None else gap_seconds
+    new = new_asset.copy()
+    if len(times) > 1:
+        new[1:] |= np.diff(times) > gap_seconds
+    return new
+
+
+def resample_ohlcv(df: pd.DataFrame, timeframe: str, gap_seconds=None) -> pd.DataFrame:
+    """
+    Agrega barras de 1m (colunas de tv_collector.COLUMNS) no timeframe pedido.
+    Intradiário: buckets de N segundos contados a partir da abertura de cada sessão.
+    "1d": uma barra por sessão, rotulada pelo horário da primeira barra.
+    """
+    if timeframe not in TIMEFRAMES:
+        raise ValueError(f"Timeframe desconhecido: {timeframe}")
+    columns = list(df.columns)
+    if df.empty or timeframe == BASE_TIMEFRAME:
+        return df.copy()
+
+    data = df.sort_values(["symbol", "exchange", "datetime"], kind="stable").reset_index(drop=True)
+    session = session_ids(data, gap_seconds)
+    times = epoch_seconds(data["datetime"])
+    # horário de abertura da sessão de cada barra (primeira barra do bloco)
+    starts = np.flatnonzero(np.r_[True, session[1:] != session[:-1]])
+    session_start = np.repeat(times[starts], np.diff(np.r_[starts, len(times)]))
+
+    if timeframe == "1d":
+        bucket = session_start
+    else:
+        seconds = TIMEFRAMES[timeframe]
+        bucket = session_start + (times - session_start) // seconds * seconds
+
+    # dados ordenados: cada bucket é um trecho contíguo de linhas
+    first = np.flatnonzero(np.r_[True, (session[1:] != session[:-1]) | (bucket[1:] != bucket[:-1])])
+    last = np.r_[first[1:] - 1, len(bucket) - 1]
+
+    out = pd.DataFrame({
+        "symbol": data["symbol"].to_numpy()[first],
+        "exchange": data["exchange"].to_numpy()[first],
+        "datetime": pd.to_datetime(bucket[first], unit="s"),
+        "open": data["open"].to_numpy()[first],
+        "high": np.maximum.reduceat(data["high"].to_numpy(dtype=float), first),
+        "low": np.minimum.reduceat(data["low"].to_numpy(dtype=float), first),
+        "close": data["close"].to_numpy()[last],
+        "volume": np.add.reduceat(data["volume"].to_numpy(dtype=float), first),
+    })
+    return out[[c for c in columns if c in out.columns]]
+
+
+def with_timeframes(df: pd.DataFrame, timeframes, bars) -> pd.DataFrame:
+    """
+    Série base de um ativo -> últimas `bars` barras de cada timeframe, empilhadas,
+    com a coluna "timeframe". Não altera df (pode vir compartilhado do cache).
+    """
+    frames = []
+    for tf in normalize_timeframes(timeframes):
+        part = resample_ohlcv(df, tf).tail(int(bars))
+        frames.append(part.assign(timeframe=pd.Categorical.from_codes(
+            np.full(len(part), TIMEFRAME_DTYPE.categories.get_loc(tf), dtype=np.int8), dtype=TIMEFRAME_DTYPE)))
+    return pd.concat(frames, ignore_index=True)
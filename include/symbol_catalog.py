@@ -0,0 +1,246 @@
+import os
+import time
+import threading
+import include.candle_store as candle_store
+
+# ======================================================================
+# CATÁLOGO DE SÍMBOLOS
+# ======================================================================
+# Guarda, no mesmo SQLite do store de candles, cada (symbol, exchange) já consultado:
+# última coleta com dados e, para símbolos sem dados (digitado errado, deslistado),
+# até quando devem ser ignorados. Também guarda os apelidos digitados pelos usuários
+# (ex.: "WIN$N" -> WIN1!/BMFBOVESPA). Validação e autocompletar leem só o índice em
+# memória, sem chamadas de rede.
+# Coletas seguidas sem dados até o símbolo ser pulado (tvDatafeed também devolve None em falhas passageiras)
+SYMBOL_BAD_AFTER = int(os.getenv("SYMBOL_BAD_AFTER", 3))
+# Por quanto tempo (segundos) um símbolo sem dados é pulado: começa em SYMBOL_BAD_TTL_MIN e
+# dobra a cada nova falha, até SYMBOL_BAD_TTL
+SYMBOL_BAD_TTL_MIN = float(os.getenv("SYMBOL_BAD_TTL_MIN", 300))
+SYMBOL_BAD_TTL = float(os.getenv("SYMBOL_BAD_TTL", 6 * 3600))
+# Intervalo (segundos) para recarregar o índice em memória (mudanças de outros processos)
+SYMBOL_CATALOG_REFRESH = float(os.getenv("SYMBOL_CATALOG_REFRESH", 60))
+
+_lock = threading.Lock()
+_entries = {}  # (symbol, exchange) -> {"status", "last_ok_at", "bars", "failures", "bad_until", "last_error"}
+_aliases = {}  # APELIDO -> (symbol, exchange)
+_loaded_at = None
+
+
+def create_tables(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS symbols (
+            symbol     TEXT    NOT NULL,
+            exchange   TEXT    NOT NULL,
+            status     TEXT    NOT NULL,
+            last_ok_at INTEGER,
+            bars       INTEGER,
+            failures   INTEGER NOT NULL DEFAULT 0,
+            bad_until  INTEGER,
+            last_error TEXT,
+            updated_at INTEGER NOT NULL,
+            PRIMARY KEY (symbol, exchange)
+        ) WITHOUT ROWID
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS symbol_aliases (
+            alias    TEXT PRIMARY KEY,
+            symbol   TEXT NOT NULL,
+            exchange TEXT NOT NULL
+        ) WITHOUT ROWID
+    """)
+    conn.commit()
+
+
+def create_connection(path=None):
+    conn = candle_store.create_connection(path)
+    create_tables(conn)
+    return conn
+
+
+def normalize_alias(text: str) -> str:
+    return text.strip().upper()
+
+
+def canonical(symbol, exchange) -> str:
+    """Forma digitada padrão do dashboard: SYMBOL:EXCHANGE."""
+    return f"{symbol}:{exchange}"
+
+
+def _load(conn):
+    global _loaded_at
+    entries = {}
+    for symbol, exchange, status, last_ok_at, bars, failures, bad_until, last_error in conn.execute(
+            "SELECT symbol, exchange, status, last_ok_at, bars, failures, bad_until, last_error FROM symbols"):
+        entries[(symbol, exchange)] = {
+            "status": status, "last_ok_at": last_ok_at, "bars": bars,
+            "failures": failures, "bad_until": bad_until, "last_error": last_error,
+        }
+    aliases = {alias: (symbol, exchange)
+               for alias, symbol, exchange in conn.execute("SELECT alias, symbol, exchange FROM symbol_aliases")}
+    with _lock:
+        _entries.clear()
+        _entries.update(entries)
+        _aliases.clear()
+        _aliases.update(aliases)
+        _loaded_at = time.monotonic()
+
+
+def _index():
+    """Garante o índice em memória carregado e recente."""
+    if _loaded_at is None or time.monotonic() - _loaded_at >= SYMBOL_CATALOG_REFRESH:
+        conn = create_connection()
+        try:
+            _load(conn)
+        finally:
+            conn.close()
+
+
+def refresh():
+    """Recarrega o índice em memória na próxima consulta."""
+    global _loaded_at
+    _loaded_at = None
+
+
+# ----------------------------------------------------------------------
+# Consultas (memória)
+# ----------------------------------------------------------------------
+def resolve_alias(text: str):
+    """(symbol, exchange) registrado para o texto digitado, ou None."""
+    _index()
+    with _lock:
+        return _aliases.get(normalize_alias(text))
+
+
+def get(symbol, exchange):
+    _index()
+    with _lock:
+        entry = _entries.get((symbol, exchange))
+        return dict(entry) if entry else None
+
+
+def is_known_bad(symbol, exchange, now=None):
+    """Entrada do catálogo se o símbolo está marcado sem dados e ainda dentro do TTL; senão None."""
+    entry = get(symbol, exchange)
+    now = now or time.time()
+    if entry and entry["status"] == "bad" and (entry["bad_until"] or 0) > now:
+        return entry
+    return None
+
+
+def validate(symbol, exchange):
+    """("ok" | "bad" | "unknown", detalhe) a partir do que o catálogo já sabe."""
+    entry = is_known_bad(symbol, exchange)
+    if entry:
+        return "bad", entry["last_error"] or "sem dados na última coleta"
+    entry = get(symbol, exchange)
+    if entry and entry["last_ok_at"]:
+        return "ok", time.strftime("última coleta %d/%m %H:%M", time.localtime(entry["last_ok_at"]))
+    return "unknown", "nunca coletado"
+
+
+def suggest(prefix: str, limit=10) -> list:
+    """Símbolos conhecidos (SYMBOL:EXCHANGE) que começam com o texto, os mais usados primeiro."""
+    prefix = normalize_alias(prefix)
+    if not prefix:
+        return []
+    _index()
+    with _lock:
+        found = {}
+        for (symbol, exchange), entry in _entries.items():
+            if entry["status"] == "ok" and (symbol.upper().startswith(prefix)
+                                            or canonical(symbol, exchange).upper().startswith(prefix)):
+                found[canonical(symbol, exchange)] = entry["last_ok_at"] or 0
+        for alias, (symbol, exchange) in _aliases.items():
+            entry = _entries.get((symbol, exchange))
+            if alias.startswith(prefix) and entry and entry["status"] == "ok":
+                found.setdefault(canonical(symbol, exchange), entry["last_ok_at"] or 0)
+    return sorted(found, key=lambda s: (-found[s], s))[:limit]
+
+
+# ----------------------------------------------------------------------
+# Escritas (coletor)
+# ----------------------------------------------------------------------
+def _save(conn, symbol, exchange, entry, alias):
+    conn.execute(
+        "INSERT OR REPLACE INTO symbols "
+        "(symbol, exchange, status, last_ok_at, bars, failures, bad_until, last_error, updated_at) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        (symbol, exchange, entry["status"], entry["last_ok_at"], entry["bars"], entry["failures"],
+         entry["bad_until"], entry["last_error"], int(time.time())),
+    )
+    if alias and normalize_alias(alias) != canonical(symbol, exchange).upper():
+        conn.execute("INSERT OR REPLACE INTO symbol_aliases (alias, symbol, exchange) VALUES (?, ?, ?)",
+                     (normalize_alias(alias), symbol, exchange))
+    conn.commit()
+    with _lock:
+        _entries[(symbol, exchange)] = entry
+        if alias and normalize_alias(alias) != canonical(symbol, exchange).upper():
+            _aliases[normalize_alias(alias)] = (symbol, exchange)
+
+
+def record_ok(symbol, exchange, alias=None, bars=None):
+    """Coleta com dados: símbolo válido (e o apelido digitado passa a resolver para ele)."""
+    previous = get(symbol, exchange)
+    alias_known = alias is None or resolve_alias(alias) == (symbol, exchange) \
+        or normalize_alias(alias) == canonical(symbol, exchange).upper()
+    if previous and previous["status"] == "ok" and alias_known and not previous["failures"] \
+            and time.time() - (previous["last_ok_at"] or 0) < SYMBOL_CATALOG_REFRESH:
+        return  # já registrado há pouco: evita uma escrita por coleta
+    entry = {"status": "ok", "last_ok_at": int(time.time()), "bars": bars,
+             "failures": 0, "bad_until": None, "last_error": None}
+    conn = create_connection()
+    try:
+        _save(conn, symbol, exchange, entry, alias)
+    finally:
+        conn.close()
+
+
+def bad_ttl(failures):
+    """Tempo sem coletar o símbolo após `failures` falhas seguidas (0 = ainda não é pulado)."""
+    if failures < SYMBOL_BAD_AFTER:
+        return 0
+    return min(SYMBOL_BAD_TTL, SYMBOL_BAD_TTL_MIN * 2 ** (failures - SYMBOL_BAD_AFTER))
+
+
+def record_bad(symbol, exchange, error, ttl=None):
+    """
+    Coleta sem dados. Só após SYMBOL_BAD_AFTER falhas seguidas o coletor passa a pular o
+    símbolo, por um tempo que cresce com as falhas (ver bad_ttl; `ttl` força um valor).
+    """
+    previous = get(symbol, exchange) or {}
+    failures = (previous.get("failures") or 0) + 1
+    ttl = bad_ttl(failures) if ttl is None else ttl
+    entry = {"status": "bad" if ttl > 0 else (previous.get("status") or "unknown"),
+             "last_ok_at": previous.get("last_ok_at"), "bars": previous.get("bars"),
+             "failures": failures, "bad_until": int(time.time() + ttl) if ttl > 0 else None,
+             "last_error": error}
+    conn = create_connection()
+    try:
+        _save(conn, symbol, exchange, entry, None)
+    finally:
+        conn.close()
+
+
+def add_alias(alias, symbol, exchange):
+    """Registra manualmente um apelido (ex.: "WIN$N" -> WIN1!/BMFBOVESPA)."""
+    conn = create_connection()
+    try:
+        conn.execute("INSERT OR REPLACE INTO symbol_aliases (alias, symbol, exchange) VALUES (?, ?, ?)",
+                     (normalize_alias(alias), symbol, exchange))
+        conn.commit()
+    finally:
+        conn.close()
+    with _lock:
+        _aliases[normalize_alias(alias)] = (symbol, exchange)
+
+
+def forget(symbol, exchange):
+    """Remove o símbolo do catálogo (ex.: voltou a ser negociado antes do fim do TTL)."""
+    conn = create_connection()
+    try:
+        conn.execute("DELETE FROM symbols WHERE symbol=? AND exchange=?", (symbol, exchange))
+        conn.commit()
+    finally:
+        conn.close()
+    with _lock:
+        _entries.pop((symbol, exchange), None)
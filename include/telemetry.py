@@ -0,0 +1,231 @@
+import os
+import sys
+import json
+import time
+import uuid
+import bisect
+import logging
+import threading
+import functools
+import contextvars
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# ======================================================================
+# TELEMETRIA: SPANS DE TEMPO, MÉTRICAS PROMETHEUS E LOG JSON
+# ======================================================================
+# span("tv.get_hist", symbol=...) mede um trecho. Cada span vira:
+#   - uma linha de log JSON (logger "orbedash.telemetry") com o trace_id da execução
+#   - uma observação no histograma orbedash_span_duration_seconds{span="..."}
+# log(nível, evento, ...) grava no mesmo logger erros e progresso fora de spans.
+# O trace_id vive num contextvar: jobs.py abre um trace por automação e o coletor o
+# repassa às threads de busca. As métricas ficam em http://METRICS_HOST:METRICS_PORT/metrics.
+# Porta do endpoint /metrics (0 = desativado)
+METRICS_PORT = int(os.getenv("METRICS_PORT", 9464))
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+# Log JSON dos spans (1 = stderr, ou caminho de arquivo; 0 = desativado)
+TELEMETRY_LOG = os.getenv("TELEMETRY_LOG", "1")
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+_trace_id = contextvars.ContextVar("trace_id", default=None)
+_lock = threading.Lock()
+_histograms = {}  # span -> {"buckets": [contagem por bucket], "sum": float, "count": int}
+_counters = {}  # (métrica, ((label, valor), ...)) -> valor
+
+logger = logging.getLogger("orbedash.telemetry")
+
+
+class _JsonFormatter(logging.Formatter):
+    def format(self, record):
+        return json.dumps(record.msg, ensure_ascii=False, default=str)
+
+
+def _configure_logger():
+    if TELEMETRY_LOG in ("", "0") or logger.handlers:
+        return
+    handler = logging.StreamHandler(sys.stderr) if TELEMETRY_LOG == "1" else logging.FileHandler(TELEMETRY_LOG)
+    handler.setFormatter(_JsonFormatter())
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+
+_configure_logger()
+
+
+# ----------------------------------------------------------------------
+# Trace
+# ----------------------------------------------------------------------
+def new_trace_id() -> str:
+    return uuid.uuid4().hex
+
+
+def current_trace_id():
+    return _trace_id.get()
+
+
+@contextmanager
+def trace(trace_id=None):
+    """Abre um trace (um id por execução) para os spans do bloco. Devolve o id."""
+    token = _trace_id.set(trace_id or new_trace_id())
+    try:
+        yield _trace_id.get()
+    finally:
+        _trace_id.reset(token)
+
+
+def propagate(fn):
+    """Envolve fn para rodar em outra thread com o trace atual (ex.: executor.submit)."""
+    context = contextvars.copy_context()
+    return functools.partial(context.run, fn)
+
+
+# ----------------------------------------------------------------------
+# Spans
+# ----------------------------------------------------------------------
+def _observe(name, seconds, error):
+    with _lock:
+        hist = _histograms.get(name)
+        if hist is None:
+            hist = _histograms[name] = {"buckets": [0] * len(BUCKETS), "sum": 0.0, "count": 0}
+        index = bisect.bisect_left(BUCKETS, seconds)
+        if index < len(BUCKETS):
+            hist["buckets"][index] += 1
+        hist["sum"] += seconds
+        hist["count"] += 1
+        if error:
+            key = ("orbedash_span_errors_total", (("span", name),))
+            _counters[key] = _counters.get(key, 0) + 1
+
+
+def inc(metric, value=1, **labels):
+    """Soma value ao contador metric{labels}."""
+    key = (metric, tuple(sorted(labels.items())))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+@contextmanager
+def span(name, **attrs):
+    """
+    Mede o bloco. attrs vão para o log; o bloco pode acrescentar atributos no dict
+    devolvido (ex.: linhas retornadas, tokens).
+    """
+    inicio = time.perf_counter()
+    started_at = time.time()
+    error = None
+    try:
+        yield attrs
+    except BaseException as e:
+        error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        seconds = time.perf_counter() - inicio
+        _observe(name, seconds, error is not None)
+        if logger.handlers:
+            record = {"ts": round(started_at, 3), "trace_id": _trace_id.get(), "span": name,
+                      "duration_ms": round(seconds * 1000, 3), "status": "error" if error else "ok"}
+            if error:
+                record["error"] = error[:500]
+            record.update(attrs)
+            logger.info(record)
+
+
+def log(level, event, **fields):
+    """
+    Linha de log JSON com o trace_id atual (erros e progresso que não são um span).
+    level: nível do logging (logging.INFO, logging.WARNING, logging.ERROR).
+    """
+    record = {"ts": round(time.time(), 3), "trace_id": _trace_id.get(),
+              "level": logging.getLevelName(level), "event": event}
+    record.update(fields)
+    logger.log(level, record)
+
+
+def timed(name=None):
+    """Decorador: cada chamada da função vira um span (padrão: módulo.função)."""
+    def decorator(fn):
+        span_name = name or f"{fn.__module__.rsplit('.', 1)[-1]}.{fn.__name__}"
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(span_name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# ----------------------------------------------------------------------
+# Exportação Prometheus
+# ----------------------------------------------------------------------
+def _label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def render_metrics() -> str:
+    """Métricas no formato de texto do Prometheus."""
+    with _lock:
+        histograms = {k: {"buckets": list(v["buckets"]), "sum": v["sum"], "count": v["count"]}
+                      for k, v in _histograms.items()}
+        counters = dict(_counters)
+
+    lines = ["# HELP orbedash_span_duration_seconds Duração dos trechos instrumentados.",
+             "# TYPE orbedash_span_duration_seconds histogram"]
+    for name in sorted(histograms):
+        hist = histograms[name]
+        cumulative = 0
+        for bound, count in zip(BUCKETS, hist["buckets"]):
+            cumulative += count
+            lines.append(f'orbedash_span_duration_seconds_bucket{{span="{_label(name)}",le="{bound}"}} {cumulative}')
+        lines.append(f'orbedash_span_duration_seconds_bucket{{span="{_label(name)}",le="+Inf"}} {hist["count"]}')
+        lines.append(f'orbedash_span_duration_seconds_sum{{span="{_label(name)}"}} {hist["sum"]:.6f}')
+        lines.append(f'orbedash_span_duration_seconds_count{{span="{_label(name)}"}} {hist["count"]}')
+
+    metrics = sorted({metric for metric, _ in counters})
+    for metric in metrics:
+        lines.append(f"# TYPE {metric} counter")
+        for (name, labels), value in sorted(counters.items()):
+            if name == metric:
+                text = ",".join(f'{k}="{_label(v)}"' for k, v in labels)
+                lines.append(f"{metric}{{{text}}} {value}")
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render_metrics().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+_server_lock = threading.Lock()
+_server = None
+
+
+def start_metrics_server(port=None, host=None):
+    """Sobe (uma vez por processo) o endpoint /metrics. Devolve a porta ou None."""
+    global _server
+    port = METRICS_PORT if port is None else port
+    if not port:
+        return None
+    with _server_lock:
+        if _server is None:
+            try:
+                _server = ThreadingHTTPServer((host or METRICS_HOST, port), _MetricsHandler)
+            except OSError as e:
+                # porta ocupada (ex.: outro processo do app): segue sem endpoint
+                print(f"[telemetry] Endpoint de métricas indisponível na porta {port}: {e}")
+                return None
+            _server.daemon_threads = True
+            threading.Thread(target=_server.serve_forever, name="metrics", daemon=True).start()
+        return _server.server_address[1]
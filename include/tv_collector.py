@@ -0,0 +1,757 @@
+import os
+import time
+import random
+import threading
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
+from concurrent.futures import TimeoutError as FuturesTimeout
+import pandas as pd
+import streamlit as st
+import include.candle_store as candle_store
+import include.tv_pool as tv_pool
+import include.symbol_catalog as symbol_catalog
+import include.resampling as resampling
+import include.telemetry as telemetry
+from include.candle_cache import candle_cache, next_bar_boundary
+# Dependência: tvdatafeed (usa websocket internamente)
+from tvDatafeed import Interval
+
+# ======================================================================
+# CONFIGURAÇÃO DA COLETA
+# ======================================================================
+# Número máximo de símbolos buscados em paralelo (1 = modo sequencial)
+TV_MAX_WORKERS = int(os.getenv("TV_MAX_WORKERS", 4))
+# Limite global de requisições por segundo ao TradingView (0 = sem limite)
+TV_REQUESTS_PER_SEC = float(os.getenv("TV_REQUESTS_PER_SEC", 5))
+# Usa o store local de candles (include/candle_store.py) para buscar só barras novas
+TV_USE_CANDLE_STORE = os.getenv("TV_USE_CANDLE_STORE", "1") == "1"
+# Compartilha as séries entre sessões até o fechamento da barra (include/candle_cache.py)
+TV_USE_CANDLE_CACHE = os.getenv("TV_USE_CANDLE_CACHE", "1") == "1"
+# Pula símbolos que vieram sem dados recentemente (include/symbol_catalog.py)
+TV_SKIP_BAD_SYMBOLS = os.getenv("TV_SKIP_BAD_SYMBOLS", "1") == "1"
+# Prazo total (segundos) de uma coleta: o que não chegou até lá fica de fora do dataset
+TV_DEADLINE = float(os.getenv("TV_DEADLINE", 120))
+# Tempo máximo (segundos) de uma tentativa de get_hist
+TV_SYMBOL_TIMEOUT = float(os.getenv("TV_SYMBOL_TIMEOUT", 30))
+# Novas tentativas após falha/timeout, com backoff exponencial (base em segundos) e jitter
+TV_RETRIES = int(os.getenv("TV_RETRIES", 2))
+TV_RETRY_BASE = float(os.getenv("TV_RETRY_BASE", 1))
+# Sem resposta após isso (segundos), dispara uma cópia da requisição e usa a primeira (0 = desativa)
+TV_HEDGE_AFTER = float(os.getenv("TV_HEDGE_AFTER", 10))
+# Chamadas get_hist em voo por símbolo (original + hedge), limitado ao tamanho do pool de sessões
+TV_MAX_INFLIGHT = int(os.getenv("TV_MAX_INFLIGHT", 2))
+# Falhas seguidas numa exchange que abrem o disjuntor, e por quanto tempo (segundos) ela é evitada
+TV_BREAKER_FAILURES = int(os.getenv("TV_BREAKER_FAILURES", 3))
+TV_BREAKER_COOLDOWN = float(os.getenv("TV_BREAKER_COOLDOWN", 60))
+
+COLUMNS = ["symbol", "exchange", "datetime", "open", "high", "low", "close", "volume"]
+
+# Observação: mapping de símbolos — ajuste conforme necessário.
+# Entrada esperada pelo usuário (na UI): lista de símbolos separados por vírgula.
+# Você pode passar símbolos do TradingView já no formato EXCHANGE:SYMBOL (ex: "BMF:WIN$N" ou "BMFBOVESPA:WIN1!").
+# Se o usuário passar "WIN$N" o código tentará mapear automaticamente para "WIN1!" na BMFBOVESPA.
+DEFAULT_TV_MAPPING = {
+    "WIN$N": ("WIN1!", "BMFBOVESPA"),
+    "WDO$N": ("WDO1!", "BMFBOVESPA"),
+    "DI1$N": ("DI1!", "BMFBOVESPA"),
+    # adicione outras traduções se quiser
+}
+
+
+class RateLimiter:
+    """
+    Limitador de requisições por segundo compartilhado entre threads.
+    Espaça as chamadas em intervalos de 1/rate segundos (sem rajadas).
+    """
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    def acquire(self):
+        """Bloqueia até que a próxima requisição esteja liberada."""
+        with self._lock:
+            if self.rate <= 0:
+                return
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + 1.0 / self.rate
+        wait = slot - now
+        if wait > 0:
+            time.sleep(wait)
+
+
+# Limitador do processo: vale para todas as sessões do Streamlit. Uma coleta com
+# requests_per_sec próprio usa um RateLimiter só dela e não altera este
+rate_limiter = RateLimiter(TV_REQUESTS_PER_SEC)
+
+
+class CircuitOpenError(Exception):
+    """Exchange com o disjuntor aberto: a requisição nem é enviada."""
+
+    def __init__(self, exchange, retry_at):
+        self.exchange = exchange
+        self.retry_at = retry_at
+        super().__init__(f"{exchange} com falhas seguidas")
+
+
+class PoolBusyError(TimeoutError):
+    """Nenhuma sessão do pool ficou livre a tempo: a requisição nem chegou à exchange."""
+
+
+class CircuitBreaker:
+    """
+    Disjuntor de uma exchange. Fechado: tudo passa. Após `failures` símbolos seguidos
+    falhando (já contadas as novas tentativas de cada um) abre por `cooldown` segundos;
+    depois libera uma única requisição de teste (meio-aberto) — sucesso fecha, falha abre
+    de novo. Um teste sem veredito volta com release(); um teste esquecido expira após `cooldown`.
+    """
+
+    def __init__(self, exchange, failures: int, cooldown: float):
+        self.exchange = exchange
+        self.failures = failures
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._consecutive = 0
+        self._open_until = 0.0
+        self._probe_since = None
+
+    def _probing(self, now) -> bool:
+        return self._probe_since is not None and now - self._probe_since < self.cooldown
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._consecutive < self.failures:
+                return "closed"
+            now = time.monotonic()
+            return "open" if now < self._open_until or self._probing(now) else "half_open"
+
+    @property
+    def retry_at(self) -> float:
+        """Epoch a partir do qual o disjuntor aceita a requisição de teste."""
+        with self._lock:
+            return time.time() + max(0.0, self._open_until - time.monotonic())
+
+    def permit(self):
+        """None se bloqueado; senão "closed" (passa livre) ou "probe" (a requisição de teste)."""
+        with self._lock:
+            if self._consecutive < self.failures:
+                return "closed"
+            now = time.monotonic()
+            if now < self._open_until or self._probing(now):
+                return None
+            self._probe_since = now
+            return "probe"
+
+    def record_success(self, probe=False):
+        with self._lock:
+            self._consecutive = 0
+            self._probe_since = None
+
+    def record_failure(self, probe=False):
+        with self._lock:
+            self._consecutive += 1
+            if probe:
+                self._probe_since = None
+            # falhas de chamadas que já estavam em voo não prolongam um disjuntor aberto
+            if probe or self._consecutive == self.failures:
+                telemetry.inc("orbedash_tv_breaker_open_total", exchange=self.exchange)
+                self._open_until = time.monotonic() + self.cooldown
+
+    def release(self, probe=False):
+        """Devolve a permissão sem veredito (a requisição não chegou à exchange)."""
+        if probe:
+            with self._lock:
+                self._probe_since = None
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def circuit_breaker(exchange) -> CircuitBreaker:
+    """Disjuntor do processo para a exchange (criado no primeiro uso)."""
+    with _breakers_lock:
+        breaker = _breakers.get(exchange)
+        if breaker is None:
+            breaker = _breakers[exchange] = CircuitBreaker(exchange, TV_BREAKER_FAILURES, TV_BREAKER_COOLDOWN)
+        return breaker
+
+
+def breaker_states() -> dict:
+    with _breakers_lock:
+        breakers = dict(_breakers)
+    return {exchange: breaker.state for exchange, breaker in breakers.items()}
+
+
+def retry_delay(attempt):
+    """Backoff exponencial com jitter antes da tentativa número `attempt` + 1 (1, 2, ...)."""
+    return TV_RETRY_BASE * 2 ** (attempt - 1) * random.uniform(0.5, 1.5)
+
+
+# Threads das tentativas de get_hist: quem espera por elas pode desistir no timeout
+# (a chamada travada termina sozinha, sem segurar a coleta)
+_attempts = ThreadPoolExecutor(max_workers=int(os.getenv("TV_ATTEMPT_WORKERS", 16)),
+                               thread_name_prefix="tv-attempt")
+
+
+def parse_user_symbol(sym: str):
+    """
+    Recebe 'WIN$N' ou 'BMFBOVESPA:WIN1!' ou 'EXCHANGE:SYMBOL'.
+    Retorna (symbol, exchange).
+    """
+    s = sym.strip()
+    if ":" in s:
+        symbol, exchange = s.split(":", 1)
+        return symbol.strip(), exchange.strip()
+    # apelidos já resolvidos em coletas anteriores (catálogo local)
+    known = symbol_catalog.resolve_alias(s)
+    if known:
+        return known
+    # fallback para mapping
+    if s in DEFAULT_TV_MAPPING:
+        return DEFAULT_TV_MAPPING[s]
+    # heurística: tratar pontos como exchange e parte após . como symbol (ex: "BMF.WIN1!")
+    if "." in s:
+        ex, sym = s.split(".", 1)
+        return sym.strip(), ex.strip()
+    # se tudo falhar, assume símbolo puro e BMFBOVESPA
+    return s, "BMFBOVESPA"
+
+
+class _Call:
+    """Chamada get_hist em voo: se já conseguiu sessão e se quem esperava por ela desistiu."""
+
+    def __init__(self):
+        self.started = threading.Event()
+        self.abandoned = threading.Event()
+
+
+def _request_once(pool, symbol, exchange, interval, n_bars, call=None, session_timeout=tv_pool.TV_POOL_TIMEOUT,
+                  limiter=None):
+    """
+    Uma chamada get_hist com uma sessão emprestada do pool (sessão com erro é descartada).
+    limiter: RateLimiter da coleta (padrão: rate_limiter do processo).
+    """
+    call = call or _Call()
+    try:
+        with pool.session(timeout=session_timeout) as tv:
+            if call.abandoned.is_set():
+                return None  # a coleta já desistiu: devolve a sessão sem ir à rede
+            call.started.set()
+            (limiter or rate_limiter).acquire()
+            with telemetry.span("tv.get_hist", symbol=symbol, exchange=exchange, n_bars=n_bars) as span:
+                df = tv.get_hist(symbol, exchange, interval=interval, n_bars=n_bars)
+                span["rows"] = 0 if df is None else len(df)
+            return df
+    except TimeoutError as e:
+        if not call.started.is_set():
+            raise PoolBusyError(str(e)) from e
+        raise
+
+
+def _attempt(pool, symbol, exchange, interval, n_bars, timeout, inflight, limiter=None):
+    """
+    Uma tentativa com timeout. inflight ({future: _Call}) guarda as chamadas do símbolo ainda
+    em voo, inclusive as de tentativas anteriores: enquanto elas ocupam o limite
+    (TV_MAX_INFLIGHT, nunca acima do pool) a tentativa espera por elas em vez de abrir outra.
+    Passando de TV_HEDGE_AFTER, dispara uma cópia (hedge) — só se houver sessão livre.
+    """
+    inicio = time.monotonic()
+    limit = max(1, min(TV_MAX_INFLIGHT, pool.max_sessions))
+
+    def submit():
+        call = _Call()
+        future = _attempts.submit(telemetry.propagate(_request_once), pool, symbol, exchange,
+                                  interval, n_bars, call, timeout, limiter)
+        inflight[future] = call
+
+    if not inflight or (len(inflight) < limit and pool.free_slots() > 0):
+        submit()
+    hedged = not (0 < TV_HEDGE_AFTER < timeout)
+    error = None
+    while inflight:
+        elapsed = time.monotonic() - inicio
+        wait_for = timeout - elapsed if hedged else TV_HEDGE_AFTER - elapsed
+        done, _ = wait(list(inflight), timeout=max(wait_for, 0), return_when=FIRST_COMPLETED)
+        for future in done:
+            inflight.pop(future)
+            if future.exception() is None:
+                return future.result()
+            error = future.exception()
+        if done:
+            continue
+        if hedged:
+            break
+        hedged = True
+        if len(inflight) < limit and pool.free_slots() > 0:
+            telemetry.inc("orbedash_tv_hedges_total", exchange=exchange)
+            submit()
+    if inflight:
+        if not any(call.started.is_set() for call in inflight.values()):
+            raise PoolBusyError(f"nenhuma sessão do TradingView livre em {timeout:.1f}s")
+        raise TimeoutError(f"sem resposta do TradingView em {timeout:.1f}s")
+    raise error
+
+
+def _request(pool, symbol, exchange, interval, n_bars, deadline_at=None, limiter=None):
+    """
+    get_hist resiliente: cada tentativa tem timeout (TV_SYMBOL_TIMEOUT, hedge para a lenta),
+    falhas são repetidas com backoff até TV_RETRIES vezes sem passar de deadline_at
+    (time.monotonic()) e o disjuntor da exchange barra novas chamadas quando ela está falhando.
+    Espera por sessão do pool (PoolBusyError) não conta contra a exchange.
+    """
+    deadline_at = deadline_at or time.monotonic() + TV_DEADLINE
+    breaker = circuit_breaker(exchange)
+    inflight = {}
+    try:
+        for attempt in range(TV_RETRIES + 1):
+            remaining = deadline_at - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError("prazo da coleta esgotado")
+            permit = breaker.permit()
+            if permit is None:
+                raise CircuitOpenError(exchange, breaker.retry_at)
+            probe = permit == "probe"
+            try:
+                df = _attempt(pool, symbol, exchange, interval, n_bars, min(TV_SYMBOL_TIMEOUT, remaining),
+                              inflight, limiter)
+            except BaseException as e:
+                exchange_failed = isinstance(e, Exception) and not isinstance(e, PoolBusyError)
+                delay = retry_delay(attempt + 1)
+                # o teste do meio-aberto não é repetido: o veredito sai já
+                last = (probe or not isinstance(e, Exception) or attempt == TV_RETRIES
+                        or time.monotonic() + delay >= deadline_at)
+                if probe and exchange_failed:
+                    breaker.record_failure(probe=True)
+                elif probe:
+                    breaker.release(probe=True)
+                elif last and exchange_failed:
+                    # um símbolo travado não derruba a exchange sozinho: conta uma falha por símbolo
+                    breaker.record_failure()
+                if last:
+                    raise
+                telemetry.inc("orbedash_tv_retries_total", exchange=exchange)
+                time.sleep(delay)
+                continue
+            # sem dados também conta contra a exchange (tvDatafeed devolve None quando ela falha)
+            if df is None or df.empty:
+                breaker.record_failure(probe)
+            else:
+                breaker.record_success(probe)
+            return df
+    finally:
+        # chamadas que ainda não pegaram sessão desistem; as travadas terminam sozinhas
+        for call in inflight.values():
+            call.abandoned.set()
+
+
+def _get_hist(pool, symbol, exchange, interval, bars, use_store, deadline_at=None, limiter=None):
+    """
+    Busca as `bars` barras mais recentes. Com o store ativo, pede ao TradingView
+    apenas as barras posteriores ao último timestamp gravado e lê o resto do disco.
+    """
+    if not use_store:
+        return _request(pool, symbol, exchange, interval, bars, deadline_at, limiter)
+
+    conn = candle_store.create_connection()
+    try:
+        n_bars = candle_store.bars_to_fetch(symbol, exchange, interval, bars, conn=conn)
+        df = _request(pool, symbol, exchange, interval, n_bars, deadline_at, limiter)
+        if df is None or df.empty:
+            return None
+        candle_store.save_candles(symbol, exchange, interval, df.reset_index(), conn=conn)
+        return candle_store.load_candles(symbol, exchange, interval, bars, conn=conn)
+    finally:
+        conn.close()
+
+
+def _asset_column(value, n_rows):
+    """Coluna categórica constante (uma categoria, códigos int8) em vez de n_rows strings."""
+    return pd.Categorical.from_codes(np.zeros(n_rows, dtype=np.int8), [value])
+
+
+def _load_symbol(pool, symbol, exchange, interval, bars, use_store, deadline_at=None, limiter=None):
+    """Busca a série e devolve o DataFrame já normalizado (ou None se vier vazio)."""
+    df = _get_hist(pool, symbol, exchange, interval, bars, use_store, deadline_at, limiter)
+    if df is None or df.empty:
+        return None
+    # tvDatafeed retorna index datetime (o store já devolve a coluna)
+    datetimes = df["datetime"] if "datetime" in df.columns else df.index
+    # monta o frame final direto dos arrays (sem reset_index/rename/seleção de colunas)
+    data = {
+        "symbol": _asset_column(symbol, len(df)),
+        "exchange": _asset_column(exchange, len(df)),
+        "datetime": np.asarray(datetimes),
+    }
+    for column in COLUMNS[3:]:
+        data[column] = df[column].to_numpy()
+    return pd.DataFrame(data)
+
+
+def _fetch_symbol(pool, sym, bars, use_store=False, use_cache=False, timeframes=None, deadline_at=None,
+                  limiter=None):
+    """
+    Busca um símbolo e normaliza as colunas.
+    Com timeframes, busca só a série de 1m e agrega os demais localmente (include/resampling.py).
+    deadline_at (time.monotonic()): prazo da coleta inteira; novas tentativas param nele.
+    limiter: RateLimiter da coleta (None = rate_limiter do processo).
+    Retorna (df, mensagem) — mensagem é (nível, texto) ou None.
+    Não chama o Streamlit: pode rodar fora da thread do script.
+    """
+    symbol, exchange = parse_user_symbol(sym)
+    target_bars = bars
+    if timeframes:
+        bars = resampling.base_bars(bars, timeframes)
+    # Usamos Interval.in_1_minute; ajuste se quiser outro intervalo
+    interval = Interval.in_1_minute
+    if TV_SKIP_BAD_SYMBOLS:
+        bad = symbol_catalog.is_known_bad(symbol, exchange)
+        if bad:
+            until = time.strftime("%H:%M", time.localtime(bad["bad_until"]))
+            return None, ("warning", f"{symbol}:{exchange} ignorado: sem dados na última coleta (nova tentativa após {until})")
+    try:
+        if use_cache:
+            # O DataFrame em cache é compartilhado entre sessões: não deve ser alterado
+            df = candle_cache.get_or_load(
+                (symbol, exchange, interval.value, bars),
+                lambda: _load_symbol(pool, symbol, exchange, interval, bars, use_store, deadline_at, limiter),
+                next_bar_boundary(candle_store.INTERVAL_SECONDS[interval.name]),
+            )
+        else:
+            df = _load_symbol(pool, symbol, exchange, interval, bars, use_store, deadline_at, limiter)
+        if df is None:
+            symbol_catalog.record_bad(symbol, exchange, "Nenhum dado retornado")
+            return None, ("warning", f"Nenhum dado para {symbol}:{exchange}")
+        symbol_catalog.record_ok(symbol, exchange, alias=sym, bars=len(df))
+        if timeframes:
+            df = resampling.with_timeframes(df, timeframes, target_bars)
+        return df, None
+    except CircuitOpenError as e:
+        until = time.strftime("%H:%M:%S", time.localtime(e.retry_at))
+        return None, ("skipped", f"{symbol}:{exchange} ignorado: {exchange} com falhas seguidas (nova tentativa após {until})")
+    except TimeoutError as e:
+        return None, ("timeout", f"{symbol}:{exchange} sem resposta a tempo — {e}")
+    except Exception as e:
+        return None, ("error", f"Erro coletando {symbol}:{exchange} — {e}")
+
+
+def check_symbols(symbols):
+    """
+    Valida os símbolos digitados contra o catálogo local (sem rede).
+    Retorna [(digitado, symbol, exchange, status, detalhe)], status em "ok", "bad" ou "unknown".
+    """
+    result = []
+    for sym in symbols:
+        if not sym.strip():
+            continue
+        symbol, exchange = parse_user_symbol(sym)
+        result.append((sym.strip(), symbol, exchange) + symbol_catalog.validate(symbol, exchange))
+    return result
+
+
+def _report(messages):
+    for level, text in messages:
+        if level in ("warning", "skipped"):
+            st.warning(text)
+        else:
+            st.error(text)
+
+
+def iter_tv_all(ativos_b3, ativos_fx, bars, tv_username=None, tv_password=None,
+                max_workers=None, requests_per_sec=None, use_store=None,
+                use_cache=None, timeframes=None, deadline=None):
+    """
+    Variante em streaming de collect_tv_all: entrega cada símbolo assim que ele chega.
+    Gera tuplas (posição, símbolo digitado, df normalizado ou None, mensagem ou None),
+    na ordem de chegada — símbolos lentos ou com erro não seguram os demais.
+    Níveis das mensagens: warning (sem dados), skipped (exchange com o disjuntor aberto),
+    error e timeout — esgotado o prazo, os pendentes saem de uma vez com nível "timeout".
+    Parâmetros iguais aos de collect_tv_all.
+    """
+    # limite próprio desta coleta; o do processo (rate_limiter) não é alterado
+    limiter = RateLimiter(requests_per_sec) if requests_per_sec is not None else None
+    if max_workers is None:
+        max_workers = TV_MAX_WORKERS
+    if use_store is None:
+        use_store = TV_USE_CANDLE_STORE
+    if use_cache is None:
+        use_cache = TV_USE_CANDLE_CACHE
+    deadline_at = time.monotonic() + (TV_DEADLINE if deadline is None else deadline)
+
+    symbols = [s.strip() for s in list(ativos_b3) + list(ativos_fx) if s.strip()]
+    if not symbols:
+        return
+
+    # Sessões TvDatafeed reaproveitadas entre execuções (include/tv_pool.py)
+    pool = tv_pool.get_pool(tv_username, tv_password)
+
+    if max_workers <= 1:
+        for pos, sym in enumerate(symbols):
+            if time.monotonic() >= deadline_at:
+                yield pos, sym, None, _deadline_message(sym)
+                continue
+            yield (pos, sym) + _fetch_symbol(pool, sym, bars, use_store, use_cache, timeframes, deadline_at,
+                                             limiter)
+        return
+
+    executor = ThreadPoolExecutor(max_workers=min(max_workers, len(symbols)))
+    try:
+        futures = {
+            # cada thread herda o trace da execução (spans de tv.get_hist)
+            executor.submit(telemetry.propagate(_fetch_symbol), pool, sym, bars, use_store, use_cache,
+                            timeframes, deadline_at, limiter): (pos, sym)
+            for pos, sym in enumerate(symbols)
+        }
+        pending = set(futures)
+        try:
+            for future in as_completed(futures, timeout=max(0.0, deadline_at - time.monotonic())):
+                pending.discard(future)
+                yield futures[future] + future.result()
+        except FuturesTimeout:
+            # prazo total: entrega o que chegou e marca o resto, sem esperar as threads
+            for future in sorted(pending, key=lambda f: futures[f][0]):
+                pos, sym = futures[future]
+                yield pos, sym, None, _deadline_message(sym)
+    finally:
+        # Se o consumidor parar no meio, não espera os símbolos restantes
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _deadline_message(sym):
+    return ("timeout", f"{sym}: prazo da coleta esgotado antes da resposta")
+
+
+def completeness_report(results, elapsed=None, bars=None) -> dict:
+    """
+    Resumo da coleta a partir das tuplas de iter_tv_all: quantos ativos foram pedidos,
+    quantos chegaram e, para os que faltaram, o motivo (sem_dados, erro, timeout, disjuntor).
+    Com bars e a coluna timeframe, lista em "barras_curtas" os timeframes que vieram com
+    menos de `bars` barras (a série de 1m é limitada a TV_MAX_BASE_BARS barras).
+    """
+    reasons = {"warning": "sem_dados", "error": "erro", "timeout": "timeout", "skipped": "disjuntor"}
+    missing, short = [], []
+    received = 0
+    for _, sym, df, msg in sorted(results, key=lambda r: r[0]):
+        if df is not None:
+            received += 1
+            if bars and "timeframe" in df.columns:
+                counts = df["timeframe"].value_counts(sort=False)
+                short += [{"ativo": sym, "timeframe": str(tf), "barras": int(n), "pedidas": int(bars)}
+                          for tf, n in counts.items() if 0 < n < bars]  # 0 = categoria não pedida
+            continue
+        level, text = msg or ("warning", "")
+        missing.append({"ativo": sym, "motivo": reasons.get(level, "erro"), "detalhe": text})
+    report = {
+        "solicitados": len(results),
+        "recebidos": received,
+        "completo": received == len(results),
+        "faltando": missing,
+    }
+    if short:
+        report["barras_curtas"] = short
+    if elapsed is not None:
+        report["segundos"] = round(elapsed, 2)
+    abertos = {ex: st for ex, st in breaker_states().items() if st != "closed"}
+    if abertos:
+        report["disjuntores"] = abertos
+    return report
+
+
+# ----------------------------------------------------------------------
+# Pós-processamento: junta os frames por símbolo no DataFrame final
+# ----------------------------------------------------------------------
+def _timestamp_utc(datetimes) -> pd.Categorical:
+    """
+    timestamp_utc (ISO, sufixo Z) formatado pelo numpy, sem strftime por linha.
+    Os ativos compartilham os mesmos horários: só os valores distintos viram texto.
+    """
+    index = pd.DatetimeIndex(datetimes)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    codes, unique = pd.factorize(index.to_numpy().astype("datetime64[s]"))
+    text = np.datetime_as_string(np.asarray(unique), timezone="UTC")
+    return pd.Categorical.from_codes(codes, text)
+
+
+def _frame_codes(frame, column, categories):
+    """Códigos de frame[column] nas categorias finais, ou None se o frame tiver mais de um valor."""
+    values = frame[column]
+    if isinstance(values.dtype, pd.CategoricalDtype) and len(values.cat.categories) == 1:
+        value = values.cat.categories[0]
+    else:
+        value = values.iat[0]
+        if not (values.to_numpy() == value).all():
+            return None
+    return categories.get_loc(value)
+
+
+def _timeframe_codes(frame):
+    if isinstance(frame["timeframe"].dtype, pd.CategoricalDtype) \
+            and frame["timeframe"].dtype == resampling.TIMEFRAME_DTYPE:
+        return frame["timeframe"].cat.codes.to_numpy()
+    return pd.Categorical(frame["timeframe"], dtype=resampling.TIMEFRAME_DTYPE).codes
+
+
+def _in_order(times, timeframe_codes=None) -> bool:
+    """Frame já ordenado por (timeframe, datetime)?"""
+    if len(times) < 2:
+        return True
+    dt = np.diff(times)
+    if timeframe_codes is None:
+        return bool((dt >= 0).all())
+    dc = np.diff(timeframe_codes.astype(np.int16))
+    return bool(((dc > 0) | ((dc == 0) & (dt >= 0))).all())
+
+
+def _concat_sorting(frames) -> pd.DataFrame:
+    """Caminho genérico: pd.concat + ordenação completa (frames com vários ativos ou fora de ordem)."""
+    df_all = pd.concat(frames, ignore_index=True)
+    keys = ["symbol", "exchange", "datetime"]
+    if "timeframe" in df_all.columns:
+        # timeframes do menor para o maior dentro de cada ativo
+        df_all["timeframe"] = pd.Categorical(df_all["timeframe"], dtype=resampling.TIMEFRAME_DTYPE)
+        keys = ["symbol", "exchange", "timeframe", "datetime"]
+    for column in ("symbol", "exchange"):
+        values = df_all[column].astype(str)
+        df_all[column] = pd.Categorical(values, categories=sorted(values.unique()))
+    df_all = df_all.sort_values(keys, kind="stable").reset_index(drop=True)
+    if not pd.api.types.is_datetime64_any_dtype(df_all["datetime"]):
+        df_all["datetime"] = pd.to_datetime(df_all["datetime"])
+    df_all["timestamp_utc"] = _timestamp_utc(df_all["datetime"])
+    return df_all
+
+
+def concat_frames(frames) -> pd.DataFrame:
+    """
+    Junta os DataFrames por símbolo no formato final: ordenado por symbol/exchange
+    (e timeframe)/datetime, symbol/exchange categóricos e coluna timestamp_utc.
+    Cada frame de _fetch_symbol traz um único ativo já em ordem cronológica, então as
+    colunas são copiadas uma vez para buffers pré-alocados na ordem certa, sem
+    pd.concat nem sort_values; frames fora desse formato caem em _concat_sorting.
+    """
+    frames = [f for f in frames if f is not None and not f.empty]
+    if not frames:
+        return pd.DataFrame()
+    with_timeframe = "timeframe" in frames[0].columns
+    if any(("timeframe" in f.columns) != with_timeframe for f in frames):
+        return _concat_sorting(frames)
+
+    symbols = pd.Index(sorted({str(f["symbol"].iat[0]) for f in frames}))
+    exchanges = pd.Index(sorted({str(f["exchange"].iat[0]) for f in frames}))
+    parts = []
+    for frame in frames:
+        symbol_code = _frame_codes(frame, "symbol", symbols)
+        exchange_code = _frame_codes(frame, "exchange", exchanges)
+        datetimes = pd.DatetimeIndex(frame["datetime"])
+        timeframe_codes = _timeframe_codes(frame) if with_timeframe else None
+        if symbol_code is None or exchange_code is None \
+                or not _in_order(datetimes.asi8, timeframe_codes):
+            return _concat_sorting(frames)
+        parts.append((symbol_code, exchange_code, frame, datetimes, timeframe_codes))
+    # ordem final dos blocos: por ativo; cada bloco já vem ordenado internamente
+    parts.sort(key=lambda p: (p[0], p[1]))
+
+    tz = parts[0][3].tz
+    if any(p[3].tz != tz for p in parts):
+        return _concat_sorting(frames)
+    total = sum(len(p[2]) for p in parts)
+    symbol_buf = np.empty(total, dtype=np.int32)
+    exchange_buf = np.empty(total, dtype=np.int32)
+    unit = parts[0][3].unit
+    datetime_buf = np.empty(total, dtype=f"datetime64[{unit}]")
+    timeframe_buf = np.empty(total, dtype=np.int8) if with_timeframe else None
+    value_bufs = {column: np.empty(total, dtype=float) for column in COLUMNS[3:]}
+
+    offset = 0
+    for symbol_code, exchange_code, frame, datetimes, timeframe_codes in parts:
+        end = offset + len(frame)
+        symbol_buf[offset:end] = symbol_code
+        exchange_buf[offset:end] = exchange_code
+        # com fuso, o buffer guarda UTC e o fuso é reaplicado no final
+        naive = datetimes.tz_convert(None) if tz is not None else datetimes
+        datetime_buf[offset:end] = naive.as_unit(unit).to_numpy()
+        if with_timeframe:
+            timeframe_buf[offset:end] = timeframe_codes
+        for column, buf in value_bufs.items():
+            buf[offset:end] = frame[column].to_numpy()
+        offset = end
+
+    datetimes = pd.DatetimeIndex(datetime_buf)
+    if tz is not None:
+        datetimes = datetimes.tz_localize("UTC").tz_convert(tz)
+    data = {
+        "symbol": pd.Categorical.from_codes(symbol_buf, symbols),
+        "exchange": pd.Categorical.from_codes(exchange_buf, exchanges),
+        "datetime": datetimes,
+    }
+    data.update(value_bufs)
+    if with_timeframe:
+        data["timeframe"] = pd.Categorical.from_codes(timeframe_buf, dtype=resampling.TIMEFRAME_DTYPE)
+    df_all = pd.DataFrame(data)
+    df_all["timestamp_utc"] = _timestamp_utc(datetimes)
+    return df_all
+
+
+def short_bars_message(short) -> str:
+    """Aviso para os timeframes que vieram com menos barras que o pedido (barras_curtas)."""
+    detalhes = ", ".join(f'{s["ativo"]} {s["timeframe"]}: {s["barras"]}/{s["pedidas"]}' for s in short)
+    return (f"Menos barras que o pedido (a série de 1m é limitada a {resampling.TV_MAX_BASE_BARS} "
+            f"barras): {detalhes}")
+
+
+def collect_tv_frames(ativos_b3, ativos_fx, bars, tv_username=None, tv_password=None,
+                      max_workers=None, requests_per_sec=None, use_store=None,
+                      use_cache=None, timeframes=None, deadline=None, on_result=None):
+    """
+    Núcleo de collect_tv_all sem Streamlit (roda também nos jobs em segundo plano).
+    on_result(posição, símbolo, df, mensagem) é chamado para cada ativo assim que ele chega.
+    Retorna (df_all, resultados de iter_tv_all em ordem de posição, resumo de completude).
+    """
+    inicio = time.monotonic()
+    results = []
+    with telemetry.span("tv.collect_tv_all", bars=bars) as span:
+        for result in iter_tv_all(ativos_b3, ativos_fx, bars, tv_username, tv_password, max_workers,
+                                  requests_per_sec, use_store, use_cache, timeframes, deadline):
+            results.append(result)
+            if on_result is not None:
+                on_result(*result)
+        results.sort(key=lambda r: r[0])
+        df_all = concat_frames([df for _, _, df, _ in results if df is not None])
+        resumo = completeness_report(results, time.monotonic() - inicio, bars)
+        span.update(symbols=len(results), rows=len(df_all), received=resumo["recebidos"])
+    return df_all, results, resumo
+
+
+def collect_tv_all(ativos_b3, ativos_fx, bars, tv_username=None, tv_password=None,
+                   max_workers=None, requests_per_sec=None, use_store=None,
+                   use_cache=None, timeframes=None, deadline=None, report=None):
+    """
+    Coleta séries históricas de TradingView via tvDatafeed.
+    Retorna DataFrame concatenado com colunas: symbol, exchange, datetime, open, high, low, close, volume
+    - bars: número de barras a coletar (por símbolo)
+    - max_workers: símbolos buscados em paralelo (padrão TV_MAX_WORKERS; 1 = sequencial)
+    - requests_per_sec: limite de requisições/s só desta coleta (padrão: o limite do processo,
+      TV_REQUESTS_PER_SEC, compartilhado por todas as sessões)
+    - use_store: lê/grava o histórico no store local (padrão TV_USE_CANDLE_STORE)
+    - use_cache: reaproveita séries já buscadas por outras sessões (padrão TV_USE_CANDLE_CACHE)
+    - timeframes: ex. ["1m", "15m", "1d"]; só a série de 1m vem da rede e cada timeframe
+      entrega até `bars` barras, identificadas pela coluna "timeframe" (None = só 1m, sem a coluna).
+      A série de 1m é limitada a TV_MAX_BASE_BARS barras: timeframes maiores podem vir com
+      menos (ver "barras_curtas" no resumo de completude)
+    - deadline: prazo total em segundos (padrão TV_DEADLINE); devolve o que chegou até ele
+    - report: dict preenchido com o resumo de completude (ver completeness_report)
+    """
+    df_all, results, resumo = collect_tv_frames(ativos_b3, ativos_fx, bars, tv_username, tv_password,
+                                                max_workers, requests_per_sec, use_store, use_cache,
+                                                timeframes, deadline)
+    if report is not None:
+        report.update(resumo)
+    _report([msg for _, _, _, msg in results if msg is not None])
+    if results and not resumo["completo"]:
+        st.info(f"Coleta parcial: {resumo['recebidos']}/{resumo['solicitados']} ativos em {resumo['segundos']}s.")
+    if resumo.get("barras_curtas"):
+        st.warning(short_bars_message(resumo["barras_curtas"]))
+    return df_all
@@ -0,0 +1,157 @@
+import os
+import time
+import queue
+import hashlib
+import threading
+from contextlib import contextmanager
+# Dependência: tvdatafeed (usa websocket internamente)
+from tvDatafeed import TvDatafeed
+
+# ======================================================================
+# POOL DE SESSÕES DO TRADINGVIEW
+# ======================================================================
+# Sessões TvDatafeed de vida longa, compartilhadas entre reruns e sessões do Streamlit.
+# Cada conjunto de credenciais (ou o modo anônimo) tem o seu próprio pool.
+# Não há teste de vida da conexão: a sessão é trocada por idade (TV_POOL_MAX_AGE), quando
+# o login caiu no token anônimo ou quando uma chamada com ela levanta exceção.
+TV_POOL_MAX_SESSIONS = int(os.getenv("TV_POOL_MAX_SESSIONS", 4))
+# Sessões mais antigas que isso são recriadas (o token do login expira)
+TV_POOL_MAX_AGE = float(os.getenv("TV_POOL_MAX_AGE", 3600))
+# Tempo máximo esperando uma sessão livre
+TV_POOL_TIMEOUT = float(os.getenv("TV_POOL_TIMEOUT", 60))
+
+ANONYMOUS_TOKEN = "unauthorized_user_token"
+
+
+class _Session:
+    def __init__(self, client):
+        self.client = client
+        self.created_at = time.monotonic()
+
+
+class TvSessionPool:
+    """
+    Pool limitado de clientes TvDatafeed.
+    Um cliente é usado por uma thread de cada vez (ele guarda o websocket no próprio objeto).
+    """
+
+    def __init__(self, username=None, password=None, max_sessions=TV_POOL_MAX_SESSIONS,
+                 max_age=TV_POOL_MAX_AGE):
+        self.username = username
+        self.password = password
+        self.max_sessions = max_sessions
+        self.max_age = max_age
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(max_sessions)
+        self._lock = threading.Lock()
+        self._in_use = 0
+        self.created = 0
+        self.discarded = 0
+
+    def _connect(self):
+        # tvdatafeed aceita credenciais (opcional). Se None, tenta anonymous (pode falhar para alguns símbolos).
+        if self.username and self.password:
+            client = TvDatafeed(self.username, self.password)
+        else:
+            client = TvDatafeed()  # anonymous mode (pode funcionar para muitos símbolos)
+        with self._lock:
+            self.created += 1
+        return _Session(client)
+
+    def _is_fresh(self, session):
+        """Rotação por idade/token (não testa a conexão): sessão velha ou sem login é recriada."""
+        if time.monotonic() - session.created_at > self.max_age:
+            return False
+        # Login que falhou cai silenciosamente no token anônimo
+        if self.username and getattr(session.client, "token", None) == ANONYMOUS_TOKEN:
+            return False
+        return True
+
+    def _discard(self, session):
+        with self._lock:
+            self.discarded += 1
+        ws = getattr(session.client, "ws", None)
+        if ws is not None:
+            try:
+                ws.close()
+            except Exception:
+                pass
+
+    @contextmanager
+    def session(self, timeout=TV_POOL_TIMEOUT):
+        """Empresta um cliente dentro da validade; em caso de erro ele é descartado em vez de devolvido."""
+        if not self._slots.acquire(timeout=timeout):
+            raise TimeoutError("Nenhuma sessão do TradingView disponível")
+        with self._lock:
+            self._in_use += 1
+        session = None
+        try:
+            while session is None:
+                try:
+                    candidate = self._idle.get_nowait()
+                except queue.Empty:
+                    session = self._connect()
+                    break
+                if self._is_fresh(candidate):
+                    session = candidate
+                else:
+                    self._discard(candidate)
+            yield session.client
+        except BaseException:
+            if session is not None:
+                self._discard(session)
+            raise
+        else:
+            self._idle.put(session)
+        finally:
+            with self._lock:
+                self._in_use -= 1
+            self._slots.release()
+
+    def free_slots(self) -> int:
+        """Sessões que podem ser emprestadas agora sem esperar."""
+        with self._lock:
+            return self.max_sessions - self._in_use
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "idle": self._idle.qsize(),
+                "in_use": self._in_use,
+                "max_sessions": self.max_sessions,
+                "created": self.created,
+                "discarded": self.discarded,
+            }
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def _pool_key(username, password):
+    if not (username and password):
+        return "anonymous"
+    return hashlib.sha256(f"{username}\0{password}".encode()).hexdigest()
+
+
+def get_pool(username=None, password=None) -> TvSessionPool:
+    """Pool do processo para as credenciais informadas (anônimo se vazias)."""
+    key = _pool_key(username, password)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            if key == "anonymous":
+                pool = TvSessionPool()
+            else:
+                pool = TvSessionPool(username, password)
+            _pools[key] = pool
+        return pool
+
+
+def stats() -> dict:
+    with _pools_lock:
+        pools = dict(_pools)
+    return {
+        ("anonymous" if key == "anonymous" else pool.username): pool.stats()
+        for key, pool in pools.items()
+    }
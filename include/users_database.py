@@ -1,27 +1,215 @@
+import io
 import os
+import logging
+import csv
+import time
+import secrets
+import weakref
+import threading
+from collections import deque
+from contextlib import contextmanager
 import streamlit
 import pymysql
 from pymysql import MySQLError
 from dotenv import load_dotenv
+import include.telemetry as telemetry
+import include.auth as auth
 
+# Configuração lida uma única vez, na importação do módulo
+load_dotenv()
+MYSQL_CONFIG = dict(
+    host=os.getenv("MYSQL_HOST", "localhost"),
+    user=os.getenv("MYSQL_USER", "root"),
+    password=os.getenv("MYSQL_PASSWORD", ""),
+    database=os.getenv("MYSQL_DATABASE", "rdx_dash"),
+    port=int(os.getenv("MYSQL_PORT", 3306)),
+    connect_timeout=5,
+    cursorclass=pymysql.cursors.Cursor,
+    autocommit=False
+)
+MYSQL_POOL_MIN = int(os.getenv("MYSQL_POOL_MIN", 1))
+MYSQL_POOL_MAX = int(os.getenv("MYSQL_POOL_MAX", 10))
+# Espera máxima (segundos) por uma conexão livre quando o pool está cheio
+MYSQL_POOL_TIMEOUT = float(os.getenv("MYSQL_POOL_TIMEOUT", 10))
+# Validade (segundos) do perfil de usuário em cache no processo
+USER_PROFILE_TTL = float(os.getenv("USER_PROFILE_TTL", 300))
+# Linhas por executemany/IN nas operações em lote do admin
+BULK_BATCH_SIZE = int(os.getenv("BULK_BATCH_SIZE", 1000))
+
+
+class PooledConnection:
+    """
+    Conexão emprestada do pool. Repassa tudo para a conexão pymysql, mas close()
+    (ou sair do bloco with) devolve a conexão ao pool em vez de fechar o socket.
+    """
+
+    def __init__(self, pool, raw):
+        self._pool = pool
+        self._raw = raw
+        # páginas que não chamam close() devolvem a conexão quando o objeto é coletado
+        self._finalizer = weakref.finalize(self, pool._release, raw)
+
+    def __getattr__(self, name):
+        raw = self.__dict__.get("_raw")
+        if raw is None:
+            raise MySQLError("Conexão já devolvida ao pool")
+        return getattr(raw, name)
+
+    def close(self):
+        if self._raw is not None:
+            self._raw = None
+            self._finalizer()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ConnectionPool:
+    """Pool de conexões MySQL do processo, com ping antes de emprestar e métricas de uso."""
+
+    def __init__(self, config, min_size, max_size, timeout):
+        self.config = config
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self._cond = threading.Condition()
+        self._idle = deque()
+        self._size = 0  # conexões abertas (ociosas + emprestadas)
+        self._warmed = False
+        self.metrics = {"checkouts": 0, "wait_total": 0.0, "wait_max": 0.0,
+                        "timeouts": 0, "created": 0, "reconnects": 0}
+
+    def _connect(self):
+        raw = pymysql.connect(**self.config)
+        with self._cond:
+            self.metrics["created"] += 1
+        return raw
+
+    def _warm_up(self):
+        # abre o mínimo configurado na primeira utilização (não na importação)
+        self._warmed = True
+        for _ in range(self.min_size - self._size):
+            try:
+                raw = self._connect()
+            except MySQLError:
+                return
+            with self._cond:
+                self._size += 1
+                self._idle.append(raw)
+
+    def acquire(self) -> PooledConnection:
+        if not self._warmed:
+            self._warm_up()
+        start = time.monotonic()
+        raw = None
+        with self._cond:
+            while True:
+                if self._idle:
+                    raw = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    self._size += 1
+                    break
+                remaining = self.timeout - (time.monotonic() - start)
+                if remaining <= 0:
+                    self.metrics["timeouts"] += 1
+                    raise pymysql.err.OperationalError(2013, "Pool de conexões MySQL esgotado")
+                self._cond.wait(remaining)
+
+        try:
+            if raw is None:
+                raw = self._connect()
+            else:
+                try:
+                    # conexão ociosa pode ter caído (wait_timeout do servidor)
+                    raw.ping(reconnect=True)
+                except MySQLError:
+                    self._close_quietly(raw)
+                    raw = self._connect()
+                    with self._cond:
+                        self.metrics["reconnects"] += 1
+        except BaseException:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+
+        waited = time.monotonic() - start
+        with self._cond:
+            self.metrics["checkouts"] += 1
+            self.metrics["wait_total"] += waited
+            self.metrics["wait_max"] = max(self.metrics["wait_max"], waited)
+        return PooledConnection(self, raw)
+
+    def _release(self, raw):
+        try:
+            # encerra a transação aberta (autocommit=False): o próximo uso não vê snapshot antigo
+            raw.rollback()
+        except MySQLError:
+            self._close_quietly(raw)
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            return
+        with self._cond:
+            self._idle.append(raw)
+            self._cond.notify()
+
+    @staticmethod
+    def _close_quietly(raw):
+        try:
+            raw.close()
+        except Exception:
+            pass
+
+    def stats(self) -> dict:
+        with self._cond:
+            checkouts = self.metrics["checkouts"]
+            return {
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": self._size - len(self._idle),
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                "checkouts": checkouts,
+                "wait_avg_ms": 1000 * self.metrics["wait_total"] / checkouts if checkouts else 0.0,
+                "wait_max_ms": 1000 * self.metrics["wait_max"],
+                "timeouts": self.metrics["timeouts"],
+                "created": self.metrics["created"],
+                "reconnects": self.metrics["reconnects"],
+            }
+
+
+pool = ConnectionPool(MYSQL_CONFIG, MYSQL_POOL_MIN, MYSQL_POOL_MAX, MYSQL_POOL_TIMEOUT)
+
+
+@telemetry.timed()
 def create_connection():
     try:
-        load_dotenv()
-        conn = pymysql.connect(
-            host=os.getenv("MYSQL_HOST", "localhost"),
-            user=os.getenv("MYSQL_USER", "root"),
-            password=os.getenv("MYSQL_PASSWORD", ""),
-            database=os.getenv("MYSQL_DATABASE", "rdx_dash"),
-            port=int(os.getenv("MYSQL_PORT", 3306)),
-            connect_timeout=5,
-            cursorclass=pymysql.cursors.Cursor,
-            autocommit=False
-        )
-        return conn
+        return pool.acquire()
     except MySQLError as e:
         streamlit.error(f"Erro ao conectar ao banco: {e}")
         return None
 
+
+@contextmanager
+def connection():
+    """Empresta uma conexão do pool e a devolve ao sair do bloco (None se o banco estiver fora)."""
+    conn = create_connection()
+    try:
+        yield conn
+    finally:
+        if conn is not None:
+            conn.close()
+
+
+def pool_stats() -> dict:
+    return pool.stats()
+
+@telemetry.timed()
 def create_table(conn):
     if conn is None:
         return False
@@ -39,18 +227,23 @@ def create_table(conn):
             description VARCHAR(150),
             token VARCHAR(50), 
             exp_time DATETIME,
-            token_usado BOOLEAN DEFAULT TRUE
+            token_usado BOOLEAN DEFAULT TRUE,
+            created_at TIMESTAMP NULL DEFAULT CURRENT_TIMESTAMP,
+            INDEX idx_users_status_created (contract_status, created_at),
+            INDEX idx_users_created (created_at)
         );
     """
     try:
         with conn.cursor() as cursor:
             cursor.execute(create_table_sql)
         conn.commit()
+        migrate_users_table(conn)
         return True
     except MySQLError as e:
         streamlit.error(e)
         return False
 
+@telemetry.timed()
 def update_value(conn, table, key, value, username):
     if conn is None:
         return 0
@@ -60,11 +253,13 @@ def update_value(conn, table, key, value, username):
         with conn.cursor() as cursor:
             cursor.execute(sql, (value, username))
         conn.commit()
+        invalidate_user_profile(username)
         return cursor.rowcount
     except MySQLError:
         return 0
 
 
+@telemetry.timed()
 def get_user_info(conn, key, table, user_email):
     if conn is None:
         return []
@@ -75,6 +270,7 @@ def get_user_info(conn, key, table, user_email):
         return cursor.fetchall()
 
 
+@telemetry.timed()
 def get_user_info_by_id(conn, key, table, user_id):
     if conn is None:
         return []
@@ -84,10 +280,74 @@ def get_user_info_by_id(conn, key, table, user_id):
         cursor.execute(query, (user_id,))
         return cursor.fetchall()
 
+# ==========================================================
+# PERFIL DO USUÁRIO (uma consulta no login, cache no processo)
+# ==========================================================
+PROFILE_COLUMNS = ("id", "user_name", "user_email", "access_lvl", "contract_status")
+
+_profile_lock = threading.Lock()
+_profile_cache = {}  # email normalizado (email_key) -> (expira_em, perfil)
+
+
+def email_key(user_email) -> str:
+    """Email como chave: sem espaços e minúsculo (o MySQL compara user_email sem diferenciar caixa)."""
+    return (user_email or "").strip().lower()
+
+
+@telemetry.timed()
+def get_user_auth(conn, user_email):
+    """Perfil + password/salt do usuário numa única consulta (None se não existir)."""
+    if conn is None:
+        return None
+
+    query = f"SELECT {', '.join(PROFILE_COLUMNS)}, password, salt FROM users WHERE user_email=%s"
+    with conn.cursor(pymysql.cursors.DictCursor) as cursor:
+        cursor.execute(query, (user_email,))
+        return cursor.fetchone()
+
+
+def cache_user_profile(profile):
+    with _profile_lock:
+        _profile_cache[email_key(profile["user_email"])] = (time.monotonic() + USER_PROFILE_TTL, dict(profile))
+
+
+def invalidate_user_profile(user_email):
+    with _profile_lock:
+        _profile_cache.pop(email_key(user_email), None)
+
+
+@telemetry.timed()
+def get_user_profile(user_email, conn=None):
+    """
+    Perfil do usuário (id, user_name, user_email, access_lvl, contract_status).
+    Vem do cache do processo enquanto válido; só consulta o banco na falta.
+    """
+    with _profile_lock:
+        entry = _profile_cache.get(email_key(user_email))
+    if entry is not None and entry[0] > time.monotonic():
+        return dict(entry[1])
+
+    query = f"SELECT {', '.join(PROFILE_COLUMNS)} FROM users WHERE user_email=%s"
+    own = conn is None
+    conn = conn or create_connection()
+    if conn is None:
+        return None
+    try:
+        with conn.cursor(pymysql.cursors.DictCursor) as cursor:
+            cursor.execute(query, (user_email,))
+            profile = cursor.fetchone()
+    finally:
+        if own:
+            conn.close()
+    if profile is not None:
+        cache_user_profile(profile)
+    return profile
+
 # ==========================================================
 # NOVAS FUNÇÕES PARA A PÁGINA ADMIN
 # ==========================================================
 
+@telemetry.timed()
 def get_all_users(conn):
     if conn is None:
         return []
@@ -96,6 +356,7 @@ def get_all_users(conn):
         cursor.execute("SELECT * FROM users ORDER BY id DESC;")
         return cursor.fetchall()
 
+@telemetry.timed()
 def count_active_users(conn):
     if conn is None:
         return 0
@@ -106,6 +367,173 @@ def count_active_users(conn):
         )
         return cursor.fetchone()[0]
 
+# ==========================================================
+# LISTAGEM PAGINADA DE USUÁRIOS (ADMIN)
+# ==========================================================
+# Filtros, ordenação, contagem e paginação rodam no banco; a página recebe apenas
+# as linhas visíveis. user_email já é UNIQUE (atende o filtro por prefixo) e os
+# índices abaixo atendem o filtro por status/data de cadastro.
+USER_LIST_COLUMNS = ("id", "user_name", "user_email", "contract_id", "contract_status",
+                     "access_lvl", "created_at")
+USER_SORT_COLUMNS = ("id", "user_name", "user_email", "contract_status", "created_at")
+USER_INDEXES = {
+    "idx_users_status_created": "(contract_status, created_at)",
+    "idx_users_created": "(created_at)",
+}
+
+# Erros do MySQL que indicam migração já aplicada (ex.: por outro processo ao mesmo tempo)
+_ALREADY_APPLIED = (1060, 1061)  # coluna duplicada, índice duplicado
+_users_migrated = False
+
+
+def _apply(cursor, statement):
+    try:
+        cursor.execute(statement)
+    except MySQLError as e:
+        if e.args[0] not in _ALREADY_APPLIED:
+            raise
+
+
+@telemetry.timed()
+def migrate_users_table(conn):
+    """
+    Adiciona created_at e os índices da listagem em bancos criados antes deles (idempotente).
+    Roda explicitamente (create_table e início do admin), nunca nas consultas. Usuários antigos
+    ficam com created_at NULL: a data de cadastro deles é desconhecida e não entra nos filtros.
+    """
+    global _users_migrated
+    if conn is None or _users_migrated:
+        return _users_migrated
+
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                SELECT COUNT(*) FROM information_schema.columns
+                WHERE table_schema = DATABASE() AND table_name = 'users' AND column_name = 'created_at'
+            """)
+            if cursor.fetchone()[0] == 0:
+                # sem DEFAULT na criação as linhas existentes ficam NULL; o padrão vale só para as novas
+                _apply(cursor, "ALTER TABLE users ADD COLUMN created_at TIMESTAMP NULL DEFAULT NULL")
+                cursor.execute("ALTER TABLE users MODIFY created_at TIMESTAMP NULL DEFAULT CURRENT_TIMESTAMP")
+
+            cursor.execute("""
+                SELECT DISTINCT index_name FROM information_schema.statistics
+                WHERE table_schema = DATABASE() AND table_name = 'users'
+            """)
+            existing = {row[0] for row in cursor.fetchall()}
+            for index_name, columns in USER_INDEXES.items():
+                if index_name not in existing:
+                    _apply(cursor, f"CREATE INDEX {index_name} ON users {columns}")
+        conn.commit()
+    except MySQLError as e:
+        conn.rollback()
+        telemetry.log(logging.ERROR, "users_database.migration_failed", error=f"{type(e).__name__}: {e}")
+        return False
+    _users_migrated = True
+    return True
+
+
+def _escape_like(text):
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _user_filters(status=None, email_prefix=None, created_from=None, created_to=None):
+    """Cláusula WHERE e parâmetros dos filtros da listagem."""
+    clauses, params = [], []
+    if status:
+        clauses.append("contract_status = %s")
+        params.append(status)
+    if email_prefix:
+        clauses.append("user_email LIKE %s")
+        params.append(_escape_like(email_prefix.strip()) + "%")
+    if created_from:
+        clauses.append("created_at >= %s")
+        params.append(created_from)
+    if created_to:
+        # data final inclusiva
+        clauses.append("created_at < %s + INTERVAL 1 DAY")
+        params.append(created_to)
+    where = ("WHERE " + " AND ".join(clauses)) if clauses else ""
+    return where, params
+
+
+@telemetry.timed()
+def count_users(conn, status=None, email_prefix=None, created_from=None, created_to=None):
+    """Total de usuários que atendem aos filtros."""
+    if conn is None:
+        return 0
+
+    where, params = _user_filters(status, email_prefix, created_from, created_to)
+    with conn.cursor() as cursor:
+        cursor.execute(f"SELECT COUNT(*) FROM users {where}", params)
+        return cursor.fetchone()[0]
+
+
+@telemetry.timed()
+def list_users(conn, page=1, page_size=50, sort="id", descending=True,
+               status=None, email_prefix=None, created_from=None, created_to=None):
+    """Uma página de usuários (sem password/salt), já filtrada e ordenada no banco."""
+    if conn is None:
+        return []
+
+    if sort not in USER_SORT_COLUMNS:
+        raise ValueError(f"Ordenação inválida: {sort}")
+    page = max(1, int(page))
+    page_size = max(1, int(page_size))
+    where, params = _user_filters(status, email_prefix, created_from, created_to)
+    direction = "DESC" if descending else "ASC"
+
+    query = f"""
+        SELECT {', '.join(USER_LIST_COLUMNS)}
+        FROM users
+        {where}
+        ORDER BY {sort} {direction}, id {direction}
+        LIMIT %s OFFSET %s
+    """
+    with conn.cursor(pymysql.cursors.DictCursor) as cursor:
+        cursor.execute(query, params + [page_size, (page - 1) * page_size])
+        return cursor.fetchall()
+
+
+@telemetry.timed()
+def user_counters(conn, recent_days=30):
+    """Contadores do painel numa única consulta agregada."""
+    empty = {"total": 0, "active": 0, "revoked": 0, "recent": 0}
+    if conn is None:
+        return empty
+
+    query = """
+        SELECT COUNT(*) AS total,
+               COALESCE(SUM(contract_status = 'active'), 0) AS active,
+               COALESCE(SUM(contract_status = 'revoked'), 0) AS revoked,
+               COALESCE(SUM(created_at >= NOW() - INTERVAL %s DAY), 0) AS recent
+        FROM users
+    """
+    with conn.cursor(pymysql.cursors.DictCursor) as cursor:
+        cursor.execute(query, (int(recent_days),))
+        row = cursor.fetchone()
+    return {key: int(row[key]) for key in empty} if row else empty
+
+
+@telemetry.timed()
+def search_users(conn, email_prefix, limit=20):
+    """Usuários cujo email começa com o texto digitado (busca do "Gerenciar Usuários")."""
+    if conn is None or not email_prefix or not email_prefix.strip():
+        return []
+
+    query = """
+        SELECT id, user_name, user_email, contract_status
+        FROM users
+        WHERE user_email LIKE %s
+        ORDER BY user_email
+        LIMIT %s
+    """
+    with conn.cursor(pymysql.cursors.DictCursor) as cursor:
+        cursor.execute(query, (_escape_like(email_prefix.strip()) + "%", int(limit)))
+        return cursor.fetchall()
+
+
+@telemetry.timed()
 def insert_new_user(conn, name, email, password, salt, status):
     if conn is None:
         return None
@@ -120,6 +548,7 @@ def insert_new_user(conn, name, email, password, salt, status):
         conn.commit()
         return cursor.lastrowid
 
+@telemetry.timed()
 def update_user_status(conn, user_email, new_status):
     if conn is None:
         return 0
@@ -130,10 +559,12 @@ def update_user_status(conn, user_email, new_status):
             (new_status, user_email)
         )
         conn.commit()
+        invalidate_user_profile(user_email)
         return cursor.rowcount
 
 
 
+@telemetry.timed()
 def delete_user(conn, user_email):
     if conn is None:
         return 0
@@ -144,4 +575,149 @@ def delete_user(conn, user_email):
             (user_email,)
         )
         conn.commit()
-        return cursor.rowcount
\ No newline at end of file
+        invalidate_user_profile(user_email)
+        return cursor.rowcount
+
+
+# ==========================================================
+# OPERAÇÕES EM LOTE (ADMIN)
+# ==========================================================
+# Importação por CSV e troca de status de uma lista de emails. Tudo roda numa única
+# transação, em lotes de BULK_BATCH_SIZE; cada linha recebe um resultado no relatório.
+USER_STATUSES = ("active", "revoked")
+IMPORT_COLUMNS = ("user_name", "user_email", "password", "contract_status")
+
+
+def hash_password(password, salt=None):
+    """(hash, salt) para gravar em users; o hash é o de auth.hash_data (verificado no login)."""
+    salt = salt or secrets.token_hex(16)
+    return auth.hash_data(password, salt), salt
+
+
+def _batches(items, size=None):
+    size = size or BULK_BATCH_SIZE
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def _existing_emails(cursor, emails):
+    found = set()
+    for batch in _batches(emails):
+        placeholders = ", ".join(["%s"] * len(batch))
+        cursor.execute(f"SELECT user_email FROM users WHERE user_email IN ({placeholders})", batch)
+        found.update(email_key(row[0]) for row in cursor.fetchall())
+    return found
+
+
+def read_users_csv(data, default_status="active"):
+    """
+    Lê o CSV de importação (bytes ou texto). Colunas: user_name, user_email, password
+    e, opcional, contract_status. Retorna a lista de linhas (dicts) numeradas a partir de 2.
+    """
+    if isinstance(data, bytes):
+        data = data.decode("utf-8-sig")
+    reader = csv.DictReader(io.StringIO(data), delimiter=";" if data.count(";") > data.count(",") else ",")
+    fields = [f.strip() for f in reader.fieldnames or []]
+    missing = [c for c in IMPORT_COLUMNS[:3] if c not in fields]
+    if missing:
+        raise ValueError(f"Colunas ausentes no CSV: {', '.join(missing)}")
+
+    rows = []
+    for line, raw in enumerate(reader, start=2):
+        row = {(k or "").strip(): (v or "").strip() for k, v in raw.items()}
+        row["contract_status"] = row.get("contract_status") or default_status
+        row["linha"] = line
+        rows.append(row)
+    return rows
+
+
+@telemetry.timed()
+def bulk_insert_users(conn, rows):
+    """
+    Insere os usuários válidos em lote, numa única transação.
+    Retorna o relatório: [{"linha", "user_email", "resultado", "detalhe"}].
+    Resultados: "criado", "ignorado" (linha inválida/duplicada) ou "erro" (transação desfeita).
+    """
+    if conn is None:
+        return []
+
+    report, valid, seen = [], [], set()
+    for row in rows:
+        email = email_key(row.get("user_email"))
+        entry = {"linha": row.get("linha"), "user_email": email, "resultado": "ignorado", "detalhe": ""}
+        report.append(entry)
+        if not row.get("user_name") or not email or not row.get("password"):
+            entry["detalhe"] = "Campos obrigatórios vazios"
+        elif "@" not in email:
+            entry["detalhe"] = "Email inválido"
+        elif row.get("contract_status") not in USER_STATUSES:
+            entry["detalhe"] = f"Status inválido: {row.get('contract_status')}"
+        elif email in seen:
+            entry["detalhe"] = "Email repetido no arquivo"
+        else:
+            seen.add(email)
+            valid.append((entry, row))
+
+    sql = """
+        INSERT INTO users
+        (user_name, user_email, password, salt, contract_status)
+        VALUES (%s, %s, %s, %s, %s)
+    """
+    try:
+        with conn.cursor() as cursor:
+            existing = _existing_emails(cursor, [e["user_email"] for e, _ in valid])
+            to_insert = []
+            for entry, row in valid:
+                if entry["user_email"] in existing:
+                    entry["detalhe"] = "Email já cadastrado"
+                    continue
+                hashed, salt = hash_password(row["password"])
+                to_insert.append((entry, (row["user_name"], entry["user_email"], hashed, salt,
+                                          row["contract_status"])))
+            for batch in _batches(to_insert):
+                # pymysql reescreve o executemany de INSERT como um único INSERT multi-linha
+                cursor.executemany(sql, [values for _, values in batch])
+        conn.commit()
+    except MySQLError as e:
+        conn.rollback()
+        for entry, _ in valid:
+            entry["resultado"], entry["detalhe"] = "erro", f"Importação desfeita: {e}"
+        return report
+
+    for entry, _ in to_insert:
+        entry["resultado"] = "criado"
+    return report
+
+
+@telemetry.timed()
+def bulk_update_status(conn, emails, new_status):
+    """
+    Troca o status de vários usuários numa única transação.
+    Retorna o relatório: [{"user_email", "resultado"}] com "atualizado", "não encontrado" ou "erro".
+    """
+    if conn is None:
+        return []
+    if new_status not in USER_STATUSES:
+        raise ValueError(f"Status inválido: {new_status}")
+
+    emails = list(dict.fromkeys(email_key(e) for e in emails if e and e.strip()))
+    try:
+        with conn.cursor() as cursor:
+            existing = _existing_emails(cursor, emails)
+            found = [e for e in emails if e in existing]
+            for batch in _batches(found):
+                # um UPDATE ... IN (...) por lote em vez de um comando por email
+                placeholders = ", ".join(["%s"] * len(batch))
+                cursor.execute(
+                    f"UPDATE users SET contract_status=%s WHERE user_email IN ({placeholders})",
+                    [new_status] + batch
+                )
+        conn.commit()
+    except MySQLError:
+        conn.rollback()
+        return [{"user_email": e, "resultado": "erro"} for e in emails]
+
+    for email in found:
+        invalidate_user_profile(email)
+    return [{"user_email": e, "resultado": "atualizado" if e in existing else "não encontrado"}
+            for e in emails]
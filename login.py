@@ -1,7 +1,7 @@
 import streamlit as st
 import time
-import hashlib
 from include import users_database as udb
+from include.auth import verify_password
 from include.password_reset import forgot_password
 from streamlit_extras.stylable_container import stylable_container
 st.write(st.session_state)
@@ -14,29 +14,11 @@ def update_login_cookies():
     controller.set('expiration', st.session_state['expiration'])
     controller.set('access_lvl', st.session_state['access_lvl'])
 
-def hash_data(data, salt):
-    combined = (salt + data).encode()
-    hashed_data = hashlib.sha256(combined).hexdigest()
-    return hashed_data
-
 def stream(text):
     for chunk in text:
         yield str(chunk)
         time.sleep(0.006)
 
-def verify_password(conn, email, password):
-    cursor = conn.cursor()
-    cursor.execute("SELECT password, salt FROM users WHERE user_email = %s", (email,))
-    result = cursor.fetchone()
-    cursor.close()
-    if result:
-        stored_hash, salt = result
-        hashed_password = hash_data(password, salt)
-        return hashed_password == stored_hash
-    else:
-        st.error('Erro ao conectar com o banco de dados')
-        return False
-
 def login():
     """Returns `True` if the user had a correct password."""
     exp_time = 60*12  # Session Expiration Time in Minutes
@@ -66,15 +48,15 @@ def login():
         """Checks whether a password entered by the user is correct."""
         conn = udb.create_connection()
 
-        if verify_password(conn, st.session_state["user_email"], st.session_state["password"]):
+        profile = verify_password(conn, st.session_state["user_email"], st.session_state["password"])
+        if profile:
             st.session_state["logged_in"] = True
 
             st.session_state["email"] = st.session_state["user_email"]
-            st.session_state['access_lvl'] = udb.get_user_info(conn, 'access_lvl', 'users', st.session_state['user_email'])[0][0]
-            st.session_state['contract_status'] = \
-            udb.get_user_info(conn, 'contract_status', 'users', st.session_state['user_email'])[0][0]
+            st.session_state['access_lvl'] = profile['access_lvl']
+            st.session_state['contract_status'] = profile['contract_status']
             st.session_state["expiration"] = time.time() + (60 * exp_time)
-            st.session_state['user_id'] = udb.get_user_info(conn, 'id', 'users', st.session_state.user_email)[0][0]
+            st.session_state['user_id'] = profile['id']
             del st.session_state["password"]  # Don't store the password.
             update_login_cookies()
             conn.close()
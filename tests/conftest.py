@@ -0,0 +1,20 @@
+import os
+import sys
+import tempfile
+
+# Testes rodam a partir da raiz do repositório, sem banco, rede nem tvDatafeed instalado
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+os.environ.setdefault("TELEMETRY_LOG", "0")
+os.environ.setdefault("METRICS_PORT", "0")
+_TMP = tempfile.mkdtemp(prefix="orbedash-tests-")
+os.environ.setdefault("CANDLE_DB_PATH", os.path.join(_TMP, "candles.db"))
+os.environ.setdefault("JOBS_DIR", os.path.join(_TMP, "jobs"))
+
+from benchmarks.fakes import install_fake_tvdatafeed  # noqa: E402
+
+fake_tv = install_fake_tvdatafeed()
+fake_tv.login_latency = 0
+fake_tv.latency = 0
+fake_tv.jitter = 0
@@ -0,0 +1,39 @@
+import json
+
+import pytest
+
+from benchmarks.fakes import AGENT_RESPONSE
+from include.agent_stream import IncrementalJsonParser
+
+RESPONSE = dict(AGENT_RESPONSE, trend_summary='Viés "comprador" {acima} de [125000]\\ com escape')
+TEXT = "```json\n" + json.dumps(RESPONSE, ensure_ascii=False, indent=2) + "\n```"
+
+
+def _events(chunks):
+    parser = IncrementalJsonParser()
+    events = []
+    for chunk in chunks:
+        events += parser.feed(chunk)
+    return events
+
+
+def test_emits_root_strings_and_list_items_in_order():
+    events = _events([TEXT])
+    assert events[0] == ("field", "timestamp_utc", RESPONSE["timestamp_utc"])
+    assert events[1] == ("field", "trend_summary", RESPONSE["trend_summary"])
+    ideas = [value for kind, key, value in events if key == "trade_ideas"]
+    assert ideas == RESPONSE["trade_ideas"]
+    assert ("item", "key_indicators_used", "stub") in events
+    assert ("item", "assumptions", "stub") in events
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 64])
+def test_chunking_does_not_change_the_events(size):
+    chunks = [TEXT[i:i + size] for i in range(0, len(TEXT), size)]
+    assert _events(chunks) == _events([TEXT])
+
+
+def test_text_after_the_root_object_is_ignored():
+    parser = IncrementalJsonParser()
+    events = parser.feed('{"trend_summary": "alta"} {"trend_summary": "baixa"}')
+    assert events == [("field", "trend_summary", "alta")] and parser.finished
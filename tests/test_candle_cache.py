@@ -0,0 +1,95 @@
+import time
+import threading
+
+import pytest
+
+from include.candle_cache import CandleCache, next_bar_boundary
+
+
+def test_next_bar_boundary_is_the_close_of_the_current_bar():
+    assert next_bar_boundary(60, now=120.0) == 180.0
+    assert next_bar_boundary(60, now=179.9) == 180.0
+
+
+def test_entries_expire_at_their_boundary():
+    cache = CandleCache(max_entries=8)
+    loads = []
+    loader = lambda: loads.append(1) or "bars"
+    assert cache.get_or_load("k", loader, time.time() + 0.05) == "bars"
+    assert cache.get_or_load("k", loader, time.time() + 0.05) == "bars"
+    assert len(loads) == 1
+    time.sleep(0.06)
+    cache.get_or_load("k", loader, time.time() + 60)
+    assert len(loads) == 2
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 2
+
+
+def test_none_and_errors_are_not_cached():
+    def failing():
+        raise RuntimeError("tv fora")
+
+    cache = CandleCache(max_entries=8)
+    assert cache.get_or_load("k", lambda: None, time.time() + 60) is None
+    with pytest.raises(RuntimeError):
+        cache.get_or_load("k", failing, time.time() + 60)
+    assert cache.stats()["entries"] == 0
+
+
+def test_lru_eviction_keeps_the_most_recent_entries():
+    cache = CandleCache(max_entries=2)
+    for key in ("a", "b"):
+        cache.get_or_load(key, lambda: key, time.time() + 60)
+    cache.get_or_load("a", lambda: "novo", time.time() + 60)  # hit: "a" passa a ser o mais recente
+    cache.get_or_load("c", lambda: "c", time.time() + 60)
+    assert cache.get_or_load("a", lambda: "recarregado", time.time() + 60) == "a"
+    assert cache.get_or_load("b", lambda: "recarregado", time.time() + 60) == "recarregado"
+
+
+def test_concurrent_lookups_share_one_load():
+    cache = CandleCache(max_entries=8)
+    release = threading.Event()
+    loads = []
+
+    def loader():
+        loads.append(1)
+        release.wait(5)
+        return "bars"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_load("k", loader, time.time() + 60)))
+               for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    while cache.stats()["coalesced"] < 4:
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert results == ["bars"] * 5 and len(loads) == 1
+
+
+def test_waiters_see_the_leader_error():
+    cache = CandleCache(max_entries=8)
+    release = threading.Event()
+
+    def loader():
+        release.wait(5)
+        raise ConnectionError("tv fora")
+
+    errors = []
+
+    def lookup():
+        try:
+            cache.get_or_load("k", loader, time.time() + 60)
+        except ConnectionError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=lookup) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    while cache.stats()["coalesced"] < 2:
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert len(errors) == 3
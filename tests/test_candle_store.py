@@ -0,0 +1,50 @@
+import pandas as pd
+import pytest
+
+import include.candle_store as candle_store
+from benchmarks.fakes import Interval
+
+INTERVAL = Interval.in_1_minute
+LAST = pd.Timestamp("2024-06-03 17:00")
+
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = candle_store.create_connection(str(tmp_path / "candles.db"))
+    yield conn
+    conn.close()
+
+
+def _bars(n, end=LAST):
+    index = pd.date_range(end=end, periods=n, freq="1min")
+    return pd.DataFrame({"datetime": index, "open": 1.0, "high": 2.0, "low": 0.5,
+                         "close": range(n), "volume": 10.0})
+
+
+def test_empty_store_fetches_everything(conn):
+    assert candle_store.bars_to_fetch("PETR4", "BMFBOVESPA", INTERVAL, 100, now=LAST, conn=conn) == 100
+
+
+def test_short_history_fetches_everything(conn):
+    candle_store.save_candles("PETR4", "BMFBOVESPA", INTERVAL, _bars(50), conn=conn)
+    assert candle_store.bars_to_fetch("PETR4", "BMFBOVESPA", INTERVAL, 100, now=LAST, conn=conn) == 100
+
+
+def test_full_history_fetches_only_elapsed_bars_plus_overlap(conn):
+    candle_store.save_candles("PETR4", "BMFBOVESPA", INTERVAL, _bars(100), conn=conn)
+    fetch = lambda now: candle_store.bars_to_fetch("PETR4", "BMFBOVESPA", INTERVAL, 100, now=now, conn=conn)
+    assert fetch(LAST) == candle_store.OVERLAP_BARS
+    assert fetch(LAST + pd.Timedelta(minutes=10, seconds=30)) == 11 + candle_store.OVERLAP_BARS
+    # muito tempo parado: nunca pede mais que o solicitado
+    assert fetch(LAST + pd.Timedelta(days=3)) == 100
+    # outra série (exchange diferente) não aproveita o histórico
+    assert candle_store.bars_to_fetch("PETR4", "OTHER", INTERVAL, 100, now=LAST, conn=conn) == 100
+
+
+def test_saving_again_replaces_the_partial_last_bar(conn):
+    candle_store.save_candles("PETR4", "BMFBOVESPA", INTERVAL, _bars(3), conn=conn)
+    update = _bars(2, end=LAST + pd.Timedelta(minutes=1)).assign(close=[99.0, 100.0])
+    candle_store.save_candles("PETR4", "BMFBOVESPA", INTERVAL, update, conn=conn)
+    df = candle_store.load_candles("PETR4", "BMFBOVESPA", INTERVAL, 10, conn=conn)
+    assert list(df["close"]) == [0.0, 1.0, 99.0, 100.0]
+    assert df["datetime"].iloc[-1] == LAST + pd.Timedelta(minutes=1)
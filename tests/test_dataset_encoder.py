@@ -0,0 +1,96 @@
+import pandas as pd
+import pytest
+
+import include.dataset_encoder as dataset_encoder
+
+
+@pytest.mark.parametrize("encoding", list(dataset_encoder.ENCODINGS))
+def test_agent_message_names_the_encoding(encoding):
+    message = dataset_encoder.agent_message("# t0=...\nt,WIN1!.c\n0,125000\n", encoding)
+    fence, description = dataset_encoder.AGENT_FORMATS[encoding]
+    assert dataset_encoder.ENCODINGS[encoding] in message and description in message
+    assert f"```{fence}\n# t0=" in message
+    assert ("```csv" in message) == (encoding == "csv")
+
+
+def test_agent_message_rejects_unknown_encoding():
+    with pytest.raises(ValueError):
+        dataset_encoder.agent_message("x", "parquet")
+
+
+def test_tick_size_is_the_gcd_of_prices_not_the_decimal_precision():
+    prices = pd.Series([125000.0, 125005.0, 125015.0, None])
+    assert dataset_encoder.infer_price_precision(prices) == 1.0
+    assert dataset_encoder.infer_tick_size(prices) == 5.0
+    assert dataset_encoder.infer_tick_size(pd.Series([5.25, 5.5, 6.0])) == pytest.approx(0.25)
+    assert dataset_encoder.infer_tick_size(pd.Series([100.37, 100.41])) == pytest.approx(0.01)
+    assert dataset_encoder.infer_tick_size(pd.Series([125000.0])) == 1.0
+
+
+def _frame():
+    """Dois ativos em 1m; o segundo sem a barra das 10:02."""
+    times = pd.date_range("2024-06-03 10:00", periods=4, freq="1min")
+    win = pd.DataFrame({"symbol": "WIN1!", "exchange": "BMFBOVESPA", "datetime": times,
+                        "open": [125000.0, 125010, 125005, 125020], "high": [125015.0, 125020, 125010, 125030],
+                        "low": [124995.0, 125000, 124990, 125005], "close": [125010.0, 125005, 125000, 125025],
+                        "volume": [10.0, 12, 8, 20]})
+    petr = pd.DataFrame({"symbol": "PETR4", "exchange": "BMFBOVESPA", "datetime": times.delete(2),
+                         "open": [38.12, 38.15, 38.2], "high": [38.2, 38.25, 38.3],
+                         "low": [38.1, 38.1, 38.15], "close": [38.15, 38.2, 38.25], "volume": [500.0, 300, 400]})
+    return pd.concat([win, petr], ignore_index=True)
+
+
+def _decode(text):
+    """Lê o formato compacto de volta: {(ativo, campo): [valores por linha, None = vazio]}."""
+    lines = text.strip().splitlines()
+    delta = any(line.startswith("# delta") for line in lines)
+    rows = [line.split(",") for line in lines if not line.startswith("#")]
+    columns, body = rows[0], rows[1:]
+    out = {}
+    for j, column in enumerate(columns[1:], start=1):
+        label, field = column.split(".")
+        values, last = [], 0.0
+        for row in body:
+            if row[j] == "":
+                values.append(None)
+                continue
+            value = float(row[j]) + (last if delta else 0.0)
+            last = value
+            values.append(round(value, 6))
+        out[(label, field)] = values
+    return out, [int(row[0]) for row in body]
+
+
+@pytest.mark.parametrize("encoding", ["compact", "compact_delta"])
+def test_compact_encodings_round_trip(encoding):
+    text = dataset_encoder.encode(_frame(), encoding)
+    decoded, steps = _decode(text)
+    assert steps == [0, 1, 2, 3]
+    assert "WIN1!=WIN1!:BMFBOVESPA tick=5" in text and "PETR4=PETR4:BMFBOVESPA tick=0.01" in text
+    assert decoded[("WIN1!", "c")] == [125010.0, 125005.0, 125000.0, 125025.0]
+    assert decoded[("PETR4", "o")] == [38.12, 38.15, None, 38.2]
+    assert decoded[("PETR4", "v")] == [500.0, 300.0, None, 400.0]
+
+
+def test_compact_is_smaller_than_csv():
+    # o cabeçalho só compensa com algumas barras: 200 minutos de dois ativos
+    times = pd.date_range("2024-06-03 10:00", periods=200, freq="1min")
+    df = pd.concat([pd.DataFrame({"symbol": symbol, "exchange": "BMFBOVESPA", "datetime": times,
+                                  "open": base, "high": base + 10, "low": base - 10, "close": base + 5,
+                                  "volume": 100.0})
+                    for symbol, base in (("WIN1!", 125000.0), ("WDO1!", 5200.0))], ignore_index=True)
+    csv_text = dataset_encoder.encode(df, "csv")
+    report = dataset_encoder.size_report(df, dataset_encoder.encode(df, "compact"), csv_text)
+    assert report["bytes_after"] < report["bytes_before"] and report["reduction_pct"] > 0
+
+
+def test_timeframes_are_encoded_as_separate_blocks():
+    df = _frame().assign(timeframe="1m")
+    daily = df.groupby("symbol", as_index=False).last().assign(timeframe="1d")
+    text = dataset_encoder.encode(pd.concat([df, daily], ignore_index=True), "compact")
+    assert text.startswith("# timeframe=1d\n") and "\n# timeframe=1m\n" in text
+
+
+def test_unknown_encoding_is_rejected():
+    with pytest.raises(ValueError):
+        dataset_encoder.encode(_frame(), "parquet")
@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+
+import include.features as features
+
+
+def _bars(symbols=("PETR4", "VALE3", "WINFUT"), sessions=2, per_session=30, seed=7):
+    """Barras de 1m de alguns ativos em pregões separados por uma pausa de um dia."""
+    rng = np.random.default_rng(seed)
+    times = np.concatenate([pd.date_range(f"2024-06-{3 + d:02d} 10:00", periods=per_session, freq="1min")
+                            for d in range(sessions)])
+    frames = []
+    for symbol in symbols:
+        close = 100 + rng.standard_normal(len(times)).cumsum()
+        frames.append(pd.DataFrame({
+            "symbol": symbol, "exchange": "BMFBOVESPA", "datetime": times,
+            "open": close + 0.1, "high": close + 0.5, "low": close - 0.5, "close": close,
+            "volume": rng.integers(1, 100, len(times)).astype(float),
+        }))
+    return pd.concat(frames, ignore_index=True)
+
+
+def _sorted(out):
+    return out.sort_values("symbol").reset_index(drop=True)
+
+
+def test_features_match_a_per_symbol_computation():
+    df = _bars()
+    out = _sorted(features.compute_features(df, "PETR4", atr_period=5))
+    petr = df[df["symbol"] == "PETR4"].reset_index(drop=True)
+    row = out.iloc[0]
+    session = petr.iloc[30:]
+    prev_close = petr["close"].shift()
+    true_range = np.maximum(petr["high"] - petr["low"],
+                            np.maximum((petr["high"] - prev_close).abs(), (petr["low"] - prev_close).abs()))
+
+    assert row["symbol"] == "PETR4" and row["bars"] == 60
+    assert np.isclose(row["vol_pct"], 100 * np.log(petr["close"]).diff().std())
+    assert np.isclose(row["atr"], true_range.iloc[-5:].mean())
+    assert np.isclose(row["vwap_session"],
+                      ((session["high"] + session["low"] + session["close"]) / 3 * session["volume"]).sum()
+                      / session["volume"].sum())
+    assert np.isclose(row["gap_pct"], 100 * (petr["open"][30] / petr["close"][29] - 1))
+    assert row["session_high"] == session["high"].max()
+    assert np.isclose(row["corr_alvo"], 1.0)
+
+
+def test_input_order_and_dtypes_do_not_change_the_result():
+    df = _bars()
+    expected = _sorted(features.compute_features(df, "VALE3"))
+    shuffled = df.sample(frac=1, random_state=1)
+    categorical = df.assign(symbol=df["symbol"].astype("category"), exchange=df["exchange"].astype("category"))
+    for variant in (shuffled, categorical):
+        pd.testing.assert_frame_equal(_sorted(features.compute_features(variant, "VALE3")), expected)
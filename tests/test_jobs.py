@@ -0,0 +1,23 @@
+import threading
+
+import include.jobs as jobs
+
+
+def test_update_keeps_a_copy_of_the_published_fields():
+    started, release = threading.Event(), threading.Event()
+
+    def fn(params, update):
+        parciais = [{"ativo": "PETR4"}]
+        update(parciais=parciais)
+        # a lista continua crescendo no job depois de publicada
+        parciais.append({"ativo": "VALE3"})
+        started.set()
+        release.wait(5)
+        return {"ok": True}
+
+    job_id = jobs.submit(user_id=1, fn=fn, params={})
+    assert started.wait(5)
+    try:
+        assert jobs.get(job_id)["parciais"] == [{"ativo": "PETR4"}]
+    finally:
+        release.set()
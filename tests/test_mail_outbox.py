@@ -0,0 +1,120 @@
+import re
+import smtplib
+
+import pytest
+
+import include.mail_outbox as mail_outbox
+
+
+class FakeOutbox:
+    """Conexão falsa com a tabela mail_outbox em memória (só os comandos usados pelo envio)."""
+
+    def __init__(self, *addresses):
+        self.rows = {i: {"to_addr": addr, "subject": "Recuperação", "html": f"token-{i}", "status": "queued",
+                         "attempts": 0, "claimed_by": None}
+                     for i, addr in enumerate(addresses, start=1)}
+        self.result = []
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        pass
+
+    def execute(self, sql, params):
+        sql = " ".join(sql.split())
+        if "SET status = 'sending'" in sql:
+            worker, _, limit = params
+            queued = [row for row in self.rows.values() if row["status"] == "queued"][:limit]
+            for row in queued:
+                row.update(status="sending", claimed_by=worker)
+        elif sql.startswith("SELECT"):
+            self.result = [(i, r["to_addr"], r["subject"], r["html"], r["attempts"])
+                           for i, r in self.rows.items() if r["claimed_by"] == params[0] and r["status"] == "sending"]
+        elif "WHERE claimed_by" in sql:
+            for row in self.rows.values():
+                if row["claimed_by"] == params[-1] and row["status"] == "sending":
+                    row.update(status="queued", claimed_by=None)
+        else:
+            row = self.rows[params[-1]]
+            row.update(status=re.search(r"status = '(\w+)'", sql).group(1), claimed_by=None)
+            if "html = ''" in sql:
+                row["html"] = ""
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.rowcount = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        self.conn.execute(sql, params)
+
+    def fetchall(self):
+        return self.conn.result
+
+
+class FakeServer:
+    """smtplib.SMTP falso; login com a senha errada responde 535."""
+    logins = 0
+    sent = []
+
+    def __init__(self, host, port, timeout=None):
+        pass
+
+    def login(self, user, password):
+        FakeServer.logins += 1
+        if password != "certa":
+            raise smtplib.SMTPAuthenticationError(535, b"5.7.8 authentication failed")
+
+    def sendmail(self, sender, to_addrs, message):
+        if to_addrs[0].startswith("refused"):
+            raise smtplib.SMTPRecipientsRefused({to_addrs[0]: (550, b"no such user")})
+        FakeServer.sent.append(to_addrs[0])
+
+    def quit(self):
+        pass
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def smtp(monkeypatch):
+    monkeypatch.setattr(mail_outbox, "_table_ready", True)
+    monkeypatch.setattr(mail_outbox.smtplib, "SMTP", FakeServer)
+    FakeServer.logins, FakeServer.sent = 0, []
+    return lambda password: mail_outbox.SmtpConnection(use_ssl=False, user="noreply", password=password)
+
+
+def test_sent_and_refused_messages_drop_the_body(smtp):
+    conn = FakeOutbox("ana@example.com", "refused@example.com")
+    result = mail_outbox.send_batch(conn, smtp("certa"), "worker")
+    assert result == {"sent": 1, "retry": 0, "failed": 1, "deferred": 0}
+    assert [(r["status"], r["html"]) for r in conn.rows.values()] == [("sent", ""), ("failed", "")]
+
+
+def test_login_failure_keeps_the_queue_intact(smtp):
+    conn = FakeOutbox("ana@example.com", "bia@example.com", "caio@example.com")
+    total = mail_outbox.drain(conn, smtp("trocada"))
+    assert total == {"sent": 0, "retry": 0, "failed": 0, "deferred": 3}
+    # um único login tentado: o lote para no primeiro erro de autenticação
+    assert FakeServer.logins == 1
+    assert [(r["status"], r["html"], r["attempts"]) for r in conn.rows.values()] == [
+        ("queued", "token-1", 0), ("queued", "token-2", 0), ("queued", "token-3", 0)]
+
+
+def test_only_recipient_or_message_refusals_are_permanent():
+    assert mail_outbox.is_permanent(smtplib.SMTPDataError(554, b"rejected"))
+    assert mail_outbox.is_permanent(smtplib.SMTPSenderRefused(553, b"no", "noreply"))
+    assert not mail_outbox.is_permanent(smtplib.SMTPAuthenticationError(535, b"auth"))
+    assert not mail_outbox.is_permanent(smtplib.SMTPDataError(451, b"try later"))
+    assert mail_outbox.is_connection_error(smtplib.SMTPAuthenticationError(535, b"auth"))
+    assert mail_outbox.is_connection_error(ConnectionRefusedError())
+    assert not mail_outbox.is_connection_error(smtplib.SMTPDataError(554, b"rejected"))
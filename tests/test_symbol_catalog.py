@@ -0,0 +1,30 @@
+import include.symbol_catalog as symbol_catalog
+
+
+def test_symbol_is_skipped_only_after_consecutive_failures(monkeypatch):
+    monkeypatch.setattr(symbol_catalog, "SYMBOL_BAD_AFTER", 3)
+    monkeypatch.setattr(symbol_catalog, "SYMBOL_BAD_TTL_MIN", 300)
+    monkeypatch.setattr(symbol_catalog, "SYMBOL_BAD_TTL", 1000)
+
+    for _ in range(2):
+        symbol_catalog.record_bad("FLAKY", "CATALOG_EX", "Nenhum dado retornado")
+        assert symbol_catalog.is_known_bad("FLAKY", "CATALOG_EX") is None
+    symbol_catalog.record_bad("FLAKY", "CATALOG_EX", "Nenhum dado retornado")
+    entry = symbol_catalog.is_known_bad("FLAKY", "CATALOG_EX")
+    assert entry is not None and entry["failures"] == 3
+
+
+def test_ttl_grows_with_failures_up_to_the_maximum(monkeypatch):
+    monkeypatch.setattr(symbol_catalog, "SYMBOL_BAD_AFTER", 2)
+    monkeypatch.setattr(symbol_catalog, "SYMBOL_BAD_TTL_MIN", 300)
+    monkeypatch.setattr(symbol_catalog, "SYMBOL_BAD_TTL", 1000)
+    assert [symbol_catalog.bad_ttl(n) for n in range(1, 6)] == [0, 300, 600, 1000, 1000]
+
+
+def test_success_resets_the_failure_counter():
+    symbol_catalog.record_bad("BLIP", "CATALOG_EX", "Nenhum dado retornado")
+    symbol_catalog.record_ok("BLIP", "CATALOG_EX", bars=10)
+    assert symbol_catalog.get("BLIP", "CATALOG_EX")["failures"] == 0
+    # o contador recomeça do zero: uma falha isolada não pula o símbolo
+    symbol_catalog.record_bad("BLIP", "CATALOG_EX", "Nenhum dado retornado")
+    assert symbol_catalog.is_known_bad("BLIP", "CATALOG_EX") is None
@@ -0,0 +1,46 @@
+import logging
+
+import include.telemetry as telemetry
+import include.dataset_artifacts as dataset_artifacts
+
+
+class _Capture(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record.msg)
+
+
+def _capture():
+    handler = _Capture()
+    telemetry.logger.addHandler(handler)
+    return handler
+
+
+def test_log_carries_the_current_trace_id():
+    handler = _capture()
+    try:
+        with telemetry.trace() as trace_id:
+            telemetry.log(logging.ERROR, "teste.falhou", error="boom")
+    finally:
+        telemetry.logger.removeHandler(handler)
+    assert handler.records == [{"ts": handler.records[0]["ts"], "trace_id": trace_id,
+                                "level": "ERROR", "event": "teste.falhou", "error": "boom"}]
+
+
+def test_background_save_failure_is_logged_with_the_trace_id(tmp_path):
+    # um arquivo no lugar do diretório: a gravação falha na thread de fundo
+    blocker = tmp_path / "arquivo"
+    blocker.write_text("x")
+    handler = _capture()
+    try:
+        with telemetry.trace() as trace_id:
+            path = dataset_artifacts.save_async("dados", directory=str(blocker / "sub"), enabled=True)
+        dataset_artifacts._executor.submit(lambda: None).result(5)
+    finally:
+        telemetry.logger.removeHandler(handler)
+    [record] = [r for r in handler.records if r.get("event") == "dataset_artifacts.save_failed"]
+    assert record["trace_id"] == trace_id
+    assert record["path"] == path
@@ -0,0 +1,195 @@
+import time
+import threading
+import pytest
+from benchmarks import fakes
+import include.tv_collector as tv_collector
+from include.tv_pool import TvSessionPool
+
+
+@pytest.fixture
+def fast_policy(monkeypatch):
+    monkeypatch.setattr(tv_collector, "TV_BREAKER_FAILURES", 2)
+    monkeypatch.setattr(tv_collector, "TV_BREAKER_COOLDOWN", 0.1)
+    monkeypatch.setattr(tv_collector, "TV_RETRIES", 2)
+    monkeypatch.setattr(tv_collector, "TV_RETRY_BASE", 0.01)
+    monkeypatch.setattr(tv_collector, "TV_SYMBOL_TIMEOUT", 1)
+    monkeypatch.setattr(tv_collector, "TV_HEDGE_AFTER", 0)
+    monkeypatch.setattr(tv_collector.rate_limiter, "rate", 0)
+
+
+# ----------------------------------------------------------------------
+# Disjuntor
+# ----------------------------------------------------------------------
+def test_breaker_opens_after_consecutive_failures_and_recovers():
+    breaker = tv_collector.CircuitBreaker("EX", failures=2, cooldown=0.05)
+    assert breaker.permit() == "closed"
+    breaker.record_failure()
+    assert breaker.state == "closed"
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert breaker.permit() is None
+
+    time.sleep(0.06)
+    assert breaker.state == "half_open"
+    assert breaker.permit() == "probe"
+    # só um teste por vez
+    assert breaker.permit() is None
+    breaker.record_failure(probe=True)
+    assert breaker.state == "open"
+
+    time.sleep(0.06)
+    assert breaker.permit() == "probe"
+    breaker.record_success(probe=True)
+    assert breaker.state == "closed"
+    assert breaker.permit() == "closed"
+
+
+def test_breaker_success_resets_the_failure_count():
+    breaker = tv_collector.CircuitBreaker("EX", failures=2, cooldown=10)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == "closed"
+
+
+def test_released_or_forgotten_probe_does_not_block_forever():
+    breaker = tv_collector.CircuitBreaker("EX", failures=1, cooldown=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+    assert breaker.permit() == "probe"
+    breaker.release(probe=True)
+    assert breaker.permit() == "probe"
+    # teste esquecido (sem veredito) expira depois do cooldown
+    time.sleep(0.06)
+    assert breaker.permit() == "probe"
+
+
+def test_failed_probe_is_not_retried_and_exchange_recovers(fast_policy, monkeypatch):
+    state = {"healthy": False, "calls": 0}
+    original = fakes.TvDatafeed.get_hist
+
+    def get_hist(self, symbol, exchange="NSE", **kwargs):
+        state["calls"] += 1
+        if not state["healthy"]:
+            raise ConnectionError("websocket fechado")
+        return original(self, symbol, exchange, **kwargs)
+
+    monkeypatch.setattr(fakes.TvDatafeed, "get_hist", get_hist)
+    pool = TvSessionPool(max_sessions=2)
+    request = lambda: tv_collector._request(pool, "CL1!", "PROBE_EX", fakes.Interval.in_1_minute, 10)
+
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            request()
+    breaker = tv_collector.circuit_breaker("PROBE_EX")
+    assert breaker.state == "open"
+    with pytest.raises(tv_collector.CircuitOpenError):
+        request()
+
+    # meio-aberto: o teste falha uma vez, sem novas tentativas
+    time.sleep(0.12)
+    state["calls"] = 0
+    with pytest.raises(ConnectionError):
+        request()
+    assert state["calls"] == 1
+    assert breaker.state == "open"
+
+    # a exchange voltou: o próximo teste fecha o disjuntor
+    state["healthy"] = True
+    time.sleep(0.12)
+    df = request()
+    assert df is not None and not df.empty
+    assert breaker.state == "closed"
+
+
+# ----------------------------------------------------------------------
+# Prazo, hedge e pool
+# ----------------------------------------------------------------------
+def test_hung_symbols_do_not_starve_healthy_ones(fast_policy, monkeypatch):
+    monkeypatch.setattr(tv_collector, "TV_SYMBOL_TIMEOUT", 0.3)
+    monkeypatch.setattr(tv_collector, "TV_HEDGE_AFTER", 0.1)
+    monkeypatch.setattr(tv_collector, "TV_RETRIES", 1)
+    original = fakes.TvDatafeed.get_hist
+    release = threading.Event()
+
+    def get_hist(self, symbol, exchange="NSE", **kwargs):
+        if symbol.startswith("HANG"):
+            release.wait(5)
+        return original(self, symbol, exchange, **kwargs)
+
+    monkeypatch.setattr(fakes.TvDatafeed, "get_hist", get_hist)
+    pool = TvSessionPool(max_sessions=4)
+    monkeypatch.setattr(tv_collector.tv_pool, "get_pool", lambda *args: pool)
+    symbols = ["HANG1:SLOW_EX", "HANG2:SLOW_EX"] + [f"S{i}:OK_EX" for i in range(8)]
+    try:
+        results = list(tv_collector.iter_tv_all(symbols, [], 10, max_workers=4, use_store=False,
+                                                use_cache=False, deadline=3))
+    finally:
+        release.set()
+    report = tv_collector.completeness_report(results)
+    assert report["recebidos"] == 8
+    assert {f["ativo"] for f in report["faltando"]} == {"HANG1:SLOW_EX", "HANG2:SLOW_EX"}
+    assert tv_collector.circuit_breaker("OK_EX").state == "closed"
+
+
+def test_deadline_returns_partial_results_with_report(fast_policy, monkeypatch):
+    original = fakes.TvDatafeed.get_hist
+    release = threading.Event()
+
+    def get_hist(self, symbol, exchange="NSE", **kwargs):
+        if symbol == "HANG":
+            release.wait(5)
+        return original(self, symbol, exchange, **kwargs)
+
+    monkeypatch.setattr(fakes.TvDatafeed, "get_hist", get_hist)
+    monkeypatch.setattr(tv_collector, "TV_SYMBOL_TIMEOUT", 5)
+    inicio = time.monotonic()
+    try:
+        results = list(tv_collector.iter_tv_all(["PETR4:DEADLINE_EX", "HANG:DEADLINE_EX"], [], 10,
+                                                max_workers=2, use_store=False, use_cache=False,
+                                                deadline=0.5))
+    finally:
+        release.set()
+    assert time.monotonic() - inicio < 2
+    report = tv_collector.completeness_report(results)
+    assert report["recebidos"] == 1 and not report["completo"]
+    assert report["faltando"][0]["motivo"] == "timeout"
+
+
+def test_requests_per_sec_applies_only_to_its_own_collection(fast_policy, monkeypatch):
+    acquired = []
+    original = tv_collector.RateLimiter.acquire
+
+    def acquire(self):
+        acquired.append(self)
+        return original(self)
+
+    monkeypatch.setattr(tv_collector.RateLimiter, "acquire", acquire)
+    results = list(tv_collector.iter_tv_all(["PETR4:RATE_EX", "VALE3:RATE_EX"], [], 10, max_workers=2,
+                                            requests_per_sec=1000, use_store=False, use_cache=False))
+    assert all(df is not None for _, _, df, _ in results)
+    assert tv_collector.rate_limiter.rate == 0
+    assert len(acquired) == 2 and tv_collector.rate_limiter not in acquired
+    assert acquired[0] is acquired[1] and acquired[0].rate == 1000
+
+
+def test_collect_tv_frames_reports_each_symbol_as_it_arrives(fast_policy):
+    seen = []
+    df_all, results, resumo = tv_collector.collect_tv_frames(
+        ["PETR4:FRAMES_EX", "BAD1:FRAMES_EX"], [], 10, max_workers=2, use_store=False, use_cache=False,
+        on_result=lambda pos, sym, df, msg: seen.append((sym, df is not None)))
+    assert sorted(seen) == [("BAD1:FRAMES_EX", False), ("PETR4:FRAMES_EX", True)]
+    assert [r[1] for r in results] == ["PETR4:FRAMES_EX", "BAD1:FRAMES_EX"]
+    assert len(df_all) == 10 and resumo["recebidos"] == 1
+
+
+def test_capped_base_series_reports_short_timeframes(fast_policy, monkeypatch):
+    monkeypatch.setattr(tv_collector.resampling, "TV_MAX_BASE_BARS", 120)
+    df_all, _, resumo = tv_collector.collect_tv_frames(["PETR4:CAP_EX"], [], 5, max_workers=1, use_store=False,
+                                                       use_cache=False, timeframes=["1m", "5m", "60m"])
+    counts = df_all.groupby("timeframe", observed=True).size().to_dict()
+    # 120 barras de 1m: 5 de 1m e de 5m, mas só 2 de 60m
+    assert counts["1m"] == 5 and counts["5m"] == 5 and counts["60m"] < 5
+    assert resumo["barras_curtas"] == [{"ativo": "PETR4:CAP_EX", "timeframe": "60m",
+                                        "barras": counts["60m"], "pedidas": 5}]
+    assert "60m: " in tv_collector.short_bars_message(resumo["barras_curtas"])
@@ -0,0 +1,35 @@
+import time
+
+import pytest
+
+from include.tv_pool import ANONYMOUS_TOKEN, TvSessionPool
+
+
+def test_sessions_are_reused_and_rotated_by_age():
+    pool = TvSessionPool(max_sessions=2, max_age=0.05)
+    with pool.session() as first:
+        pass
+    with pool.session() as again:
+        assert again is first
+    time.sleep(0.06)
+    with pool.session() as rotated:
+        assert rotated is not first
+    assert pool.stats()["created"] == 2 and pool.stats()["discarded"] == 1
+
+
+def test_session_that_raises_is_discarded():
+    pool = TvSessionPool(max_sessions=1)
+    with pytest.raises(RuntimeError):
+        with pool.session() as client:
+            raise RuntimeError("websocket caiu")
+    with pool.session() as fresh:
+        assert fresh is not client
+    assert pool.free_slots() == 1
+
+
+def test_failed_login_on_anonymous_token_is_not_reused():
+    pool = TvSessionPool("user", "secret", max_sessions=1)
+    with pool.session() as client:
+        client.token = ANONYMOUS_TOKEN
+    with pool.session() as fresh:
+        assert fresh is not client
@@ -0,0 +1,52 @@
+import include.auth as auth
+import include.users_database as udb
+
+
+class FakeCursor:
+    def __init__(self, stored):
+        self.stored = stored
+        self.rows = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        # user_email IN (...) sem diferenciar caixa, como o MySQL
+        wanted = {str(p).lower() for p in params or ()}
+        self.rows = [(email,) for email in self.stored if email.lower() in wanted]
+
+    def fetchall(self):
+        return self.rows
+
+
+class FakeConn:
+    def __init__(self, stored):
+        self.stored = stored
+
+    def cursor(self, *args):
+        return FakeCursor(self.stored)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+
+def test_hash_password_matches_login_verification():
+    hashed, salt = udb.hash_password("s3nha")
+    assert hashed == auth.hash_data("s3nha", salt)
+
+
+def test_bulk_status_change_invalidates_profiles_saved_with_mixed_case():
+    profile = {"id": 1, "user_name": "Ana", "user_email": "Ana.Souza@Example.com",
+               "access_lvl": 0, "contract_status": "active"}
+    udb.cache_user_profile(profile)
+    assert udb.get_user_profile(" ana.souza@example.com")["contract_status"] == "active"
+
+    report = udb.bulk_update_status(FakeConn(["Ana.Souza@Example.com"]), ["ANA.SOUZA@example.com"], "revoked")
+    assert report == [{"user_email": "ana.souza@example.com", "resultado": "atualizado"}]
+    assert udb.email_key("Ana.Souza@Example.com") not in udb._profile_cache